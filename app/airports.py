@@ -0,0 +1,177 @@
+"""Local airport/city code index in front of the searchAirport API.
+
+Seeded from the CSV snapshot at ``AIRPORT_SNAPSHOT_PATH`` and taught every
+query that upstream resolves, so repeat lookups for the same cities never
+leave the process. A query resolves locally when it names an entry exactly,
+is a long enough prefix of a single entry, or is a close (trigram) match for
+one entry. Anything else is a miss and goes upstream: near entries are no
+answer on their own ("SAN" is not SFO, "Miami Beach" is not MIA). They are
+only offered as candidates when upstream does not know the query either.
+"""
+
+import csv
+import logging
+from typing import Iterable, List, Optional
+from app.config import settings
+from app.search_index import SearchIndex, normalize
+
+logger = logging.getLogger(__name__)
+
+# shortest query we trust to name a single entry by prefix, and the share of
+# that entry's name it has to cover
+MIN_PREFIX_LENGTH = 4
+MIN_PREFIX_COVERAGE = 0.6
+# fuzzy matches closer than this to the runner-up are ambiguous
+MIN_FUZZY_MARGIN = 0.1
+# how similar an entry has to be to be offered as a candidate
+MIN_CANDIDATE_SIMILARITY = 0.5
+
+
+class AmbiguousAirport(LookupError):
+    """Upstream has no airport for the query; ``candidates`` are the indexed
+    entries it is close to."""
+
+    def __init__(self, query: str, candidates: List[dict]):
+        names = ", ".join(c["name"] or c["airport_code"] for c in candidates)
+        super().__init__(f"No airport found for {query!r}, did you mean: {names}?")
+        self.query = query
+        self.candidates = candidates
+
+
+class AirportIndex:
+    def __init__(self, min_similarity: float = 0.75):
+        self.min_similarity = min_similarity
+        self.index: SearchIndex[dict] = SearchIndex()
+        self.names: dict = {}
+        self.counters = {"exact": 0, "prefix": 0, "fuzzy": 0, "misses": 0}
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def add(self, airport: dict, name: str = "", aliases: Iterable[str] = ()) -> None:
+        """Indexes ``{"parent_id", "airport_code"}`` under its code, name and aliases."""
+        code = airport["airport_code"]
+        if name:
+            self.names[code] = name
+        self.index.add(code, airport, [code, name, *aliases])
+
+    def learn(self, query: str, airport: dict) -> None:
+        self.add(airport, aliases=[query])
+
+    def lookup(self, query: str) -> Optional[dict]:
+        exact = self.index.exact(query)
+        if exact:
+            self.counters["exact"] += 1
+            return exact[0]
+
+        key = normalize(query)
+        if len(key) >= MIN_PREFIX_LENGTH:
+            ids = self.index.prefix_ids(query)
+            if len(ids) == 1:
+                shortest = self.index.prefix_keys(query)[0]
+                if len(key) >= MIN_PREFIX_COVERAGE * len(shortest):
+                    self.counters["prefix"] += 1
+                    return self.index.get(ids[0])
+
+        ranked = self.index.fuzzy(query, self.min_similarity, limit=2)
+        if ranked and (
+            len(ranked) == 1 or ranked[0][0] - ranked[1][0] >= MIN_FUZZY_MARGIN
+        ):
+            self.counters["fuzzy"] += 1
+            return ranked[0][1]
+
+        self.counters["misses"] += 1
+        return None
+
+    def candidates(self, query: str, limit: int = 5) -> List[dict]:
+        """Entries ``query`` may have meant: prefix matches, then look-alikes.
+
+        Each is ``{"parent_id", "airport_code", "name"}``.
+        """
+        ids = self.index.prefix_ids(query)[:limit]
+        for _, airport in self.index.fuzzy(query, MIN_CANDIDATE_SIMILARITY, limit):
+            if airport["airport_code"] not in ids:
+                ids.append(airport["airport_code"])
+        return [
+            {**self.index.get(code), "name": self.names.get(code, "")}
+            for code in ids[:limit]
+        ]
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[dict]:
+        return self.index.prefix(prefix, limit)
+
+    @classmethod
+    def load(cls, path: str, min_similarity: float = 0.75) -> "AirportIndex":
+        airports = cls(min_similarity)
+        with open(path, newline="", encoding="utf-8") as snapshot:
+            for row in csv.DictReader(snapshot):
+                parent_id = row["parent_id"]
+                airports.add(
+                    {
+                        "parent_id": (
+                            int(parent_id) if parent_id.isdigit() else parent_id
+                        ),
+                        "airport_code": row["airport_code"],
+                    },
+                    name=row["name"],
+                    aliases=[a for a in row["aliases"].split("|") if a],
+                )
+        return airports
+
+    def save(self, path: str) -> None:
+        with open(path, "w", newline="", encoding="utf-8") as snapshot:
+            writer = csv.writer(snapshot)
+            writer.writerow(["airport_code", "parent_id", "name", "aliases"])
+            for code, airport in sorted(self.index.items()):
+                name = self.names.get(code, "")
+                skip = {normalize(code), normalize(name)}
+                aliases = [k for k in self.index.keys_of(code) if k not in skip]
+                writer.writerow(
+                    [code, airport["parent_id"], name, "|".join(sorted(aliases))]
+                )
+
+    def stats(self) -> dict:
+        return {"entries": len(self), **self.counters}
+
+
+_index: Optional[AirportIndex] = None
+
+
+def build_index() -> AirportIndex:
+    path = settings.AIRPORT_SNAPSHOT_PATH
+    if not path:
+        return AirportIndex(settings.AIRPORT_MIN_SIMILARITY)
+    try:
+        return AirportIndex.load(path, settings.AIRPORT_MIN_SIMILARITY)
+    except (OSError, KeyError, ValueError) as e:
+        logger.error("Could not load airport snapshot %s: %s", path, e)
+        return AirportIndex(settings.AIRPORT_MIN_SIMILARITY)
+
+
+def get_index() -> AirportIndex:
+    global _index
+    if _index is None:
+        _index = build_index()
+    return _index
+
+
+def start() -> None:
+    global _index
+    _index = build_index()
+
+
+def reset() -> None:
+    global _index
+    _index = None
+
+
+def close() -> None:
+    if (
+        _index is not None
+        and settings.AIRPORT_SNAPSHOT_PATH
+        and settings.AIRPORT_SNAPSHOT_SAVE
+    ):
+        try:
+            _index.save(settings.AIRPORT_SNAPSHOT_PATH)
+        except OSError as e:
+            logger.error("Could not save airport snapshot: %s", e)
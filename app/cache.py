@@ -0,0 +1,269 @@
+"""Response cache for upstream API results.
+
+Entries are keyed on the endpoint name plus the normalized request model and
+hold the JSON-ready result a handler produced, so a hit skips both the
+RapidAPI call and the transform. Two backends are available: a byte-bounded
+in-process LRU (the default) and a Mongo collection, which lets every worker
+share a cache fill.
+
+Concurrent misses for the same key share one in-flight upstream call, and an
+entry past its TTL is still served for ``CACHE_STALE_TTL`` seconds while a
+background task refreshes it. Refreshes are scheduled as background
+traffic, behind upstream calls someone is waiting on.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+from pydantic import BaseModel
+from pymongo.database import Database
+from app import ratelimit
+from app.config import settings
+from app.db import aio
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """Small bounded in-process map whose entries expire after ``ttl`` seconds."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[Any, tuple[float, Any]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Any) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def set(self, key: Any, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: Any) -> None:
+        self._entries.pop(key, None)
+
+    def discard_where(self, predicate: Callable[[Any], bool]) -> None:
+        for key in [k for k, (_, v) in self._entries.items() if predicate(v)]:
+            del self._entries[key]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+class CacheBackend:
+    async def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        raise NotImplementedError
+
+    async def clear(self) -> None:
+        raise NotImplementedError
+
+
+class MemoryBackend(CacheBackend):
+    """LRU bounded by the approximate JSON size of the stored values."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: "OrderedDict[str, tuple[float, int, Any]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, _, value = entry
+        if expires_at <= time.monotonic():
+            self._discard(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        size = len(json.dumps(value, default=str))
+        if size > self.max_bytes:
+            return
+        self._discard(key)
+        self._entries[key] = (time.monotonic() + ttl, size, value)
+        self.size += size
+        while self.size > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._discard(oldest)
+
+    async def clear(self) -> None:
+        self._entries.clear()
+        self.size = 0
+
+    def _discard(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
+
+
+class MongoBackend(CacheBackend):
+    """Shared cache in a collection; a TTL index on expiresAt reaps old entries."""
+
+    def __init__(self, db: Database, collection: str):
+        self.collection = aio.collection(db, collection)
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = await self.collection.find_one(
+            {"_id": key, "expiresAt": {"$gt": datetime.utcnow()}}
+        )
+        return entry["value"] if entry else None
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        await self.collection.update_one(
+            {"_id": key},
+            {
+                "$set": {
+                    "value": value,
+                    "expiresAt": datetime.utcnow() + timedelta(seconds=ttl),
+                }
+            },
+            upsert=True,
+        )
+
+    async def clear(self) -> None:
+        await self.collection.delete_many({})
+
+
+class ResponseCache:
+    def __init__(self, backend: CacheBackend, stale_ttl: float = 0):
+        self.backend = backend
+        self.stale_ttl = stale_ttl
+        self.counters: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"hits": 0, "stale": 0, "misses": 0, "coalesced": 0}
+        )
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    @staticmethod
+    def key(endpoint: str, request: BaseModel) -> str:
+        normalized = json.dumps(
+            request.model_dump(mode="json"), sort_keys=True, separators=(",", ":")
+        )
+        digest = hashlib.sha256(normalized.encode()).hexdigest()
+        return f"{endpoint}:{digest}"
+
+    async def get_or_fetch(
+        self,
+        endpoint: str,
+        request: BaseModel,
+        fetch: Callable[[], Awaitable[Any]],
+        ttl: float,
+    ) -> Any:
+        key = self.key(endpoint, request)
+        counters = self.counters[endpoint]
+        entry = await self.backend.get(key)
+        if entry is not None:
+            if entry["fresh_until"] > time.time():
+                counters["hits"] += 1
+            else:
+                counters["stale"] += 1
+                if key not in self._inflight:
+                    self._start_fill(key, fetch, ttl, background=True)
+            return entry["value"]
+
+        if key in self._inflight:
+            counters["coalesced"] += 1
+        else:
+            counters["misses"] += 1
+            self._start_fill(key, fetch, ttl)
+        # shield so a cancelled caller does not cancel the fill for the others
+        return await asyncio.shield(self._inflight[key])
+
+    def _start_fill(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[Any]],
+        ttl: float,
+        background: bool = False,
+    ) -> None:
+        if background:
+            # the task copies the context, and with it the upstream priority
+            with ratelimit.background():
+                task = asyncio.ensure_future(self._fill(key, fetch, ttl))
+        else:
+            task = asyncio.ensure_future(self._fill(key, fetch, ttl))
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        if background:
+            task.add_done_callback(self._log_background_failure)
+
+    async def _fill(
+        self, key: str, fetch: Callable[[], Awaitable[Any]], ttl: float
+    ) -> Any:
+        value = await fetch()
+        entry = {"value": value, "fresh_until": time.time() + ttl}
+        await self.backend.set(key, entry, ttl + self.stale_ttl)
+        return value
+
+    @staticmethod
+    def _log_background_failure(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Background cache refresh failed: %r", task.exception())
+
+    def stats(self) -> dict:
+        stats: dict = {
+            "backend": type(self.backend).__name__,
+            "inflight": len(self._inflight),
+            "endpoints": {
+                endpoint: dict(counters)
+                for endpoint, counters in sorted(self.counters.items())
+            },
+        }
+        if isinstance(self.backend, MemoryBackend):
+            stats["entries"] = len(self.backend)
+            stats["bytes"] = self.backend.size
+            stats["max_bytes"] = self.backend.max_bytes
+        return stats
+
+
+_cache: Optional[ResponseCache] = None
+
+
+def build_cache(db: Optional[Database] = None) -> ResponseCache:
+    if settings.CACHE_BACKEND == "mongo" and db is not None:
+        backend: CacheBackend = MongoBackend(db, settings.CACHE_COLLECTION)
+    else:
+        backend = MemoryBackend(settings.CACHE_MAX_BYTES)
+    return ResponseCache(backend, stale_ttl=settings.CACHE_STALE_TTL)
+
+
+def start(db: Database) -> None:
+    global _cache
+    _cache = build_cache(db)
+
+
+def reset() -> None:
+    global _cache
+    _cache = None
+
+
+async def get_cache() -> ResponseCache:
+    global _cache
+    if _cache is None:
+        _cache = build_cache()
+    return _cache
@@ -1,3 +1,4 @@
+from pathlib import Path
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -11,6 +12,98 @@ class Settings(BaseSettings):
     X_RAPIDAPI_HOST: str = Field(None, env="X_RAPIDAPI_HOST")
     WEATHER_API_KEY: str = Field(None, env="WEATHER_API_KEY")
 
+    # MongoDB connection pool (shared by the whole process)
+    MONGO_MAX_POOL_SIZE: int = 100
+    MONGO_MIN_POOL_SIZE: int = 0
+    MONGO_MAX_IDLE_TIME_MS: int = 60000
+    MONGO_MAX_CONNECTING: int = 2
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: int = 5000
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = 10000
+    # create the indexes in app/db/indexes.py at startup
+    MONGO_CREATE_INDEXES: bool = True
+    # threads used to run blocking pymongo calls off the event loop
+    MONGO_EXECUTOR_WORKERS: int = 32
+
+    # Upstream HTTP clients (one pooled client per upstream host)
+    UPSTREAM_HTTP2: bool = True
+    UPSTREAM_MAX_CONNECTIONS: int = 100
+    UPSTREAM_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    UPSTREAM_KEEPALIVE_EXPIRY: float = 30.0
+    UPSTREAM_CONNECT_TIMEOUT: float = 10.0
+    TRIPADVISOR_TIMEOUT: float = 40.0
+    ATTRACTION_TIMEOUT: float = 40.0
+    WEATHER_TIMEOUT: float = 10.0
+    # client-side token buckets (requests per second and burst, 0: no limit)
+    # per upstream host and per RapidAPI key; a call queued longer than
+    # UPSTREAM_QUEUE_MAX_WAIT seconds fails with a 503, and background calls
+    # leave this share of a quota window RapidAPI reports to interactive ones
+    UPSTREAM_RATE_PER_HOST: float = 10.0
+    UPSTREAM_BURST_PER_HOST: int = 20
+    UPSTREAM_RATE_PER_KEY: float = 5.0
+    UPSTREAM_BURST_PER_KEY: int = 10
+    UPSTREAM_QUEUE_MAX_WAIT: float = 10.0
+    UPSTREAM_QUOTA_BACKGROUND_RESERVE: float = 0.1
+    # /trip/search gives each upstream leg this long before reporting a timeout
+    TRIP_SEARCH_LEG_TIMEOUT: float = 15.0
+
+    # validate hotel and attraction results once, when they are cached, and
+    # keep them as JSON text: pages are sent without response_model
+    # re-validation or re-serialization
+    FAST_RESPONSES: bool = False
+
+    # verified JWT claims cached by token digest
+    TOKEN_CACHE_SIZE: int = 4096
+    TOKEN_CACHE_TTL: int = 300
+
+    # authenticated user profiles cached by user id
+    USER_CACHE_SIZE: int = 1024
+    USER_CACHE_TTL: int = 60
+
+    # local airport index: CSV snapshot loaded at startup ("" starts empty),
+    # optionally written back with learned queries at shutdown
+    AIRPORT_SNAPSHOT_PATH: str = str(Path(__file__).parent / "data" / "airports.csv")
+    AIRPORT_SNAPSHOT_SAVE: bool = False
+    AIRPORT_MIN_SIMILARITY: float = 0.75
+
+    # hotel location autocomplete: entries seen in searchLocation results,
+    # persisted with their popularity and loaded back at startup
+    LOCATION_COLLECTION: str = "locations"
+    LOCATION_INDEX_WARM: bool = True
+    LOCATION_INDEX_MAX_ENTRIES: int = 50000
+    LOCATION_AUTOCOMPLETE_LIMIT: int = 10
+    # search-location answers locally once it has this many matches (0: never)
+    LOCATION_LOCAL_MIN_RESULTS: int = 5
+
+    # saved trips: largest stored document, and pagination
+    SAVED_TRIP_MAX_BYTES: int = 256 * 1024
+    SAVED_TRIPS_PAGE_SIZE: int = 20
+    SAVED_TRIPS_MAX_PAGE_SIZE: int = 100
+
+    # favorite flights per insert_many round-trip
+    FAVORITE_FLIGHTS_BATCH_SIZE: int = 100
+
+    # bcrypt worker pool ("thread" or "process")
+    HASH_EXECUTOR: str = "thread"
+    HASH_WORKERS: int = 4
+    HASH_MAX_CONCURRENCY: int = 8
+
+    # Upstream response cache ("memory" or "mongo"), TTLs in seconds
+    CACHE_BACKEND: str = "memory"
+    CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    CACHE_COLLECTION: str = "upstream_cache"
+    CACHE_STALE_TTL: int = 300
+    CACHE_TTL_SEARCH_AIRPORT: int = 86400
+    CACHE_TTL_SEARCH_FLIGHTS: int = 300
+    CACHE_TTL_SEARCH_LOCATION: int = 86400
+    CACHE_TTL_SEARCH_ATTRACTIONS: int = 3600
+    CACHE_TTL_SEARCH_HOTELS: int = 900
+    CACHE_TTL_HOTELS_FILTER: int = 3600
+    CACHE_TTL_HOTEL_DETAILS: int = 1800
+    # OpenWeather updates current conditions about every 10 minutes
+    CACHE_TTL_WEATHER: int = 600
+    # flight result sets whose response rows are kept once built (0: none)
+    FLIGHT_ROWS_CACHE_SIZE: int = 256
+
     class Config:
         env_file = ".env"
 
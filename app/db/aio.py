@@ -0,0 +1,133 @@
+"""Asyncio front-end for pymongo collections.
+
+pymongo is blocking, so every call is shipped to a dedicated thread pool and
+awaited; this is exactly what Motor does under the hood. Wrapping the plain
+pymongo ``Database`` (or a mongomock one in tests) keeps the rest of the code
+on the existing types while the event loop stays free for other requests.
+"""
+
+import asyncio
+import functools
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+from pymongo.collection import Collection
+from pymongo.database import Database
+from app.config import settings
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.MONGO_EXECUTOR_WORKERS,
+            thread_name_prefix="mongo",
+        )
+    return _executor
+
+
+def shutdown() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+
+
+async def run(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_executor(), functools.partial(fn, *args, **kwargs)
+    )
+
+
+class AsyncCursor:
+    def __init__(self, cursor, batch_size: int = 100):
+        self.delegate = cursor
+        self.batch_size = batch_size
+        self._buffer: list = []
+        self._exhausted = False
+
+    # sort/limit/skip only configure the query, they do no I/O
+    def sort(self, *args, **kwargs) -> "AsyncCursor":
+        self.delegate.sort(*args, **kwargs)
+        return self
+
+    def limit(self, limit: int) -> "AsyncCursor":
+        self.delegate.limit(limit)
+        return self
+
+    def skip(self, skip: int) -> "AsyncCursor":
+        self.delegate.skip(skip)
+        return self
+
+    def _fetch(self) -> list:
+        return list(itertools.islice(self.delegate, self.batch_size))
+
+    def __aiter__(self) -> "AsyncCursor":
+        return self
+
+    async def __anext__(self) -> dict:
+        if not self._buffer:
+            if self._exhausted:
+                raise StopAsyncIteration
+            self._buffer = await run(self._fetch)
+            self._buffer.reverse()
+            if len(self._buffer) < self.batch_size:
+                self._exhausted = True
+            if not self._buffer:
+                raise StopAsyncIteration
+        return self._buffer.pop()
+
+    async def to_list(self, length: Optional[int] = None) -> list:
+        if length is not None:
+            self.delegate.limit(length)
+        return await run(list, self.delegate)
+
+
+class AsyncCollection:
+    def __init__(self, collection: Collection):
+        self.delegate = collection
+
+    @property
+    def name(self) -> str:
+        return self.delegate.name
+
+    def find(self, *args, **kwargs) -> AsyncCursor:
+        return AsyncCursor(self.delegate.find(*args, **kwargs))
+
+    async def find_one(self, *args, **kwargs):
+        return await run(self.delegate.find_one, *args, **kwargs)
+
+    async def insert_one(self, *args, **kwargs):
+        return await run(self.delegate.insert_one, *args, **kwargs)
+
+    async def insert_many(self, *args, **kwargs):
+        return await run(self.delegate.insert_many, *args, **kwargs)
+
+    async def update_one(self, *args, **kwargs):
+        return await run(self.delegate.update_one, *args, **kwargs)
+
+    async def bulk_write(self, *args, **kwargs):
+        return await run(self.delegate.bulk_write, *args, **kwargs)
+
+    async def delete_one(self, *args, **kwargs):
+        return await run(self.delegate.delete_one, *args, **kwargs)
+
+    async def delete_many(self, *args, **kwargs):
+        return await run(self.delegate.delete_many, *args, **kwargs)
+
+    async def count_documents(self, *args, **kwargs):
+        return await run(self.delegate.count_documents, *args, **kwargs)
+
+    async def create_index(self, *args, **kwargs):
+        return await run(self.delegate.create_index, *args, **kwargs)
+
+    async def create_indexes(self, *args, **kwargs):
+        return await run(self.delegate.create_indexes, *args, **kwargs)
+
+
+def collection(db: Database, name: str) -> AsyncCollection:
+    return AsyncCollection(db.get_collection(name))
@@ -1,16 +1,35 @@
 from pymongo import MongoClient
-from typing import Dict, Any
+from pymongo.database import Database
+from typing import Dict, Any, Optional
 from app.config import settings
-import os
 
 
-def get_db():
-    mongodb_uri = settings.MONGODB_URI
-    client: MongoClient[Dict[str, Any]] = MongoClient(mongodb_uri, settings.PORT)
-    db = client[settings.DATABASE_NAME]
+# One client per process. MongoClient is thread-safe and owns its own
+# connection pool, so every request shares it instead of opening a new one.
+_client: Optional[MongoClient[Dict[str, Any]]] = None
 
-    try:
-        yield db
 
-    finally:
-        client.close()
+def connect() -> MongoClient[Dict[str, Any]]:
+    global _client
+    if _client is None:
+        _client = MongoClient(
+            settings.MONGODB_URI,
+            maxPoolSize=settings.MONGO_MAX_POOL_SIZE,
+            minPoolSize=settings.MONGO_MIN_POOL_SIZE,
+            maxIdleTimeMS=settings.MONGO_MAX_IDLE_TIME_MS,
+            maxConnecting=settings.MONGO_MAX_CONNECTING,
+            waitQueueTimeoutMS=settings.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+            serverSelectionTimeoutMS=settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        )
+    return _client
+
+
+def close() -> None:
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
+
+
+async def get_db() -> Database:
+    return connect()[settings.DATABASE_NAME]
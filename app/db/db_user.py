@@ -1,25 +1,36 @@
+import hashlib
+import json
+from typing import AsyncIterator, Optional
 from fastapi import HTTPException, status
+from pymongo import DESCENDING
 from pymongo.database import Database
-from pymongo.collection import Collection
+from pymongo.errors import BulkWriteError, PyMongoError
+import bson
 from bson.objectid import ObjectId
 from datetime import datetime
+from app.db import aio
 from app.db.hash import Hash
+from app.cache import TTLCache
+from app.config import settings
 from app.schemas import (
     UserCreate,
     UserGet,
     User,
+    UserDisplay,
     FavoriteFlight,
     CartItem,
     SaveForLater,
 )
 from app import jwttoken
-from typing import Any
-import asyncio
+
+
+# profiles of recently authenticated users, keyed by user id
+user_profiles = TTLCache(settings.USER_CACHE_SIZE, settings.USER_CACHE_TTL)
 
 
 async def get_user_by_id(db: Database, id: int):
-    user_collection = db.get_collection("users")
-    user = user_collection.find_one({"id": id})
+    user_collection = aio.collection(db, "users")
+    user = await user_collection.find_one({"id": id})
 
     if not user:
         raise HTTPException(
@@ -42,8 +53,8 @@ async def get_user(db: Database, request: UserGet):
         )
 
     print("User identifier:", user_identifier)
-    collection: Collection[dict[str, Any]] = db.get_collection("users")
-    user = collection.find_one(user_identifier)
+    collection = aio.collection(db, "users")
+    user = await collection.find_one(user_identifier)
 
     if not user:
         raise HTTPException(
@@ -53,13 +64,30 @@ async def get_user(db: Database, request: UserGet):
     return User(**user)
 
 
+async def get_user_profile(db: Database, user_id: str) -> UserDisplay:
+    profile = user_profiles.get(user_id)
+    if profile is not None:
+        return profile
+
+    collection = aio.collection(db, "users")
+    user = await collection.find_one({"_id": ObjectId(user_id)}, {"password": 0})
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
+        )
+    user["id"] = str(user.pop("_id"))
+    profile = UserDisplay(**user)
+    user_profiles.set(user_id, profile)
+    return profile
+
+
 async def create_user(db: Database, request: UserCreate):
-    collection = db.get_collection("users")
-    existing_user = collection.find_one({"email": request.email})
+    collection = aio.collection(db, "users")
+    existing_user = await collection.find_one({"email": request.email})
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
-    hashed_password = Hash.bcrypt(request.password)
-    existing_username = collection.find_one({"username": request.username})
+    hashed_password = await Hash.bcrypt_async(request.password)
+    existing_username = await collection.find_one({"username": request.username})
     if existing_username:
         raise HTTPException(status_code=400, detail="Username already exists.")
 
@@ -75,7 +103,7 @@ async def create_user(db: Database, request: UserCreate):
         "updatedAt": datetime.utcnow(),
     }
 
-    result = collection.insert_one(user)
+    result = await collection.insert_one(user)
     if not result.acknowledged:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -87,7 +115,7 @@ async def create_user(db: Database, request: UserCreate):
 
 
 async def authenticate_user(db: Database, identifier: UserGet, password: str):
-    collection: Collection[dict[str, Any]] = db.get_collection("users")
+    collection = aio.collection(db, "users")
     if identifier.id:
         query = {"_id": ObjectId(identifier.id)}
     elif identifier.email:
@@ -98,9 +126,9 @@ async def authenticate_user(db: Database, identifier: UserGet, password: str):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
         )
-    user = collection.find_one(query)
+    user = await collection.find_one(query)
 
-    if user and Hash.verify(user["password"], password):
+    if user and await Hash.verify_async(user["password"], password):
         access_token = jwttoken.create_access_token(
             data={"user_email": user["email"], "user_id": str(user["_id"])}
         )
@@ -114,21 +142,156 @@ async def authenticate_user(db: Database, identifier: UserGet, password: str):
 
 
 async def update_user_info(db: Database, email: str, update_data: dict):
-    collection = db.get_collection("users")
+    collection = aio.collection(db, "users")
     if "password" in update_data:
-        update_data["password"] = Hash.bcrypt(update_data["password"])
+        update_data["password"] = await Hash.bcrypt_async(update_data["password"])
     update_data["updatedAt"] = datetime.utcnow()
-    result = collection.update_one({"email": email}, {"$set": update_data})
+    result = await collection.update_one({"email": email}, {"$set": update_data})
+    user_profiles.discard_where(lambda profile: profile.email == email)
     if result.modified_count == 0:
         return None
     return update_data
 
 
-async def add_favorite_flight(
-    db: Database, favorite_flight: FavoriteFlight, user_id: str
+def favorite_flight_hash(favorite_flight: FavoriteFlight) -> str:
+    normalized = json.dumps(
+        favorite_flight.model_dump(mode="json"), sort_keys=True, separators=(",", ":")
+    )
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+async def add_favorite_flights(
+    db: Database, favorite_flights: list[FavoriteFlight], user_id: str
+) -> list[dict]:
+    """Saves a batch of favorites, one result per input item.
+
+    Flights the user already saved (same content hash) are reported as
+    duplicates instead of being stored again; the rest go out in
+    ``insert_many`` batches of ``FAVORITE_FLIGHTS_BATCH_SIZE``.
+    """
+    collection = aio.collection(db, "favorite_flights")
+    hashes = [favorite_flight_hash(flight) for flight in favorite_flights]
+    existing = await collection.find(
+        {"user_id": user_id, "contentHash": {"$in": hashes}}, {"contentHash": 1}
+    ).to_list()
+    saved_ids = {doc["contentHash"]: str(doc["_id"]) for doc in existing}
+
+    results: list[dict] = [{} for _ in favorite_flights]
+    pending = []
+    queued = set()
+    for index, (flight, content_hash) in enumerate(zip(favorite_flights, hashes)):
+        if content_hash in saved_ids or content_hash in queued:
+            results[index] = {
+                "index": index,
+                "status": "duplicate",
+                "id": saved_ids.get(content_hash),
+            }
+            continue
+        favorite_flight_data = flight.model_dump()
+        favorite_flight_data["user_id"] = user_id
+        favorite_flight_data["contentHash"] = content_hash
+        queued.add(content_hash)
+        pending.append((index, favorite_flight_data))
+
+    batch_size = settings.FAVORITE_FLIGHTS_BATCH_SIZE
+    for start in range(0, len(pending), batch_size):
+        await _insert_favorite_batch(
+            collection, pending[start : start + batch_size], results
+        )
+    return results
+
+
+async def _insert_favorite_batch(
+    collection: aio.AsyncCollection, batch: list, results: list[dict]
+) -> None:
+    errors: dict = {}
+    try:
+        await collection.insert_many([doc for _, doc in batch], ordered=False)
+    except BulkWriteError as e:
+        errors = {error["index"]: error for error in e.details["writeErrors"]}
+    except PyMongoError as e:
+        errors = {
+            position: {"code": None, "errmsg": str(e)} for position in range(len(batch))
+        }
+
+    for position, (index, doc) in enumerate(batch):
+        error = errors.get(position)
+        if error is None:
+            results[index] = {"index": index, "status": "saved", "id": str(doc["_id"])}
+        elif error["code"] == 11000:
+            # saved concurrently by another request since the lookup above
+            results[index] = {"index": index, "status": "duplicate"}
+        else:
+            results[index] = {
+                "index": index,
+                "status": "error",
+                "error": error["errmsg"],
+            }
+
+
+async def save_trip(db: Database, trip: SaveForLater, user: UserDisplay) -> str:
+    """Stores the validated cart in its compact form and returns the new id.
+
+    Items are re-serialized from the schema with empty fields dropped, so
+    whatever else the client sent never reaches the collection.
+    """
+    document = {
+        "userEmail": user.email,
+        "user_id": user.id,
+        "cartItems": [
+            item.model_dump(mode="json", by_alias=True, exclude_none=True)
+            for item in trip.cart_items
+        ],
+        "createdAt": datetime.utcnow(),
+    }
+    size = len(bson.encode(document))
+    if size > settings.SAVED_TRIP_MAX_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Saved trip is {size} bytes, "
+            f"the limit is {settings.SAVED_TRIP_MAX_BYTES}",
+        )
+    result = await aio.collection(db, "saved_trips").insert_one(document)
+    return str(result.inserted_id)
+
+
+# fields the saved-trips screen renders
+SAVED_TRIP_FIELDS = {"userEmail": 1, "cartItems": 1, "createdAt": 1}
+
+
+def _saved_trips_cursor(db: Database, email: str, after: Optional[str]):
+    query: dict = {"userEmail": email}
+    if after:
+        if not ObjectId.is_valid(after):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query["_id"] = {"$lt": ObjectId(after)}
+    collection = aio.collection(db, "saved_trips")
+    return collection.find(query, SAVED_TRIP_FIELDS).sort("_id", DESCENDING)
+
+
+def _saved_trip(trip: dict) -> dict:
+    trip["id"] = str(trip.pop("_id"))
+    return trip
+
+
+async def get_saved_trips(
+    db: Database, email: str, limit: int, after: Optional[str] = None
 ):
-    Collection = db.get_collection("favorite_flights")
-    favorite_flight_data = favorite_flight.dict()
-    favorite_flight_data["user_id"] = user_id
-    result = Collection.insert_one(favorite_flight_data)
-    return result.acknowledged
+    trips = await _saved_trips_cursor(db, email, after).to_list(limit + 1)
+    next_cursor = None
+    if len(trips) > limit:
+        trips = trips[:limit]
+        next_cursor = str(trips[-1]["_id"])
+    return {"trips": [_saved_trip(trip) for trip in trips], "next_cursor": next_cursor}
+
+
+def iter_saved_trips(
+    db: Database, email: str, after: Optional[str] = None
+) -> AsyncIterator[dict]:
+    cursor = _saved_trips_cursor(db, email, after)
+
+    async def trips():
+        async for trip in cursor:
+            yield _saved_trip(trip)
+
+    return trips()
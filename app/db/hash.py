@@ -1,4 +1,9 @@
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
 from passlib.context import CryptContext
+from app.config import settings
 
 
 pwd_cxt = CryptContext(schemes="bcrypt", deprecated="auto")
@@ -12,3 +17,105 @@ class Hash:
     @staticmethod
     def verify(hashed_password, plain_password):
         return pwd_cxt.verify(plain_password, hashed_password)
+
+    @staticmethod
+    async def bcrypt_async(password: str) -> str:
+        return await get_pool().run(_bcrypt, password)
+
+    @staticmethod
+    async def verify_async(hashed_password, plain_password) -> bool:
+        return await get_pool().run(_verify, hashed_password, plain_password)
+
+
+# module-level so they can be pickled into a process pool
+def _bcrypt(password: str) -> str:
+    return Hash.bcrypt(password)
+
+
+def _verify(hashed_password, plain_password) -> bool:
+    return Hash.verify(hashed_password, plain_password)
+
+
+class HashPool:
+    """Runs bcrypt on a worker pool with a cap on hashes in flight.
+
+    bcrypt releases the GIL, so a thread pool already spreads work across
+    cores; the process pool is there for deployments that want isolation.
+    """
+
+    def __init__(self, kind: str, workers: int, max_concurrency: int):
+        self.kind = kind
+        self.workers = workers
+        self.max_concurrency = max_concurrency
+        self.executor: Executor = (
+            ProcessPoolExecutor(max_workers=workers)
+            if kind == "process"
+            else ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        )
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.max_queued = 0
+        self.total_wait = 0.0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._semaphore
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        queued_at = time.perf_counter()
+        self.queued += 1
+        self.max_queued = max(self.max_queued, self.queued)
+        async with self._get_semaphore():
+            self.queued -= 1
+            self.total_wait += time.perf_counter() - queued_at
+            self.running += 1
+            try:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self.executor, fn, *args)
+            finally:
+                self.running -= 1
+                self.completed += 1
+
+    def stats(self) -> dict:
+        return {
+            "executor": self.kind,
+            "workers": self.workers,
+            "max_concurrency": self.max_concurrency,
+            "queued": self.queued,
+            "running": self.running,
+            "completed": self.completed,
+            "max_queued": self.max_queued,
+            "avg_wait_ms": (
+                self.total_wait / self.completed * 1000 if self.completed else 0.0
+            ),
+        }
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=True)
+
+
+_pool: Optional[HashPool] = None
+
+
+def get_pool() -> HashPool:
+    global _pool
+    if _pool is None:
+        _pool = HashPool(
+            settings.HASH_EXECUTOR,
+            settings.HASH_WORKERS,
+            settings.HASH_MAX_CONCURRENCY,
+        )
+    return _pool
+
+
+def shutdown() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
@@ -0,0 +1,58 @@
+"""Indexes every collection needs, created idempotently at startup.
+
+Each entry mirrors a query in db_user or the routers; add the index here when
+adding a query that filters or sorts on a new field.
+"""
+
+import logging
+from typing import Dict, List
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.database import Database
+from pymongo.errors import PyMongoError
+from app.config import settings
+from app.db import aio
+
+logger = logging.getLogger(__name__)
+
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        IndexModel([("username", ASCENDING)], name="username_unique", unique=True),
+    ],
+    # get_saved_trips: newest trips of one user first
+    "saved_trips": [
+        IndexModel(
+            [("userEmail", ASCENDING), ("_id", DESCENDING)], name="userEmail_id"
+        ),
+    ],
+    "favorite_flights": [
+        IndexModel([("user_id", ASCENDING), ("_id", DESCENDING)], name="user_id_id"),
+        # add_favorite_flights: one copy of each flight per user
+        IndexModel(
+            [("user_id", ASCENDING), ("contentHash", ASCENDING)],
+            name="user_id_contentHash_unique",
+            unique=True,
+            partialFilterExpression={"contentHash": {"$exists": True}},
+        ),
+    ],
+    # locations.warm: most popular hotel locations first
+    settings.LOCATION_COLLECTION: [
+        IndexModel([("popularity", DESCENDING)], name="popularity"),
+    ],
+    # shared response cache: let mongod reap expired entries
+    settings.CACHE_COLLECTION: [
+        IndexModel(
+            [("expiresAt", ASCENDING)], name="expiresAt_ttl", expireAfterSeconds=0
+        ),
+    ],
+}
+
+
+async def ensure_indexes(db: Database) -> None:
+    for name, models in INDEXES.items():
+        try:
+            await aio.collection(db, name).create_indexes(models)
+        except PyMongoError as e:
+            # e.g. duplicate emails already stored; keep serving, but say so
+            logger.error("Could not create indexes on %s: %s", name, e)
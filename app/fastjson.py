@@ -0,0 +1,51 @@
+"""JSON on orjson (a declared dependency), the stdlib if it is missing.
+
+Upstream payloads such as getHotelDetails run to hundreds of KB; orjson parses
+them several times faster and into the same Python types, so callers do not
+need to know which backend is active. ``JSONArrayResponse`` sends listing
+pages whose items were serialized when they were cached.
+
+Memory: orjson first parses into a native document of about ten times the
+input size and frees it before ``loads`` returns, so the peak of a single
+parse is higher than the stdlib's (about 6 MB against 1.7 MB for a 400 KB
+getHotelDetails body, see benchmarks/bench_hotel_details.py) while the tree
+that is kept is the same. Parsing runs on the event loop thread, so a process
+holds at most one such buffer at a time.
+"""
+
+import json
+from typing import Any, List, Union
+import httpx
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None  # type: ignore[assignment]
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def response_json(response: httpx.Response) -> Any:
+    """``response.json()`` with a single parse of the raw body."""
+    return loads(response.content)
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class JSONArrayResponse(JSONResponse):
+    """Renders a list of items that are JSON text already (validated and
+    serialized when they were cached) as one array, without parsing them."""
+
+    def render(self, content: List[str]) -> bytes:
+        return f"[{','.join(content)}]".encode("utf-8")
@@ -0,0 +1,85 @@
+"""Sorting, filtering and top-k selection over cached flight results.
+
+Flight result sets (see ``app.flight_results``) expose one column of typed
+values per key:
+
+* ``price``: total price, ``None`` when upstream has no purchase link
+* ``duration``: elapsed minutes, both ways added up for a round trip
+* ``stops``: stops of the itinerary (the worse direction for a round trip)
+* ``departure``: minute of the (local) outbound departure, 0-1439
+
+Queries run over those numbers only, never the display strings, and yield
+row indexes (see ``app.result_query``), so a re-sort or a page flip is a pass
+over the cached columns rather than a new search.
+"""
+
+from typing import Dict, List, Optional, Tuple
+from fastapi import Query
+from pydantic import BaseModel
+from app import result_query
+from app.result_query import Bound
+
+SORT_KEYS = ("price", "duration", "stops", "departure")
+CLOCK_PATTERN = r"^([01]\d|2[0-3]):[0-5]\d$"
+
+
+class FlightQuery(BaseModel):
+    sort: Optional[str] = None  # one of SORT_KEYS, "-" prefix for descending
+    max_price: Optional[float] = None
+    max_stops: Optional[int] = None
+    max_duration: Optional[int] = None
+    depart_after: Optional[int] = None  # minute of day, inclusive
+    depart_before: Optional[int] = None  # minute of day, inclusive
+    offset: int = 0
+    limit: Optional[int] = None
+
+
+def clock_minutes(value: Optional[str]) -> Optional[int]:
+    if value is None:
+        return None
+    hours, minutes = value.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def flight_query(
+    sort: Optional[str] = Query(None, pattern=rf"^-?({'|'.join(SORT_KEYS)})$"),
+    max_price: Optional[float] = Query(None, ge=0),
+    max_stops: Optional[int] = Query(None, ge=0),
+    max_duration: Optional[int] = Query(None, ge=0, description="minutes"),
+    depart_after: Optional[str] = Query(None, pattern=CLOCK_PATTERN),
+    depart_before: Optional[str] = Query(None, pattern=CLOCK_PATTERN),
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
+) -> FlightQuery:
+    return FlightQuery(
+        sort=sort,
+        max_price=max_price,
+        max_stops=max_stops,
+        max_duration=max_duration,
+        depart_after=clock_minutes(depart_after),
+        depart_before=clock_minutes(depart_before),
+        offset=offset,
+        limit=limit,
+    )
+
+
+def _bounds(query: FlightQuery) -> List[Bound]:
+    bounds: List[Bound] = []
+    for key, limit in (
+        ("price", query.max_price),
+        ("stops", query.max_stops),
+        ("duration", query.max_duration),
+        ("departure", query.depart_before),
+    ):
+        if limit is not None:
+            bounds.append((key, lambda value, limit=limit: value <= limit))
+    if query.depart_after is not None:
+        bounds.append(("departure", lambda value: value >= query.depart_after))
+    return bounds
+
+
+def select(keys: Dict[str, list], query: FlightQuery) -> Tuple[int, List[int]]:
+    """Returns the number of matching rows and the indexes of the requested page."""
+    return result_query.select(
+        keys, _bounds(query), query.sort, query.offset, query.limit
+    )
@@ -0,0 +1,291 @@
+"""Compact, columnar storage for flight search results.
+
+A searchFlights response turns into hundreds of legs whose display dicts
+repeat the same long keys, carrier names and logo URLs. What we cache
+instead is one JSON-ready document of parallel lists:
+
+* ``carriers``: each ``[name, logoUrl]`` pair once; legs refer to it by index
+* ``legs``: one column per field, times as UTC epoch seconds plus the local
+  UTC offset in minutes (enough to show local clock times without parsing)
+* ``itineraries``: leg indexes (``-1`` for no return leg) and prices
+* ``keys``: the typed sort/filter columns, computed once at build time
+
+Strings are ``sys.intern``-ed, so result sets held by the in-process cache
+share one copy of every carrier and station. ``FlightResults`` reads such a
+document, exposes the typed key columns ``app.flight_query`` filters and
+sorts on, and materializes the response dicts only for the rows asked for.
+``for_document`` keeps those rows for the result sets served most recently,
+so page flips and re-sorts of a cached search reuse them.
+"""
+
+import sys
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from app.cache import TTLCache
+from app.config import settings
+from app.mapping import Field, compile_mapping
+
+ROUND_TRIP = "round_trip"
+ONE_WAY = "one_way"
+LEG_COLUMNS = (
+    "carrier",
+    "number",
+    "departure",
+    "departure_offset",
+    "arrival",
+    "arrival_offset",
+    "stops",
+    "origin",
+    "destination",
+)
+
+
+_intern = sys.intern
+
+
+_EPOCH_DAY = date(1970, 1, 1).toordinal()
+
+
+def _instant(value: str) -> Tuple[int, int]:
+    """``(epoch seconds, UTC offset in minutes)`` of an ISO 8601 timestamp."""
+    moment = datetime.fromisoformat(value)
+    offset = moment.utcoffset()
+    # naive times are UTC; arithmetic, as datetime.timestamp() is far slower
+    offset = 0 if offset is None else offset.days * 86400 + offset.seconds
+    local = (
+        (moment.toordinal() - _EPOCH_DAY) * 86400
+        + moment.hour * 3600
+        + moment.minute * 60
+        + moment.second
+    )
+    return local - offset, offset // 60
+
+
+read_leg = compile_mapping(
+    {
+        "carrier": Field("operatingCarrier.displayName", convert=_intern, only=str),
+        "logo": Field("operatingCarrier.logoUrl", convert=_intern, only=str),
+        "number": "flightNumber",
+        "departure": Field("departureDateTime", convert=_instant),
+        "arrival": Field("arrivalDateTime", convert=_instant),
+        "stops": "numStops",
+        "origin": Field("originStationCode", convert=_intern, only=str),
+        "destination": Field("destinationStationCode", convert=_intern, only=str),
+    }
+)
+
+
+def _price(flight: dict) -> Optional[float]:
+    links = flight.get("purchaseLinks")
+    return links[0].get("totalPrice") if links else None
+
+
+# display strings by minute of day; looked up for every leg of every page
+_CLOCKS = tuple(f"{minute // 60:02d}:{minute % 60:02d}" for minute in range(1440))
+# durations wrap at a day, as the display always has
+_DURATIONS = tuple(
+    f"{minute // 60:02d} h {minute % 60:02d} m" for minute in range(1440)
+)
+
+
+def _stops(count: int) -> str:
+    return "Direct" if count == 0 else f"{count} Stop(s)"
+
+
+class _Builder:
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.carriers: List[List[Optional[str]]] = []
+        self.carrier_ids: Dict[Tuple[Optional[str], Optional[str]], int] = {}
+        self.legs: Dict[str, list] = {column: [] for column in LEG_COLUMNS}
+        self.itineraries: Dict[str, list] = {"outbound": [], "price": []}
+        if kind == ROUND_TRIP:
+            self.itineraries["return"] = []
+        self.keys: Dict[str, list] = {
+            "price": self.itineraries["price"],
+            "duration": [],
+            "stops": [],
+            "departure": [],
+        }
+
+    def add_leg(self, leg: dict) -> int:
+        fields = read_leg(leg)
+        carrier = (fields["carrier"], fields["logo"])
+        if carrier not in self.carrier_ids:
+            self.carrier_ids[carrier] = len(self.carriers)
+            self.carriers.append(list(carrier))
+        columns = self.legs
+        columns["carrier"].append(self.carrier_ids[carrier])
+        columns["number"].append(fields["number"])
+        for side in ("departure", "arrival"):
+            epoch, offset = fields[side]
+            columns[side].append(epoch)
+            columns[f"{side}_offset"].append(offset)
+        columns["stops"].append(fields["stops"])
+        columns["origin"].append(fields["origin"])
+        columns["destination"].append(fields["destination"])
+        return len(columns["carrier"]) - 1
+
+    def add(self, outbound: int, price: Optional[float], back: int = -1) -> None:
+        self.itineraries["outbound"].append(outbound)
+        self.itineraries["price"].append(price)
+        if self.kind == ROUND_TRIP:
+            self.itineraries["return"].append(back)
+
+        columns = self.legs
+        legs = (outbound,) if back < 0 else (outbound, back)
+        elapsed = sum(columns["arrival"][i] - columns["departure"][i] for i in legs)
+        departure = columns["departure"][outbound]
+        departure += columns["departure_offset"][outbound] * 60
+        self.keys["duration"].append(elapsed // 60)
+        self.keys["stops"].append(max(columns["stops"][i] for i in legs))
+        self.keys["departure"].append(departure // 60 % 1440)
+
+    def dump(self) -> dict:
+        return {
+            "kind": self.kind,
+            "carriers": self.carriers,
+            "legs": self.legs,
+            "itineraries": self.itineraries,
+            # price is the itineraries column; JSON stores it twice, memory once
+            "keys": self.keys,
+        }
+
+
+def round_trip(flights: Iterable[dict]) -> dict:
+    """Cache document for searchFlights round trips, one itinerary per flight
+    (outbound and return are each the first leg of their segment)."""
+    builder = _Builder(ROUND_TRIP)
+    for flight in flights:
+        segments = flight["segments"]
+        if not segments:
+            continue
+        outbound = builder.add_leg(segments[0]["legs"][0])
+        back = builder.add_leg(segments[1]["legs"][0]) if len(segments) > 1 else -1
+        builder.add(outbound, _price(flight), back)
+    return builder.dump()
+
+
+def one_way(flights: Iterable[dict]) -> dict:
+    """Cache document for searchFlights one-way results, one row per leg."""
+    builder = _Builder(ONE_WAY)
+    for flight in flights:
+        price = _price(flight)
+        for segment in flight["segments"]:
+            for leg in segment["legs"]:
+                builder.add(builder.add_leg(leg), price)
+    return builder.dump()
+
+
+class FlightResults:
+    __slots__ = (
+        "document",
+        "kind",
+        "carriers",
+        "legs",
+        "itineraries",
+        "keys",
+        "_columns",
+        "_rows",
+    )
+
+    def __init__(self, document: dict):
+        self.document = document
+        self.kind = document["kind"]
+        self.carriers = document["carriers"]
+        self.legs = document["legs"]
+        self.itineraries = document["itineraries"]
+        # typed columns: price, duration (minutes), stops, departure (minute of
+        # day); see app.flight_query
+        self.keys: Dict[str, list] = document["keys"]
+        # bound once: rows are built a page at a time, each a few lookups
+        self._columns = tuple(self.legs[column] for column in LEG_COLUMNS)
+        self._rows: List[Optional[dict]] = [None] * len(self)
+
+    def __len__(self) -> int:
+        return len(self.itineraries["outbound"])
+
+    def _row_keys(self, row: int) -> dict:
+        return {name: column[row] for name, column in self.keys.items()}
+
+    def _leg(self, leg: int) -> dict:
+        (
+            carrier,
+            number,
+            departure,
+            departure_offset,
+            arrival,
+            arrival_offset,
+            stops,
+            origin,
+            destination,
+        ) = self._columns
+        name, logo = self.carriers[carrier[leg]]
+        departs, arrives = departure[leg], arrival[leg]
+        return {
+            "Airline Name": name,
+            "Flight Number": number[leg],
+            "Departure Time": _CLOCKS[(departs // 60 + departure_offset[leg]) % 1440],
+            "Arrival Time": _CLOCKS[(arrives // 60 + arrival_offset[leg]) % 1440],
+            "Duration": _DURATIONS[(arrives - departs) % 86400 // 60],
+            "Number of Stops": stops[leg],
+            "Airline Logo": logo,
+            "Source City Code": origin[leg],
+            "Destination City Code": destination[leg],
+        }
+
+    def row(self, row: int) -> dict:
+        built = self._rows[row]
+        if built is None:
+            built = self._rows[row] = self._build_row(row)
+        return built
+
+    def _build_row(self, row: int) -> dict:
+        itineraries = self.itineraries
+        outbound = itineraries["outbound"][row]
+        price = itineraries["price"][row]
+        if self.kind == ROUND_TRIP:
+            back = itineraries["return"][row]
+            return {
+                "outbound": self._leg(outbound),
+                "return": self._leg(back) if back >= 0 else None,
+                "price": price,
+                "keys": self._row_keys(row),
+            }
+        leg = self._leg(outbound)
+        return {
+            "Airline Name": leg["Airline Name"],
+            "Flight Number": leg["Flight Number"],
+            "Departure Time": leg["Departure Time"],
+            "Arrival Time": leg["Arrival Time"],
+            "Duration": leg["Duration"],
+            "Number of Stops": _stops(leg["Number of Stops"]),
+            "Price of Flight": price,
+            "Airline Logo": leg["Airline Logo"],
+            "keys": self._row_keys(row),
+        }
+
+    def rows(self, indexes: Optional[Iterable[int]] = None) -> List[dict]:
+        if indexes is None:
+            indexes = range(len(self))
+        return [self.row(i) for i in indexes]
+
+
+# by id() of the cached document; see for_document
+_results = TTLCache(
+    settings.FLIGHT_ROWS_CACHE_SIZE,
+    settings.CACHE_TTL_SEARCH_FLIGHTS + settings.CACHE_STALE_TTL,
+)
+
+
+def for_document(document: dict) -> FlightResults:
+    """``FlightResults`` of ``document``, shared by every request served from
+    the same cached object (the in-process cache hands out one per entry), so
+    its rows are built once. Rows are shared too: callers must not mutate
+    them."""
+    results = _results.get(id(document))
+    # the entry holds on to its document, so a live id() is never reused
+    if results is None or results.document is not document:
+        results = FlightResults(document)
+        _results.set(id(document), results)
+    return results
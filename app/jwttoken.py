@@ -1,7 +1,11 @@
+import hashlib
+import time
 from datetime import datetime, timedelta
-from pprint import pprint
-from typing import Any
+from typing import Any, Optional
+from fastapi import HTTPException, status
 from jose import JWTError, jwt
+from app.cache import TTLCache
+from app.config import settings
 
 # from main import TokenData
 
@@ -10,6 +14,9 @@ SECRET_KEY = "09d25e094faa6ca2556c818166b7a9563b93f7099f6f0f4caa6cf63b88e8d3e7"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 3000
 
+# claims of recently verified tokens, keyed by the token's SHA-256 digest
+verified_tokens = TTLCache(settings.TOKEN_CACHE_SIZE, settings.TOKEN_CACHE_TTL)
+
 
 def create_access_token(data: dict):
     to_encode = data.copy()
@@ -19,20 +26,34 @@ def create_access_token(data: dict):
     return encoded_jwt
 
 
-def verify_token(token: str, credentials_exception: Exception):
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="not authorized. Invalid Token",
+    )
+
+
+def verify_token(token: str, credentials_exception: Optional[Exception] = None):
+    digest = hashlib.sha256(token.encode()).digest()
+    claims = verified_tokens.get(digest)
+    if claims is not None:
+        return claims
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        pprint(payload)
-        email_payload: Any | None = payload.get("user_email", None)
-        id_payload: Any | None = payload.get("user_id", None)
-        if email_payload is None or not isinstance(email_payload, str):
-            print({email_payload: email_payload}, credentials_exception)
-            raise credentials_exception
-        if id_payload is None or not isinstance(id_payload, str):
-            print({id_payload: id_payload}, credentials_exception)
-            raise credentials_exception
-        return {"email": email_payload, "id": id_payload}
-        # username: str = str(username_payl)
     except JWTError:
-        print({"JWTError": str(JWTError)}, credentials_exception)
-        raise credentials_exception
+        raise credentials_exception or _credentials_exception()
+    email_payload: Any | None = payload.get("user_email", None)
+    id_payload: Any | None = payload.get("user_id", None)
+    if email_payload is None or not isinstance(email_payload, str):
+        raise credentials_exception or _credentials_exception()
+    if id_payload is None or not isinstance(id_payload, str):
+        raise credentials_exception or _credentials_exception()
+
+    claims = {"email": email_payload, "id": id_payload}
+    ttl = settings.TOKEN_CACHE_TTL
+    if "exp" in payload:
+        ttl = min(ttl, payload["exp"] - time.time())
+    if ttl > 0:
+        verified_tokens.set(digest, claims, ttl)
+    return claims
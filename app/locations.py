@@ -0,0 +1,114 @@
+"""Autocomplete over hotel locations seen in searchLocation results.
+
+Every location upstream returns is kept in a prefix index together with a
+popularity count (how many result lists it appeared in), and upserted into
+``LOCATION_COLLECTION`` so the next process starts warm. Matches are ranked
+by popularity, then by the shortest matching name.
+"""
+
+import logging
+from typing import Dict, List, Optional
+from pymongo import DESCENDING, UpdateOne
+from pymongo.database import Database
+from pymongo.errors import PyMongoError
+from app.config import settings
+from app.db import aio
+from app.search_index import SearchIndex
+
+logger = logging.getLogger(__name__)
+
+
+class LocationIndex:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.index: SearchIndex[dict] = SearchIndex()
+        self.popularity: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def add(self, loc: dict, popularity: int = 1) -> None:
+        document_id = loc["documentId"]
+        if document_id not in self.index and len(self.index) >= self.max_entries:
+            return
+        self.popularity[document_id] = self.popularity.get(document_id, 0) + popularity
+        title = loc["title"]
+        self.index.add(document_id, loc, [title, f"{title} {loc['secondaryText']}"])
+
+    def search(self, prefix: str, limit: int = 10) -> List[dict]:
+        ids = self.index.prefix_ids(prefix)
+        # stable, so equally popular entries stay shortest-name first
+        ids.sort(key=lambda document_id: -self.popularity[document_id])
+        return [self.index.get(document_id) for document_id in ids[:limit]]
+
+
+_index: Optional[LocationIndex] = None
+
+
+def get_index() -> LocationIndex:
+    global _index
+    if _index is None:
+        _index = LocationIndex(settings.LOCATION_INDEX_MAX_ENTRIES)
+    return _index
+
+
+def reset() -> None:
+    global _index
+    _index = None
+
+
+async def warm(db: Database) -> None:
+    global _index
+    index = LocationIndex(settings.LOCATION_INDEX_MAX_ENTRIES)
+    try:
+        cursor = aio.collection(db, settings.LOCATION_COLLECTION).find(
+            {}, {"title": 1, "secondaryText": 1, "popularity": 1}
+        )
+        stored = (
+            await cursor.sort("popularity", DESCENDING)
+            .limit(settings.LOCATION_INDEX_MAX_ENTRIES)
+            .to_list()
+        )
+    except PyMongoError as e:
+        logger.error("Could not load hotel locations: %s", e)
+        stored = []
+    for doc in stored:
+        index.add(
+            {
+                "title": doc["title"],
+                "documentId": doc["_id"],
+                "secondaryText": doc["secondaryText"],
+            },
+            doc.get("popularity", 0),
+        )
+    _index = index
+
+
+async def record(db: Database, locs: List[dict]) -> None:
+    """Adds an upstream result list to the index and bumps its popularity."""
+    if not locs:
+        return
+    index = get_index()
+    for loc in locs:
+        index.add(loc)
+    try:
+        await aio.collection(db, settings.LOCATION_COLLECTION).bulk_write(
+            [
+                UpdateOne(
+                    {"_id": loc["documentId"]},
+                    {
+                        "$set": {
+                            "title": loc["title"],
+                            "secondaryText": loc["secondaryText"],
+                        },
+                        "$inc": {"popularity": 1},
+                    },
+                    upsert=True,
+                )
+                for loc in locs
+            ],
+            ordered=False,
+        )
+    except PyMongoError as e:
+        # the in-process index is already updated; only persistence is lost
+        logger.error("Could not store hotel locations: %s", e)
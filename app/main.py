@@ -1,15 +1,50 @@
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 
 # from app.db.database import engine
-from app.router import user, hotel, attraction
+from app.router import user, hotel, attraction, trip, metrics
+from app.db import database, aio, indexes
+from app.db import hash as hashing
+from app import airports, locations, upstream, cache, ratelimit
 import uvicorn
 from app.config import settings
 from fastapi.middleware.cors import CORSMiddleware
 
 
 load_dotenv()
-app = FastAPI()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    db = database.connect()[settings.DATABASE_NAME]
+    if settings.MONGO_CREATE_INDEXES:
+        await indexes.ensure_indexes(db)
+    upstream.start()
+    cache.start(db)
+    airports.start()
+    if settings.LOCATION_INDEX_WARM:
+        await locations.warm(db)
+    yield
+    airports.close()
+    await upstream.close()
+    hashing.shutdown()
+    aio.shutdown()
+    database.close()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+@app.exception_handler(ratelimit.UpstreamThrottled)
+async def upstream_throttled(request: Request, exc: ratelimit.UpstreamThrottled):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after_seconds)},
+    )
+
 
 origins = [
     "0.0.0.0:3000",
@@ -21,6 +56,8 @@ origins = [
 app.include_router(user.router)
 app.include_router(hotel.router)
 app.include_router(attraction.router)
+app.include_router(trip.router)
+app.include_router(metrics.router)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
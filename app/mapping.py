@@ -0,0 +1,225 @@
+"""Declarative extraction of upstream JSON into our response shapes.
+
+A mapping names, once per output field, where its value lives in the upstream
+document::
+
+    to_booking = compile_mapping(
+        {
+            "provider_name": "booking.provider",
+            "url": "booking.url",
+        },
+        Booking,
+    )
+
+``compile_mapping`` generates a plain Python function for the declaration.
+Every path prefix is looked up once and shared by the fields below it, and a
+missing, null or wrongly typed step yields ``None`` (or the field's default)
+instead of raising. Paths are dotted keys; an integer part indexes into a
+list.
+
+Nested objects, given as a dict of rules or as another mapping, are inlined
+into the generated function. With a ``schema`` the extracted dict is validated
+once, by ``schema.model_validate``; ``.plain`` is the same extraction without
+it, for callers that serve the dicts as they are.
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+
+class Field:
+    """Value at ``path``; ``default`` replaces a missing or null value and
+    ``convert`` is applied to whatever is left. ``None`` is not converted,
+    nor, when ``only`` is given, any value that is not of that exact type."""
+
+    def __init__(
+        self,
+        path: str,
+        default: Any = None,
+        convert: Optional[Callable[[Any], Any]] = None,
+        only: Optional[type] = None,
+    ):
+        self.path = path
+        self.default = default
+        self.convert = convert
+        self.only = only
+
+
+class Each:
+    """``item`` (a mapping or a rule) applied to every element of the list at
+    ``path``; ``[]`` if there is none."""
+
+    def __init__(self, path: str, item: Any):
+        self.path = path
+        self.item = item
+
+
+class Nested:
+    """``item`` (a mapping or a dict of rules) read from the object at
+    ``path``; an absent object reads as ``{}``, or yields ``None`` when
+    ``optional``."""
+
+    def __init__(self, path: str, item: Any, optional: bool = False):
+        self.path = path
+        self.item = item
+        self.optional = optional
+
+
+Rule = Union[str, Field, Each, Nested, dict]
+Path = Tuple[Union[str, int], ...]
+
+
+def _parts(path: str) -> Path:
+    return tuple(
+        int(part) if part.isdigit() else part for part in path.split(".") if part
+    )
+
+
+class _Compiler:
+    def __init__(self, validating: bool):
+        # nested mappings are called (and so validated) rather than inlined
+        # only when no schema further up validates the whole result
+        self.validating = validating
+        self.validates = False
+        self.lines: List[str] = []
+        self.env: Dict[str, Any] = {}
+        self.names: Dict[Path, str] = {(): "src"}
+
+    def constant(self, value: Any) -> str:
+        for name, known in self.env.items():
+            if known is value:
+                return name
+        name = f"_k{len(self.env)}"
+        self.env[name] = value
+        return name
+
+    def walk(self, parts: Path) -> str:
+        for depth in range(1, len(parts) + 1):
+            key = parts[:depth]
+            if key in self.names:
+                continue
+            parent, part = self.names[key[:-1]], key[-1]
+            name = f"_v{len(self.names)}"
+            if isinstance(part, int):
+                value = (
+                    f"{parent}[{part}] "
+                    f"if {parent}.__class__ is list and len({parent}) > {part} "
+                    f"else None"
+                )
+            elif depth == 1:
+                # the source itself is checked once, on entry
+                value = f"{parent}.get({part!r})"
+            else:
+                value = (
+                    f"{parent}.get({part!r}) if {parent}.__class__ is dict else None"
+                )
+            self.lines.append(f"{name} = {value}")
+            self.names[key] = name
+        return self.names[parts]
+
+    def default(self, value: Any) -> str:
+        # fresh containers per call, so callers may mutate what they get back
+        if value == {} or value == []:
+            return repr(value)
+        return self.constant(value)
+
+    def function(self, item: Any) -> str:
+        if getattr(item, "spec", None) is not None:
+            if not self.validating or item.plain is item:
+                return self.constant(item.plain)
+            self.validates = True
+            return self.constant(item)
+        if isinstance(item, (str, Field, Each, Nested, dict)):
+            return self.constant(_compile(item, None, False))
+        raise TypeError(f"Unsupported mapping item: {item!r}")
+
+    def field(self, rule: Field, prefix: Path) -> str:
+        value = self.walk(prefix + _parts(rule.path))
+        if rule.default is not None:
+            default = self.default(rule.default)
+            value = f"({default} if {value} is None else {value})"
+        if rule.convert is None:
+            return value
+        convert = self.constant(rule.convert)
+        if rule.only is not None:
+            only = self.constant(rule.only)
+            return f"({convert}({value}) if {value}.__class__ is {only} else {value})"
+        if rule.default is not None:
+            return f"{convert}({value})"
+        return f"(None if {value} is None else {convert}({value}))"
+
+    def expression(self, rule: Rule, prefix: Path = ()) -> str:
+        if isinstance(rule, str):
+            return self.walk(prefix + _parts(rule))
+        if isinstance(rule, Field):
+            return self.field(rule, prefix)
+        if isinstance(rule, dict):
+            fields = ", ".join(
+                f"{name!r}: {self.expression(value, prefix)}"
+                for name, value in rule.items()
+            )
+            return f"{{{fields}}}"
+        if isinstance(rule, Each):
+            value = self.walk(prefix + _parts(rule.path))
+            item = self.function(rule.item)
+            return (
+                f"([{item}(x) for x in {value}] if {value}.__class__ is list else [])"
+            )
+        if isinstance(rule, Nested):
+            parts = prefix + _parts(rule.path)
+            value = self.walk(parts)
+            item = rule.item
+            if isinstance(item, dict) or (
+                getattr(item, "spec", None) is not None
+                and not (self.validating and item.schema is not None)
+            ):
+                inner = self.expression(getattr(item, "spec", item), parts)
+            else:
+                inner = f"{self.function(item)}({value})"
+            if rule.optional:
+                return f"({inner} if {value} else None)"
+            return inner
+        raise TypeError(f"Unsupported mapping rule: {rule!r}")
+
+
+def _compile(rule: Rule, schema: Optional[type], validating: bool) -> Callable:
+    compiler = _Compiler(validating and schema is None)
+    result = compiler.expression(rule)
+    if schema is not None and validating:
+        result = f"{compiler.constant(schema.model_validate)}({result})"
+        compiler.validates = True
+    body = [
+        "def extract(src):",
+        "    if src.__class__ is not dict:",
+        "        src = {}",
+        *(f"    {line}" for line in compiler.lines),
+        f"    return {result}",
+    ]
+    # constants are closure cells: cheaper to load than globals
+    source = "\n".join(
+        [
+            f"def make({', '.join(compiler.env)}):",
+            *(f"    {line}" for line in body),
+            "    return extract",
+        ]
+    )
+    namespace: Dict[str, Any] = {}
+    name = getattr(schema, "__name__", "dict")
+    exec(compile(source, f"<mapping {name}>", "exec"), namespace)
+    extract = namespace["make"](**compiler.env)
+    extract.source = source
+    extract.validates = compiler.validates
+    return extract
+
+
+def compile_mapping(
+    spec: Dict[str, Rule], schema: Optional[type] = None
+) -> Callable[[Any], Any]:
+    """A function extracting ``spec`` from an upstream object, validated by
+    ``schema`` (or by the schemas of nested mappings) if there is one;
+    ``.plain`` skips the validation."""
+    extract = _compile(spec, schema, True)
+    extract.plain = _compile(spec, schema, False) if extract.validates else extract
+    for function in {extract, extract.plain}:
+        function.spec = spec
+        function.schema = schema
+    return extract
@@ -0,0 +1,380 @@
+"""Client-side rate limiting and scheduling of upstream API calls.
+
+Every call made through the clients in ``app.upstream`` passes through
+``RateLimitedTransport``. Before a request is sent it takes a token from the
+bucket of its host and from the bucket of its ``X-RapidAPI-Key`` (all
+TripAdvisor endpoints share one key). Requests waiting for a host are served
+in priority order: interactive requests first, then ``background()`` traffic
+such as stale cache refreshes.
+
+RapidAPI reports the quota left on a key in ``X-RateLimit-*-Remaining`` /
+``-Reset`` (and ``-Limit``) response headers. Once a reported window is used
+up, calls on that key wait for its reset instead of drawing 429s. Background
+calls stop earlier: they leave ``UPSTREAM_QUOTA_BACKGROUND_RESERVE`` of each
+window to interactive ones. A 429 blocks the key for its ``Retry-After`` and
+the request is sent once more after that. A request that would queue for
+longer than ``UPSTREAM_QUEUE_MAX_WAIT`` fails at once with
+``UpstreamThrottled``, which the app answers with a 503.
+"""
+
+import asyncio
+import contextvars
+import hashlib
+import heapq
+import itertools
+import math
+import re
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+import httpx
+from app.config import settings
+
+INTERACTIVE = 0
+BACKGROUND = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+
+_priority: contextvars.ContextVar[int] = contextvars.ContextVar(
+    "upstream_priority", default=INTERACTIVE
+)
+
+# x-ratelimit-requests-remaining, x-ratelimit-remaining, ...
+_QUOTA_HEADER = re.compile(r"^x-ratelimit-(?:([a-z0-9-]+)-)?(limit|remaining|reset)$")
+
+
+class UpstreamThrottled(httpx.TransportError):
+    """An upstream call could not get its turn within the allowed queue wait."""
+
+    def __init__(self, host: str, retry_after: float):
+        super().__init__(f"Upstream rate limit reached for {host}")
+        self.host = host
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_seconds(self) -> int:
+        """``retry_after`` as a ``Retry-After`` value: whole seconds, at least 1."""
+        return max(math.ceil(self.retry_after), 1)
+
+
+def current_priority() -> int:
+    return _priority.get()
+
+
+@contextmanager
+def background() -> Iterator[None]:
+    """Upstream calls made (or tasks created) inside this block queue behind
+    interactive ones."""
+    token = _priority.set(BACKGROUND)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class TokenBucket:
+    """``rate`` tokens per second, up to ``burst``; a rate of 0 never limits."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Seconds until a token is available."""
+        if self.rate <= 0:
+            return 0.0
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def available(self, now: float) -> float:
+        self._refill(now)
+        return self.tokens
+
+    def take(self, now: float) -> None:
+        if self.rate > 0:
+            self._refill(now)
+            self.tokens -= 1
+
+
+class Quota:
+    """Quota windows of one key as last reported by upstream.
+
+    Windows are named after their headers (``requests`` for
+    ``X-RateLimit-Requests-*``, ``""`` for plain ``X-RateLimit-*``); a 429
+    adds a ``retry`` window with nothing left until ``Retry-After``.
+    """
+
+    def __init__(self):
+        # name -> [remaining, limit or None, reset (monotonic)]
+        self.windows: Dict[str, list] = {}
+
+    def update(self, headers: httpx.Headers, now: float) -> None:
+        reported: Dict[str, Dict[str, str]] = {}
+        for name, value in headers.items():
+            match = _QUOTA_HEADER.match(name.lower())
+            if match:
+                window, field = match.groups()
+                reported.setdefault(window or "", {})[field] = value
+        for window, fields in reported.items():
+            try:
+                remaining = int(fields["remaining"])
+                limit = int(fields["limit"]) if "limit" in fields else None
+                reset = float(fields.get("reset", 1))
+            except (KeyError, ValueError):
+                continue
+            self.windows[window] = [remaining, limit, now + reset]
+
+    def block(self, seconds: float, now: float) -> None:
+        self.windows["retry"] = [0, None, now + seconds]
+
+    def delay(self, now: float, priority: int) -> float:
+        """Seconds until a window with room for a call at ``priority`` resets."""
+        delay = 0.0
+        for name, (remaining, limit, reset) in list(self.windows.items()):
+            if now >= reset:
+                del self.windows[name]
+                continue
+            reserve = 0
+            if priority == BACKGROUND and limit:
+                reserve = math.floor(limit * settings.UPSTREAM_QUOTA_BACKGROUND_RESERVE)
+            if remaining <= reserve:
+                delay = max(delay, reset - now)
+        return delay
+
+    def take(self) -> None:
+        for window in self.windows.values():
+            window[0] -= 1
+
+    def stats(self, now: float) -> dict:
+        return {
+            name: {
+                "remaining": remaining,
+                "limit": limit,
+                "reset_in": round(max(reset - now, 0.0), 1),
+            }
+            for name, (remaining, limit, reset) in sorted(self.windows.items())
+        }
+
+
+class _Key:
+    def __init__(self, rate: float, burst: int):
+        self.bucket = TokenBucket(rate, burst)
+        self.quota = Quota()
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "wake")
+
+    def __init__(self, priority: int, seq: int, wake: asyncio.Future):
+        self.priority = priority
+        self.seq = seq
+        self.wake = wake
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class _Lane:
+    """Requests for one host, the head of ``waiting`` first to go."""
+
+    def __init__(self, rate: float, burst: int):
+        self.bucket = TokenBucket(rate, burst)
+        self.waiting: List[_Waiter] = []
+        self.counters: Dict[str, Dict[str, float]] = {
+            name: {"requests": 0, "throttled": 0, "wait_total": 0.0, "wait_max": 0.0}
+            for name in PRIORITY_NAMES.values()
+        }
+        self.retried = 0
+
+    def leave(self, waiter: _Waiter) -> None:
+        self.waiting.remove(waiter)
+        heapq.heapify(self.waiting)
+        if self.waiting and not self.waiting[0].wake.done():
+            self.waiting[0].wake.set_result(None)
+
+
+class RateLimiter:
+    def __init__(
+        self,
+        host_rate: float,
+        host_burst: int,
+        key_rate: float,
+        key_burst: int,
+        max_wait: float,
+    ):
+        self.host_rate = host_rate
+        self.host_burst = host_burst
+        self.key_rate = key_rate
+        self.key_burst = key_burst
+        self.max_wait = max_wait
+        self.lanes: Dict[str, _Lane] = {}
+        self.keys: Dict[str, _Key] = {}
+        self._seq = itertools.count()
+
+    def lane(self, host: str) -> _Lane:
+        lane = self.lanes.get(host)
+        if lane is None:
+            lane = self.lanes[host] = _Lane(self.host_rate, self.host_burst)
+        return lane
+
+    def key(self, api_key: Optional[str]) -> Optional[_Key]:
+        if not api_key:
+            return None
+        # only a digest is kept, so /metrics never shows the key itself
+        label = hashlib.sha256(api_key.encode()).hexdigest()[:12]
+        key = self.keys.get(label)
+        if key is None:
+            key = self.keys[label] = _Key(self.key_rate, self.key_burst)
+        return key
+
+    def _delay(self, lane: _Lane, key: Optional[_Key], priority: int) -> float:
+        now = time.monotonic()
+        delay = lane.bucket.delay(now)
+        if key is not None:
+            delay = max(delay, key.bucket.delay(now), key.quota.delay(now, priority))
+        return delay
+
+    async def acquire(self, host: str, api_key: Optional[str], priority: int) -> float:
+        """Waits for the turn of a call to ``host``; returns the seconds waited."""
+        loop = asyncio.get_running_loop()
+        lane, key = self.lane(host), self.key(api_key)
+        counters = lane.counters[PRIORITY_NAMES[priority]]
+        waiter = _Waiter(priority, next(self._seq), loop.create_future())
+        heapq.heappush(lane.waiting, waiter)
+        started = loop.time()
+        deadline = started + self.max_wait
+        try:
+            while True:
+                if lane.waiting[0] is waiter:
+                    delay = self._delay(lane, key, priority)
+                    if delay <= 0:
+                        break
+                    if loop.time() + delay > deadline:
+                        raise UpstreamThrottled(host, delay)
+                    timeout = delay
+                else:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        raise UpstreamThrottled(host, self._delay(lane, key, priority))
+                try:
+                    await asyncio.wait_for(asyncio.shield(waiter.wake), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                if waiter.wake.done():
+                    waiter.wake = loop.create_future()
+        except UpstreamThrottled:
+            counters["throttled"] += 1
+            raise
+        finally:
+            lane.leave(waiter)
+
+        now = time.monotonic()
+        lane.bucket.take(now)
+        if key is not None:
+            key.bucket.take(now)
+            key.quota.take()
+        waited = loop.time() - started
+        counters["requests"] += 1
+        counters["wait_total"] += waited
+        counters["wait_max"] = max(counters["wait_max"], waited)
+        return waited
+
+    def observe(self, api_key: Optional[str], response: httpx.Response) -> None:
+        key = self.key(api_key)
+        if key is None:
+            return
+        now = time.monotonic()
+        key.quota.update(response.headers, now)
+        if response.status_code == 429:
+            key.quota.block(retry_after(response.headers), now)
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        hosts = {}
+        for host, lane in sorted(self.lanes.items()):
+            queued = {name: 0 for name in PRIORITY_NAMES.values()}
+            for waiter in lane.waiting:
+                queued[PRIORITY_NAMES[waiter.priority]] += 1
+            hosts[host] = {"queued": queued, "retried_429": lane.retried}
+            for name, counters in lane.counters.items():
+                requests = counters["requests"]
+                hosts[host][name] = {
+                    "requests": requests,
+                    "throttled": counters["throttled"],
+                    "wait_avg_ms": round(
+                        counters["wait_total"] / requests * 1000 if requests else 0.0,
+                        1,
+                    ),
+                    "wait_max_ms": round(counters["wait_max"] * 1000, 1),
+                }
+        return {
+            "hosts": hosts,
+            "keys": {
+                label: {
+                    "tokens": round(key.bucket.available(now), 2),
+                    "quota": key.quota.stats(now),
+                }
+                for label, key in sorted(self.keys.items())
+            },
+        }
+
+
+def retry_after(headers: httpx.Headers) -> float:
+    try:
+        return max(float(headers.get("retry-after", 1)), 0.0)
+    except ValueError:  # an HTTP date; not worth parsing for a 429
+        return 1.0
+
+
+class RateLimitedTransport(httpx.AsyncBaseTransport):
+    """Sends requests through ``limiter``, resending once after a 429."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, limiter: RateLimiter):
+        self.transport = transport
+        self.limiter = limiter
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        api_key = request.headers.get("x-rapidapi-key")
+        for attempt in range(2):
+            await self.limiter.acquire(host, api_key, current_priority())
+            response = await self.transport.handle_async_request(request)
+            self.limiter.observe(api_key, response)
+            if response.status_code != 429 or attempt:
+                return response
+            await response.aclose()
+            self.limiter.lane(host).retried += 1
+        return response
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+def build_limiter() -> RateLimiter:
+    return RateLimiter(
+        host_rate=settings.UPSTREAM_RATE_PER_HOST,
+        host_burst=settings.UPSTREAM_BURST_PER_HOST,
+        key_rate=settings.UPSTREAM_RATE_PER_KEY,
+        key_burst=settings.UPSTREAM_BURST_PER_KEY,
+        max_wait=settings.UPSTREAM_QUEUE_MAX_WAIT,
+    )
+
+
+_limiter: Optional[RateLimiter] = None
+
+
+def get_limiter() -> RateLimiter:
+    global _limiter
+    if _limiter is None:
+        _limiter = build_limiter()
+    return _limiter
+
+
+def reset() -> None:
+    global _limiter
+    _limiter = None
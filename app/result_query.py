@@ -0,0 +1,199 @@
+"""Filtering, sorting and paging of cached result sets by typed key columns.
+
+A cached search keeps, next to its rows, one list per key (``keys["price"][i]``
+belongs to row ``i``). ``select`` answers a query with the row indexes of the
+requested page, so a re-sort or a page flip never repeats the upstream call
+and never re-parses display strings. ``app.flight_query`` builds its queries
+on top of this; hotels and attractions use ``ListingQuery`` below.
+
+Cached listings (hotels, attractions) are documents of the form
+``{"items": [...], "keys": {"rating": [...], "price": [...], "provider": [...]}}``
+holding the full upstream result set. With ``FAST_RESPONSES`` the items are
+validated once, when the document is built, and held as JSON text; such
+documents carry ``"serialized": true``.
+"""
+
+import heapq
+import logging
+import re
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Type
+from fastapi import Query
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+from app import fastjson
+
+Bound = Tuple[str, Callable[[Any], bool]]
+
+logger = logging.getLogger(__name__)
+
+LISTING_SORT_KEYS = ("rating", "price", "provider")
+# heap selection pays off once the rows outnumber the page end this many times
+HEAP_SELECT_RATIO = 8
+
+_PRICE = re.compile(r"\d[\d,]*(?:\.\d+)?")
+
+
+def select(
+    keys: Dict[str, list],
+    bounds: List[Bound],
+    sort: Optional[str],
+    offset: int = 0,
+    limit: Optional[int] = None,
+) -> Tuple[int, List[int]]:
+    """Returns the number of rows within ``bounds`` and the indexes of the page.
+
+    ``sort`` names a key column, with a ``-`` prefix for descending order;
+    rows without a value for it go last either way. With a ``limit`` well short
+    of the matching rows only the first ``offset + limit`` are ordered, by heap
+    selection; for a few hundred rows sorting them all is quicker.
+    """
+    rows: List[int] = list(range(len(next(iter(keys.values()), []))))
+    if bounds:
+        rows = [
+            row
+            for row in rows
+            if all(
+                keys[key][row] is not None and check(keys[key][row])
+                for key, check in bounds
+            )
+        ]
+    total = len(rows)
+    end = None if limit is None else offset + limit
+    use_heap = end is not None and end * HEAP_SELECT_RATIO < total
+
+    if sort:
+        column = keys[sort.lstrip("-")]
+        descending = sort.startswith("-")
+        if None not in column:
+            # nothing to send last: compare the values themselves, in C
+            key: Callable[[int], Any] = column.__getitem__
+        elif descending:
+            # None sorts low, so nlargest leaves it at the end
+            def key(row: int) -> Tuple[bool, Any]:
+                return (column[row] is not None, column[row])
+
+        else:
+
+            def key(row: int) -> Tuple[bool, Any]:
+                return (column[row] is None, column[row])
+
+        if not use_heap:
+            rows = sorted(rows, key=key, reverse=descending)
+        elif descending:
+            rows = heapq.nlargest(end, rows, key=key)
+        else:
+            rows = heapq.nsmallest(end, rows, key=key)
+
+    return total, rows[offset:end]
+
+
+def parse_price(display: Optional[str]) -> Optional[float]:
+    """``"$1,020"`` -> ``1020.0``; ``None`` when there is no amount.
+
+    Display prices come back in the requested currency (USD), formatted with
+    ``,`` as the thousands separator.
+    """
+    if not display:
+        return None
+    match = _PRICE.search(display)
+    return float(match.group().replace(",", "")) if match else None
+
+
+def provider_key(provider: Optional[str]) -> Optional[str]:
+    return provider.casefold() if provider else None
+
+
+def columns(rows: Iterable[dict], names: Iterable[str]) -> Dict[str, list]:
+    """Per-row key dicts turned into key columns."""
+    rows = list(rows)
+    return {name: [row[name] for row in rows] for name in names}
+
+
+def listing(
+    records: Iterable[dict],
+    transform: Callable[[dict], Any],
+    keys: Callable[[dict], dict],
+    schema: Optional[Type[BaseModel]] = None,
+) -> dict:
+    """The listing document of upstream ``records``: ``transform`` gives the
+    items, ``keys`` their sort/filter keys.
+
+    Records are converted one at a time; one that fails to convert (a
+    malformed upstream value, a validation error) is logged and left out
+    rather than failing the whole search. With a ``schema`` each item is
+    validated against it here, once, and kept as its JSON text; such a
+    document is marked ``serialized`` and its pages are sent as they are.
+    """
+    items, rows = [], []
+    for index, record in enumerate(records):
+        try:
+            item, row = transform(record), keys(record)
+            if schema is not None:
+                item = schema.model_validate(item).model_dump_json()
+        except (TypeError, ValueError) as e:
+            logger.warning("Skipping malformed result %d: %s", index, e)
+            continue
+        items.append(item)
+        rows.append(row)
+    document = {"keys": columns(rows, LISTING_SORT_KEYS)}
+    if schema is not None:
+        document.update(items=items, serialized=True)
+    else:
+        document.update(items=jsonable_encoder(items))
+    return document
+
+
+def page_items(document: dict, items: List[Any]) -> List[Any]:
+    """A page of ``document`` as JSON-ready values, whichever way it is held."""
+    if document.get("serialized"):
+        return [fastjson.loads(item) for item in items]
+    return items
+
+
+class ListingQuery(BaseModel):
+    sort: Optional[str] = None  # one of LISTING_SORT_KEYS, "-" for descending
+    min_rating: Optional[float] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    providers: List[str] = []  # any of, compared case-insensitively
+    offset: int = 0
+    limit: int = 10
+
+
+def listing_query(
+    sort: Optional[str] = Query(None, pattern=rf"^-?({'|'.join(LISTING_SORT_KEYS)})$"),
+    min_rating: Optional[float] = Query(None, ge=0),
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    provider: List[str] = Query([]),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=100),
+) -> ListingQuery:
+    return ListingQuery(
+        sort=sort,
+        min_rating=min_rating,
+        min_price=min_price,
+        max_price=max_price,
+        providers=provider,
+        offset=offset,
+        limit=limit,
+    )
+
+
+def select_listing(document: dict, query: ListingQuery) -> Tuple[int, List[Any]]:
+    """The matching count and the page of a cached listing document."""
+    bounds: List[Bound] = []
+    if query.min_rating is not None:
+        bounds.append(("rating", lambda value: value >= query.min_rating))
+    if query.min_price is not None:
+        bounds.append(("price", lambda value: value >= query.min_price))
+    if query.max_price is not None:
+        bounds.append(("price", lambda value: value <= query.max_price))
+    if query.providers:
+        wanted = {provider.casefold() for provider in query.providers}
+        bounds.append(("provider", lambda value: value in wanted))
+    total, rows = select(
+        document["keys"], bounds, query.sort, query.offset, query.limit
+    )
+    items = document["items"]
+    return total, [items[row] for row in rows]
@@ -1,24 +1,114 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from app.schemas import (
     AttractionData,
     AttractionRequest,
     TourOfferDetail,
-    PhotoUrls,
-    Booking,
-    AnimalTag,
+)
+from app import fastjson, upstream
+from app.cache import ResponseCache, get_cache
+from app.config import settings
+from app.mapping import Each, Field, Nested, compile_mapping
+from app.result_query import (
+    ListingQuery,
+    listing,
+    listing_query,
+    parse_price,
+    provider_key,
+    select_listing,
 )
 import os
 import httpx
-from typing import List
+from typing import List, Optional
 
 router = APIRouter(prefix="/attraction", tags=["attractions"])
 
 
+to_attraction = compile_mapping(
+    {
+        "location_id": "location_id",
+        "attraction_name": "name",
+        "attraction_reviews_count": Field("num_reviews", default=0, convert=int),
+        "attraction_location": "location_string",
+        "attraction_photos": {
+            size: f"photo.images.{size}.url"
+            for size in ("small", "medium", "large", "original")
+        },
+        "attraction_raw_ranking": Field("raw_ranking", default=0, convert=float),
+        "attraction_rating": "ranking",
+        "attraction_description": "description",
+        "attraction_weburl": "web_url",
+        "attraction_category": Each("subcategory", Field("name", default="")),
+        "attraction_phone": "phone",
+        "attraction_website": "website",
+        "attraction_address": "address",
+        "attraction_subtype": Each("subtype", Field("name", default="")),
+        "attraction_offer_tours": Each(
+            "offer_group.offer_list",
+            compile_mapping({field: field for field in TourOfferDetail.model_fields}),
+        ),
+        "attraction_booking": {
+            "provider_name": "booking.provider",
+            "url": "booking.url",
+        },
+        "attraction_animal_tag": Nested(
+            "animal_welfare_tag",
+            {
+                "tag": "tag_text",
+                "msg_header": "msg_header",
+                "msg_body": "msg_body",
+                "learn_more_text": "learn_more_text",
+                "education_portal_url": "education_portal_url",
+            },
+        ),
+    },
+    AttractionData,
+)
+
+
+def _lowest_offer(offers) -> Optional[float]:
+    prices = [
+        parse_price(offer.get("price")) for offer in offers if isinstance(offer, dict)
+    ]
+    prices = [price for price in prices if price is not None]
+    return min(prices) if prices else None
+
+
+# sort/filter keys, see app.result_query; rating is the raw_ranking score
+attraction_keys = compile_mapping(
+    {
+        "rating": Field("raw_ranking", convert=float),
+        "price": Field("offer_group.offer_list", default=[], convert=_lowest_offer),
+        "provider": Field("booking.provider", convert=provider_key),
+    }
+)
+
+
 @router.post("/search-attractions", response_model=List[AttractionData])
-async def search_attractions(detail: AttractionRequest):
+async def search_attractions(
+    detail: AttractionRequest,
+    response: Response,
+    query: ListingQuery = Depends(listing_query),
+    client: httpx.AsyncClient = Depends(upstream.tourist_attraction),
+    cache: ResponseCache = Depends(get_cache),
+):
+    listing = await cache.get_or_fetch(
+        "search-attractions",
+        detail,
+        lambda: fetch_attractions(detail, client),
+        settings.CACHE_TTL_SEARCH_ATTRACTIONS,
+    )
+    total, page = select_listing(listing, query)
+    headers = {"X-Total-Count": str(total)}
+    if listing.get("serialized"):
+        return fastjson.JSONArrayResponse(page, headers=headers)
+    response.headers.update(headers)
+    return page
+
+
+async def fetch_attractions(detail: AttractionRequest, client: httpx.AsyncClient):
     url = "https://tourist-attraction.p.rapidapi.com/search"
     headers = {
-        "X-RapidAPI-Key": os.getenv("X_RAPIDAPI_KEY_ATTRACTION"),
+        "X-RapidAPI-Key": os.getenv("X_RAPIDAPI_KEY_ATTRACTION") or "",
         "X-RapidAPI-Host": "tourist-attraction.p.rapidapi.com",
     }
     payload = {
@@ -27,80 +117,17 @@ async def search_attractions(detail: AttractionRequest):
         "currency": "USD",
     }
 
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            url, headers=headers, data=payload, timeout=httpx.Timeout(timeout=40.0)
-        )
+    response = await client.post(url, headers=headers, data=payload)
 
-        if response.status_code != 200:
-            print({response: response})
-            raise HTTPException(status_code=500, detail="API request failed")
+    if response.status_code != 200:
+        print({response: response})
+        raise HTTPException(status_code=500, detail="API request failed")
 
-        data = response.json()
-        attractions_data = data.get("results", {}).get("data", [])
-        filtered_data = []
-
-        for attraction in attractions_data[:10]:  # Limit to 10 attractions
-            photos = PhotoUrls(
-                small=attraction.get("photo", {})
-                .get("images", {})
-                .get("small", {})
-                .get("url"),
-                medium=attraction.get("photo", {})
-                .get("images", {})
-                .get("medium", {})
-                .get("url"),
-                large=attraction.get("photo", {})
-                .get("images", {})
-                .get("large", {})
-                .get("url"),
-                original=attraction.get("photo", {})
-                .get("images", {})
-                .get("original", {})
-                .get("url"),
-            )
-            offer_list = [
-                TourOfferDetail(**offer)
-                for offer in attraction.get("offer_group", {}).get("offer_list", [])
-            ]
-            booking_data = attraction.get("booking", {})
-            booking = Booking(
-                provider_name=booking_data.get("provider"),
-                url=booking_data.get("url"),
-            )
-            animal_data = attraction.get("animal_welfare_tag", {})
-            animal_feature = AnimalTag(
-                tag=animal_data.get("tag_text"),
-                msg_header=animal_data.get("msg_header"),
-                msg_body=animal_data.get("msg_body"),
-                learn_more_text=animal_data.get("learn_more_text"),
-                education_portal_url=animal_data.get("education_portal_url"),
-            )
-
-            filtered_data.append(
-                AttractionData(
-                    location_id=attraction.get("location_id"),
-                    attraction_name=attraction.get("name"),
-                    attraction_reviews_count=int(attraction.get("num_reviews", 0)),
-                    attraction_location=attraction.get("location_string"),
-                    attraction_photos=photos,
-                    attraction_raw_ranking=float(attraction.get("raw_ranking", 0)),
-                    attraction_rating=attraction.get("ranking"),
-                    attraction_description=attraction.get("description"),
-                    attraction_weburl=attraction.get("web_url"),
-                    attraction_category=[
-                        sub.get("name", "") for sub in attraction.get("subcategory", [])
-                    ],
-                    attraction_phone=attraction.get("phone"),
-                    attraction_website=attraction.get("website"),
-                    attraction_address=attraction.get("address"),
-                    attraction_subtype=[
-                        subs.get("name", "") for subs in attraction.get("subtype", [])
-                    ],
-                    attraction_offer_tours=offer_list,
-                    attraction_booking=booking,
-                    attraction_animal_tag=animal_feature,
-                )
-            )
-
-        return filtered_data
+    data = response.json()
+    attractions_data = data.get("results", {}).get("data", [])
+    # the whole result set, so more results and re-sorts are served from cache
+    if settings.FAST_RESPONSES:
+        return listing(
+            attractions_data, to_attraction.plain, attraction_keys, AttractionData
+        )
+    return listing(attractions_data, to_attraction, attraction_keys)
@@ -1,5 +1,5 @@
-from pprint import pprint
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.encoders import jsonable_encoder
 from app.schemas import (
     LocationSearchResponse,
     Location,
@@ -11,7 +11,6 @@ from app.schemas import (
     HotelDetailsRequest,
     HotelData,
     PhotoItem,
-    PhotoItemSizeDynamic,
     Photo,
     Price,
     Review,
@@ -19,11 +18,22 @@ from app.schemas import (
     Restaurant,
     Attraction,
     QuestionAnswer,
-    MemberProfile,
-    ProfileImage,
-    TopAnswer,
     AmenityDetail,
 )
+from pymongo.database import Database
+from app import fastjson, locations, upstream
+from app.mapping import Each, Field, Nested, compile_mapping
+from app.cache import ResponseCache, get_cache
+from app.config import settings
+from app.db.database import get_db
+from app.result_query import (
+    ListingQuery,
+    listing,
+    listing_query,
+    parse_price,
+    provider_key,
+    select_listing,
+)
 import os
 import httpx
 
@@ -35,47 +45,239 @@ router = APIRouter(
 )
 
 
+_photo_sizes = {
+    "maxHeight": "maxHeight",
+    "maxWidth": "maxWidth",
+    "urlTemplate": "urlTemplate",
+}
+
+to_hotel_card = compile_mapping(
+    {
+        "accomodation_id": "id",
+        "accomodation": "title",
+        "breakfast_info": "primaryInfo",
+        "accomodation_region": "secondaryInfo",
+        "accomodation_rating": {
+            "rating": Field("bubbleRating.rating", default=0, convert=float),
+            "count": Field("bubbleRating.count", default="0"),
+        },
+        "accomodation_provider": "provider",
+        "priceForDisplay": "priceForDisplay",
+        "strikethroughPrice": "strikethroughPrice",
+        "priceDetails": "priceDetails",
+        "priceSummary": "priceSummary",
+        "accomodation_photos": Each(
+            "cardPhotos",
+            compile_mapping({"sizes": Nested("sizes", _photo_sizes)}, PhotoItem),
+        ),
+    }
+)
+
+# sort/filter keys, see app.result_query
+hotel_keys = compile_mapping(
+    {
+        "rating": Field("bubbleRating.rating", default=0, convert=float),
+        "price": Field("priceForDisplay", convert=parse_price),
+        "provider": Field("provider", convert=provider_key),
+    }
+)
+
+to_photo = compile_mapping(_photo_sizes, Photo)
+
+_profile_image = {"profileImage": Nested("profileImage", _photo_sizes)}
+
+to_restaurant = compile_mapping(
+    {
+        "restaurant_name": "title",
+        "bubbleRating": Field("bubbleRating", default={}),
+        "restauranttype": "primaryInfo",
+        "distance": "distance",
+        "restaurantPhoto": Nested("cardPhoto", to_photo),
+    },
+    Restaurant,
+)
+
+to_nearby_attraction = compile_mapping(
+    {
+        "attraction_name": "title",
+        "bubbleRating": Field("bubbleRating", default={}),
+        "primaryInfo": "primaryInfo",
+        "distance": "distance",
+        "attractionPhoto": Nested(
+            "cardPhoto",
+            {
+                "maxHeight": Field("maxHeight", default=0),
+                "maxWidth": Field("maxWidth", default=0),
+                "urlTemplate": "urlTemplate",
+            },
+            optional=True,
+        ),
+    },
+    Attraction,
+)
+
+to_question_answer = compile_mapping(
+    {
+        "title": "title",
+        "writtenDate": "writtenDate",
+        "memberProfile": Nested("memberProfile", _profile_image, optional=True),
+        "topAnswer": Nested(
+            "topAnswer",
+            {"memberProfile": Nested("memberProfile", _profile_image)},
+            optional=True,
+        ),
+    },
+    QuestionAnswer,
+)
+
+# the sections are validated one by one: the display is cached as it is
+to_hotel_details = compile_mapping(
+    {
+        "photos": Each("photos", to_photo),
+        "accomodation_name": "title",
+        "rating": "rating",
+        "numberReviews": "numberReviews",
+        "rankingDetails": "rankingDetails",
+        "price": Nested(
+            "price",
+            compile_mapping(
+                {
+                    "displayPrice": "displayPrice",
+                    "strikeThroughPrice": "strikeThroughPrice",
+                    "status": "status",
+                    "providerName": "providerName",
+                    "freeCancellation": "freeCancellation",
+                    "pricingPeriod": "pricingPeriod",
+                },
+                Price,
+            ),
+        ),
+        "reviews": Nested(
+            "reviews",
+            compile_mapping(
+                {
+                    "title": "title",
+                    "text": "text",
+                    "bubbleRatingText": "bubbleRatingText",
+                    "publishedDate": "publishedDate",
+                    "userProfile": "userProfile",
+                    "photos": "photos",
+                },
+                Review,
+            ),
+        ),
+        "Location": Nested(
+            "location",
+            compile_mapping(
+                {
+                    "title": "title",
+                    "address": "address",
+                    "neighborhood": Field("neighborhood", default={}),
+                    "gettingThere": Field("gettingThere", default={}),
+                    "walkability": "walkability",
+                },
+                Locations,
+            ),
+        ),
+        "restaurantsNearby": Each("restaurantsNearby.content", to_restaurant),
+        "attractionsNearby": Each("attractionsNearby.content", to_nearby_attraction),
+        "qA": Each("qA.content", to_question_answer),
+        "amenitiesScreen": Each(
+            "amenitiesScreen",
+            compile_mapping(
+                {"title": "title", "content": Field("content", default=[])},
+                AmenityDetail,
+            ),
+        ),
+    }
+)
+
+
 @router.post("/search-location", response_model=LocationSearchResponse)
-async def search_location(location_data: Location):
+async def search_location(
+    location_data: Location,
+    client: httpx.AsyncClient = Depends(upstream.tripadvisor),
+    cache: ResponseCache = Depends(get_cache),
+    db: Database = Depends(get_db),
+):
+    min_results = settings.LOCATION_LOCAL_MIN_RESULTS
+    if min_results:
+        local = locations.get_index().search(
+            location_data.location, settings.LOCATION_AUTOCOMPLETE_LIMIT
+        )
+        if len(local) >= min_results:
+            return {"locs": local}
+
+    async def fetch():
+        result = await fetch_locations(location_data, client)
+        await locations.record(db, result["locs"])
+        return result
+
+    return await cache.get_or_fetch(
+        "search-location",
+        location_data,
+        fetch,
+        settings.CACHE_TTL_SEARCH_LOCATION,
+    )
+
+
+@router.get("/autocomplete-location", response_model=LocationSearchResponse)
+async def autocomplete_location(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(settings.LOCATION_AUTOCOMPLETE_LIMIT, ge=1, le=50),
+):
+    return {"locs": locations.get_index().search(q, limit)}
+
+
+async def fetch_locations(location_data: Location, client: httpx.AsyncClient):
     url = "https://tripadvisor16.p.rapidapi.com/api/v1/hotels/searchLocation"
     headers = {
-        "X-RapidAPI-Key": os.getenv("X_RAPIDAPI_KEY"),
+        "X-RapidAPI-Key": os.getenv("X_RAPIDAPI_KEY") or "",
         "X-RapidAPI-Host": "tripadvisor16.p.rapidapi.com",
     }
     params = {"query": location_data.location}
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url, headers=headers, params=params)
-        if response.status_code != 200:
-            print(response)
-
-            raise HTTPException(status_code=response.status_code, detail=response.json)
-
-        data = response.json()
-        # if response.status_code == 422:
-        #     print(data)
-        locs_data = data.get("data", [])
-
-        print(locs_data)
-        # Extract relevant hotel information and construct the response
-        locs = [
-            LocInfo(
-                title=loc["title"],
-                documentId=loc["documentId"],
-                secondaryText=loc["secondaryText"],
-            )
-            for loc in locs_data
-            # if hotel.get("trackingItems") == "hotel"
-        ]
+    response = await client.get(url, headers=headers, params=params)
+    if response.status_code != 200:
+        raise HTTPException(
+            status_code=response.status_code, detail="Error fetching locations"
+        )
 
-        return LocationSearchResponse(locs=locs)
+    data = response.json()
+    locs_data = data.get("data", [])
+
+    # Extract relevant hotel information and construct the response
+    locs = [
+        LocInfo(
+            title=loc["title"],
+            documentId=loc["documentId"],
+            secondaryText=loc["secondaryText"],
+        )
+        for loc in locs_data
+        # if hotel.get("trackingItems") == "hotel"
+    ]
+
+    return jsonable_encoder(LocationSearchResponse(locs=locs))
 
 
 @router.post("/get-hotels-filter", response_model=HotelsFilterResponse)
-async def hotels_filter(filter: HotelFilter):
+async def hotels_filter(
+    filter: HotelFilter,
+    client: httpx.AsyncClient = Depends(upstream.tripadvisor),
+    cache: ResponseCache = Depends(get_cache),
+):
+    return await cache.get_or_fetch(
+        "hotels-filter",
+        filter,
+        lambda: fetch_hotels_filter(filter, client),
+        settings.CACHE_TTL_HOTELS_FILTER,
+    )
+
+
+async def fetch_hotels_filter(filter: HotelFilter, client: httpx.AsyncClient):
     # url = "https://tripadvisor16.p.rapidapi.com/api/v1/hotels/searchLocation"
     url = "https://tripadvisor16.p.rapidapi.com/api/v1/hotels/getHotelsFilter"
     headers = {
-        "X-RapidAPI-Key": os.getenv("X_RAPIDAPI_KEY"),
+        "X-RapidAPI-Key": os.getenv("X_RAPIDAPI_KEY") or "",
         "X-RapidAPI-Host": "tripadvisor16.p.rapidapi.com",
     }
     params = {
@@ -84,36 +286,52 @@ async def hotels_filter(filter: HotelFilter):
         "checkOut": filter.checkOut,
     }
     print(f"Requesting {url} with params {params} and headers {headers}")
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            url, headers=headers, params=params, timeout=httpx.Timeout(timeout=40.0)
-        )
-        print("Response received:", response)  # Log the response data
-        if response.status_code == 200:
-            response = response.json()
-            print("data received", response)
-            if response.get("status") and "data" in response:
-                return HotelsFilterResponse(**response["data"])
-
-            elif "message" in response:
-                error_detail = "API Error: " + str(response.get("message"))
-                raise HTTPException(status_code=400, detail=error_detail)
-            else:
-                raise HTTPException(
-                    status_code=400, detail="Unexpected API response structure"
-                )
+    response = await client.get(url, headers=headers, params=params)
+    print("Response received:", response)  # Log the response data
+    if response.status_code == 200:
+        response = response.json()
+        print("data received", response)
+        if response.get("status") and "data" in response:
+            return jsonable_encoder(HotelsFilterResponse(**response["data"]))
+
+        elif "message" in response:
+            error_detail = "API Error: " + str(response.get("message"))
+            raise HTTPException(status_code=400, detail=error_detail)
         else:
-            print("Failed to fetch data:", response.text)
             raise HTTPException(
-                status_code=response.status_code, detail="API call failed"
+                status_code=400, detail="Unexpected API response structure"
             )
+    else:
+        print("Failed to fetch data:", response.text)
+        raise HTTPException(status_code=response.status_code, detail="API call failed")
 
 
 @router.post("/search-hotels", response_model=list[HotelData])
-async def search_hotels(filter: HotelDetailsRequest):
+async def search_hotels(
+    filter: HotelDetailsRequest,
+    response: Response,
+    query: ListingQuery = Depends(listing_query),
+    client: httpx.AsyncClient = Depends(upstream.tripadvisor),
+    cache: ResponseCache = Depends(get_cache),
+):
+    listing = await cache.get_or_fetch(
+        "search-hotels",
+        filter,
+        lambda: fetch_hotels(filter, client),
+        settings.CACHE_TTL_SEARCH_HOTELS,
+    )
+    total, page = select_listing(listing, query)
+    headers = {"X-Total-Count": str(total)}
+    if listing.get("serialized"):
+        return fastjson.JSONArrayResponse(page, headers=headers)
+    response.headers.update(headers)
+    return page
+
+
+async def fetch_hotels(filter: HotelDetailsRequest, client: httpx.AsyncClient):
     url = "https://tripadvisor16.p.rapidapi.com/api/v1/hotels/searchHotels"
     headers = {
-        "X-RapidAPI-Key": os.getenv("X_RAPIDAPI_KEY"),
+        "X-RapidAPI-Key": os.getenv("X_RAPIDAPI_KEY") or "",
         "X-RapidAPI-Host": "tripadvisor16.p.rapidapi.com",
     }
     params = {
@@ -122,61 +340,37 @@ async def search_hotels(filter: HotelDetailsRequest):
         "checkOut": filter.checkOut,
         "adults": filter.adults,
     }
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            url, headers=headers, params=params, timeout=httpx.Timeout(timeout=40.0)
-        )
-        print(response)
-        if response.status_code != 200:
-            raise HTTPException(
-                status_code=response.status_code, detail="API call failed"
-            )
-        data = response.json()
-        # print(data)
-        hotels_data = data.get("data", {}).get("data", [])
-        filtered_hotel_data = []
-        for hotel in hotels_data[:10]:
-            bubble_rating = {
-                "rating": float(hotel.get("bubbleRating", {}).get("rating", 0) or 0),
-                "count": hotel.get("bubbleRating", {}).get("count", "0"),
-            }
-
-            photo_items = [
-                PhotoItem(
-                    sizes=PhotoItemSizeDynamic(
-                        maxHeight=photo["sizes"]["maxHeight"],
-                        maxWidth=photo["sizes"]["maxWidth"],
-                        urlTemplate=photo["sizes"]["urlTemplate"],
-                    )
-                )
-                for photo in hotel.get("cardPhotos", [])
-            ]
-            filtered_hotel_data.append(
-                {
-                    "accomodation_id": hotel.get("id"),
-                    "accomodation": hotel.get("title"),
-                    "breakfast_info": hotel.get("primaryInfo"),
-                    "accomodation_region": hotel.get("secondaryInfo"),
-                    "accomodation_rating": bubble_rating,
-                    "accomodation_provider": hotel.get("provider"),
-                    "priceForDisplay": hotel.get("priceForDisplay"),
-                    "strikethroughPrice": hotel.get("strikethroughPrice"),
-                    "priceDetails": hotel.get("priceDetails"),
-                    "priceSummary": hotel.get("priceSummary"),
-                    "accomodation_photos": photo_items,
-                }
-            )
-        print(filtered_hotel_data)
-        return filtered_hotel_data
+    response = await client.get(url, headers=headers, params=params)
+    if response.status_code != 200:
+        raise HTTPException(status_code=response.status_code, detail="API call failed")
+    data = response.json()
+    hotels_data = data.get("data", {}).get("data", [])
+    # the whole result set, so more results and re-sorts are served from cache
+    if settings.FAST_RESPONSES:
+        return listing(hotels_data, to_hotel_card.plain, hotel_keys, HotelData)
+    return listing(hotels_data, to_hotel_card, hotel_keys)
 
     # return [HotelData(**hotel) for hotel in filtered_hotel_data]
 
 
 @router.post("/get-hotels-details", response_model=HotelDetailDisplay)
-async def hotel_details(details: HotelDetails):
+async def hotel_details(
+    details: HotelDetails,
+    client: httpx.AsyncClient = Depends(upstream.tripadvisor),
+    cache: ResponseCache = Depends(get_cache),
+):
+    return await cache.get_or_fetch(
+        "hotel-details",
+        details,
+        lambda: fetch_hotel_details(details, client),
+        settings.CACHE_TTL_HOTEL_DETAILS,
+    )
+
+
+async def fetch_hotel_details(details: HotelDetails, client: httpx.AsyncClient):
     url = "https://tripadvisor16.p.rapidapi.com/api/v1/hotels/getHotelDetails"
     headers = {
-        "X-RapidAPI-Key": os.getenv("X_RAPIDAPI_KEY"),
+        "X-RapidAPI-Key": os.getenv("X_RAPIDAPI_KEY") or "",
         "X-RapidAPI-Host": "tripadvisor16.p.rapidapi.com",
     }
     params = {
@@ -184,159 +378,14 @@ async def hotel_details(details: HotelDetails):
         "checkIn": details.checkIn,
         "checkOut": details.checkOut,
     }
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            url, headers=headers, params=params, timeout=httpx.Timeout(timeout=40.0)
+    response = await client.get(url, headers=headers, params=params)
+    # parsed once; everything below reads from this tree
+    payload = fastjson.response_json(response)
+    if response.status_code != 200 or payload.get("status") is False:
+        raise HTTPException(
+            status_code=(response.status_code if response.status_code != 200 else 500),
+            detail=payload.get("message"),
         )
-        print(response)
-        json = response.json()
-        if response.status_code != 200 or json.get("status") is False:
-            raise HTTPException(
-                status_code=(
-                    response.status_code if response.status_code != 200 else 500
-                ),
-                detail=json.get("message"),
-            )
-        print(response.json())
-        data = response.json().get("data")
-        photo_data = data.get("photos", [])
-        photos = [
-            Photo(
-                maxHeight=photo["maxHeight"],
-                maxWidth=photo["maxWidth"],
-                urlTemplate=photo["urlTemplate"],
-            )
-            for photo in photo_data
-        ]
-        price_data = data.get("price", {})
-        price = Price(
-            displayPrice=price_data.get("displayPrice"),
-            strikeThroughPrice=price_data.get("strikeThroughPrice"),
-            status=price_data.get("status"),
-            providerName=price_data.get("providerName"),
-            freeCancellation=price_data.get("freeCancellation"),
-            pricingPeriod=price_data.get("pricingPeriod"),
-        )
-        review_data = data.get("reviews", {})
-        review = Review(
-            title=review_data.get("title"),
-            text=review_data.get("text"),
-            bubbleRatingText=review_data.get("bubbleRatingText"),
-            publishedDate=review_data.get("publishedDate"),
-            userProfile=review_data.get("userProfile"),
-            photos=review_data.get("photos"),
-        )
-        location_data = data.get("location", {})
-        loc = Locations(
-            title=location_data.get("title"),
-            address=location_data.get("address"),
-            neighborhood=location_data.get("neighborhood", {}),
-            gettingThere=location_data.get("gettingThere", {}),
-            walkability=location_data.get("walkability"),
-        )
-        restaurant_data = data.get("restaurantsNearby", {}).get("content", [])
-        restaurants_nearby = [
-            Restaurant(
-                restaurant_name=restaurant.get("title"),
-                bubbleRating=restaurant.get("bubbleRating", {}),
-                restauranttype=restaurant.get("primaryInfo"),
-                distance=restaurant.get("distance"),
-                restaurantPhoto=Photo(
-                    maxHeight=restaurant.get("cardPhoto", {}).get("maxHeight"),
-                    maxWidth=restaurant.get("cardPhoto", {}).get("maxWidth"),
-                    urlTemplate=restaurant.get("cardPhoto", {}).get("urlTemplate"),
-                ),
-            )
-            for restaurant in restaurant_data
-        ]
-
-        attractions_nearby_data = data.get("attractionsNearby", {}).get("content", [])
-        attractions_nearby = [
-            Attraction(
-                attraction_name=attraction.get("title"),
-                bubbleRating=attraction.get("bubbleRating", {}),
-                primaryInfo=attraction.get("primaryInfo"),
-                distance=attraction.get("distance"),
-                attractionPhoto=(
-                    Photo(
-                        maxHeight=attraction.get("cardPhoto", {}).get("maxHeight", 0),
-                        maxWidth=attraction.get("cardPhoto", {}).get("maxWidth", 0),
-                        urlTemplate=attraction.get("cardPhoto", {}).get("urlTemplate"),
-                    )
-                    if attraction.get("cardPhoto")
-                    else None
-                ),
-            )
-            for attraction in attractions_nearby_data
-        ]
-        qa_data = data.get("qA", {}).get("content", [])
-        qas = [
-            QuestionAnswer(
-                title=qa.get("title"),
-                writtenDate=qa.get("writtenDate"),
-                memberProfile=(
-                    MemberProfile(
-                        profileImage=ProfileImage(
-                            maxHeight=qa.get("memberProfile", {})
-                            .get("profileImage", {})
-                            .get("maxHeight"),
-                            maxWidth=qa.get("memberProfile", {})
-                            .get("profileImage", {})
-                            .get("maxWidth"),
-                            urlTemplate=qa.get("memberProfile", {})
-                            .get("profileImage", {})
-                            .get("urlTemplate"),
-                        )
-                    )
-                    if qa.get("memberProfile")
-                    else None
-                ),
-                topAnswer=(
-                    TopAnswer(
-                        memberProfile=MemberProfile(
-                            profileImage=ProfileImage(
-                                maxHeight=qa.get("topAnswer", {})
-                                .get("memberProfile", {})
-                                .get("profileImage", {})
-                                .get("maxHeight"),
-                                maxWidth=qa.get("topAnswer", {})
-                                .get("memberProfile", {})
-                                .get("profileImage", {})
-                                .get("maxWidth"),
-                                urlTemplate=qa.get("topAnswer", {})
-                                .get("memberProfile", {})
-                                .get("profileImage", {})
-                                .get("urlTemplate"),
-                            )
-                        )
-                    )
-                    if qa.get("topAnswer")
-                    else None
-                ),
-            )
-            for qa in qa_data
-        ]
-        amenities_data = data.get("amenitiesScreen", [])
-        amenities = [
-            AmenityDetail(
-                title=amenity.get("title"), content=amenity.get("content", [])
-            )
-            for amenity in amenities_data
-        ]
-
-        selected_data = {
-            "photos": photos,
-            "accomodation_name": data.get("title"),
-            "rating": data.get("rating"),
-            "numberReviews": data.get("numberReviews"),
-            "rankingDetails": data.get("rankingDetails"),
-            "price": price,
-            "reviews": review,
-            "Location": loc,
-            "restaurantsNearby": restaurants_nearby,
-            "attractionsNearby": attractions_nearby,
-            "qA": qas,
-            "amenitiesScreen": amenities,
-        }
-        pprint(selected_data)
-        return selected_data
+    data = payload.get("data")
+    selected_data = to_hotel_details(data)
+    return jsonable_encoder(selected_data)
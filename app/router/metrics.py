@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends
+from app import airports, ratelimit
+from app.cache import ResponseCache, get_cache
+from app.db import hash as hashing
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+
+@router.get("/cache")
+async def cache_metrics(cache: ResponseCache = Depends(get_cache)):
+    return cache.stats()
+
+
+@router.get("/hashing")
+async def hashing_metrics():
+    return hashing.get_pool().stats()
+
+
+@router.get("/airports")
+async def airport_metrics():
+    return airports.get_index().stats()
+
+
+@router.get("/upstream")
+async def upstream_metrics():
+    return ratelimit.get_limiter().stats()
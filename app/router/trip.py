@@ -0,0 +1,193 @@
+"""One-shot trip search for the ExploreHub landing page.
+
+Runs the airport, flight, hotel, attraction and weather lookups the page used
+to request one by one as concurrent legs. Legs only wait for the airport they
+need, each gets ``TRIP_SEARCH_LEG_TIMEOUT`` seconds of its own, and a failed
+or slow leg is reported in its section instead of failing the whole search.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Dict
+import httpx
+from fastapi import APIRouter, Depends, HTTPException
+from app.schemas import (
+    AttractionRequest,
+    HotelDetailsRequest,
+    SearchFlight,
+    SearchOneWayFlight,
+    TripSearchRequest,
+)
+from app import airports, flight_results, ratelimit, upstream
+from app.cache import ResponseCache, get_cache
+from app.config import settings
+from app.result_query import ListingQuery, page_items, select_listing
+from app.router import attraction, hotel, user
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/trip", tags=["trips"])
+
+
+async def run_leg(fetch: Callable[[], Awaitable[Any]], timeout: float) -> dict:
+    started = time.perf_counter()
+    try:
+        section: Dict[str, Any] = {
+            "status": "ok",
+            "data": await asyncio.wait_for(fetch(), timeout),
+        }
+    except asyncio.TimeoutError:
+        section = {"status": "timeout", "error": f"No response within {timeout}s"}
+    except HTTPException as e:
+        section = {"status": "error", "error": str(e.detail)}
+    except airports.AmbiguousAirport as e:
+        section = {"status": "ambiguous", "error": str(e), "candidates": e.candidates}
+    except ratelimit.UpstreamThrottled as e:
+        section = user.throttled(e)
+    except Exception as e:
+        logger.warning("Trip search leg failed: %r", e)
+        section = {"status": "error", "error": str(e) or type(e).__name__}
+    section["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return section
+
+
+def skipped(needs: str) -> dict:
+    return {"status": "skipped", "error": f"No {needs} result", "elapsed_ms": 0.0}
+
+
+@router.post("/search")
+async def search_trip(
+    request: TripSearchRequest,
+    tripadvisor: httpx.AsyncClient = Depends(upstream.tripadvisor),
+    attractions_client: httpx.AsyncClient = Depends(upstream.tourist_attraction),
+    weather_client: httpx.AsyncClient = Depends(upstream.openweather),
+    cache: ResponseCache = Depends(get_cache),
+):
+    timeout = settings.TRIP_SEARCH_LEG_TIMEOUT
+
+    from_airport = asyncio.ensure_future(
+        run_leg(
+            lambda: user.resolve_airport(request.from_, tripadvisor, cache), timeout
+        )
+    )
+    to_airport = asyncio.ensure_future(
+        run_leg(lambda: user.resolve_airport(request.to_, tripadvisor, cache), timeout)
+    )
+
+    # no return flight: one-way fares and a single night at the destination
+    one_way = request.itineraryType == "ONE_WAY" or request.returnDate is None
+
+    async def flights() -> dict:
+        origin, destination = await asyncio.gather(from_airport, to_airport)
+        if origin["status"] != "ok" or destination["status"] != "ok":
+            return skipped("airport")
+
+        async def fetch_flights() -> list:
+            fields = dict(
+                sourceAirportCode=origin["data"]["airport_code"],
+                destinationAirportCode=destination["data"]["airport_code"],
+                date=request.date.isoformat(),
+                sortOrder=request.sortOrder,
+                numAdults=request.numAdults,
+                numSeniors=request.numSeniors,
+                classOfService=request.classOfService,
+            )
+            # shares the cache entries the /user flight searches re-sort
+            if one_way:
+                search = SearchOneWayFlight(itineraryType="ONE_WAY", **fields)
+                document = await cache.get_or_fetch(
+                    "search-one-way-flights",
+                    search,
+                    lambda: user.fetch_one_way_flights(search, tripadvisor),
+                    settings.CACHE_TTL_SEARCH_FLIGHTS,
+                )
+            else:
+                search = SearchFlight(
+                    itineraryType=request.itineraryType,
+                    returnDate=request.returnDate.isoformat(),
+                    **fields,
+                )
+                document = await cache.get_or_fetch(
+                    "search-round-trip-flights",
+                    search,
+                    lambda: user.fetch_round_trip_flights(search, tripadvisor),
+                    settings.CACHE_TTL_SEARCH_FLIGHTS,
+                )
+            return flight_results.for_document(document).rows()
+
+        return await run_leg(fetch_flights, timeout)
+
+    async def hotels() -> dict:
+        destination = await to_airport
+        if destination["status"] != "ok":
+            return skipped("destination airport")
+
+        async def fetch_hotels() -> list:
+            check_out = request.date + timedelta(days=1)
+            if not one_way:
+                check_out = request.returnDate
+            search = HotelDetailsRequest(
+                geoId=destination["data"]["parent_id"],
+                checkIn=request.date.isoformat(),
+                checkOut=check_out.isoformat(),
+                adults=request.numAdults + request.numSeniors,
+            )
+            listing = await cache.get_or_fetch(
+                "search-hotels",
+                search,
+                lambda: hotel.fetch_hotels(search, tripadvisor),
+                settings.CACHE_TTL_SEARCH_HOTELS,
+            )
+            return page_items(listing, select_listing(listing, ListingQuery())[1])
+
+        return await run_leg(fetch_hotels, timeout)
+
+    async def attractions() -> dict:
+        destination = await to_airport
+        if destination["status"] != "ok":
+            return skipped("destination airport")
+
+        async def fetch_attractions() -> list:
+            search = AttractionRequest(
+                location_id=str(destination["data"]["parent_id"]),
+                language=request.language,
+                currency=request.currency,
+            )
+            listing = await cache.get_or_fetch(
+                "search-attractions",
+                search,
+                lambda: attraction.fetch_attractions(search, attractions_client),
+                settings.CACHE_TTL_SEARCH_ATTRACTIONS,
+            )
+            return page_items(listing, select_listing(listing, ListingQuery())[1])
+
+        return await run_leg(fetch_attractions, timeout)
+
+    weather = run_leg(
+        lambda: user.city_weather(request.city or request.to_, weather_client, cache),
+        timeout,
+    )
+
+    names = (
+        "from_airport",
+        "to_airport",
+        "flights",
+        "hotels",
+        "attractions",
+        "weather",
+    )
+    legs = [from_airport, to_airport]
+    legs += [asyncio.ensure_future(leg) for leg in (flights(), hotels(), attractions())]
+    legs.append(asyncio.ensure_future(weather))
+    try:
+        results = await asyncio.gather(*legs)
+    except BaseException:
+        # run_leg reports leg failures; anything else must not leave legs running
+        for leg in legs:
+            leg.cancel()
+        raise
+    sections = dict(zip(names, results))
+    complete = all(section["status"] == "ok" for section in results)
+    return {"status": "complete" if complete else "partial", "sections": sections}
@@ -1,9 +1,10 @@
 from typing import List
-from typing import Annotated, Any, Dict
-from datetime import datetime
+from typing import Annotated, Any, Dict, Optional
 import pydantic
 from pydantic import HttpUrl, BaseModel
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from pymongo.database import Database
 from app.schemas import (
     UserDisplay,
@@ -15,20 +16,30 @@ from app.schemas import (
     SearchFlight,
     AirportSearchData2,
     AirportSearchData1,
+    AirportQuery,
+    AirportResolveRequest,
     FavoriteFlight,
+    FavoriteFlightResult,
+    SaveForLater,
     SearchWeather,
     SearchOneWayFlight,
+    WeatherBatchRequest,
 )
 from app.db.database import get_db
+from app.db import aio
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from app.jwttoken import verify_token
-from app import config
+from app import airports, config, ratelimit, upstream
+from app.cache import ResponseCache, get_cache
+from app import flight_results
+from app.flight_query import FlightQuery, flight_query, select
 from functools import lru_cache
 
 # from app.db.db_user import create_user, get_all_users, get_user, update_user, delete_user
 from app.db import db_user
 import os
-import requests
+import asyncio
+import json
 import logging
 import httpx
 
@@ -38,6 +49,7 @@ router = APIRouter(
     tags=["user"],
 )
 
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/user/login")
 
 logging.basicConfig(level=logging.INFO)
@@ -48,16 +60,8 @@ async def get_current_user(
     token: Annotated[str, Depends(oauth2_scheme)], db: Database = Depends(get_db)
 ):
 
-    id_email = verify_token(
-        token,
-        HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="not authorized. Invalid Token",
-        ),
-    )
-
-    user: User = await db_user.get_user(db, UserGet(id=id_email["id"]))
-    return user
+    id_email = verify_token(token)
+    return await db_user.get_user_profile(db, id_email["id"])
 
 
 @router.post(
@@ -96,31 +100,24 @@ async def read_users_me(
 
 
 @router.post("/search-from-airport")
-async def search_from_airport(airport_data: AirportSearchData1):
-    url = "https://tripadvisor16.p.rapidapi.com/api/v1/flights/searchAirport"
-    querystring = {"query": airport_data.from_}
-    headers = {
-        "X-RapidAPI-Key": os.getenv("X_RAPIDAPI_KEY") or "",
-        "X-RapidAPI-Host": os.getenv("X_RAPIDAPI_HOST") or "",
-    }
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            url,
-            headers=headers,
-            params=querystring,
-            timeout=httpx.Timeout(timeout=40.0),
-        )
-    response_data = response.json()
-    print(response_data)
+async def search_from_airport(
+    airport_data: AirportSearchData1,
+    client: httpx.AsyncClient = Depends(upstream.tripadvisor),
+    cache: ResponseCache = Depends(get_cache),
+):
     try:
-        from_parent_id = response_data["data"][0]["details"]["parent_ids"][0]
-        from_airport_code = response_data["data"][0]["airportCode"]
+        airport = await resolve_airport(airport_data.from_, client, cache)
 
-        print("From Parent ID:", from_parent_id)
-        print("From Airport Code:", from_airport_code)
+        print("From Parent ID:", airport["parent_id"])
+        print("From Airport Code:", airport["airport_code"])
 
-        return {"From_parent_id": from_parent_id, "FromAirportCode": from_airport_code}
+        return {
+            "From_parent_id": airport["parent_id"],
+            "FromAirportCode": airport["airport_code"],
+        }
 
+    except airports.AmbiguousAirport as e:
+        raise ambiguous_airport(e)
     except (IndexError, KeyError) as e:
         print(e)
         raise HTTPException(
@@ -130,39 +127,147 @@ async def search_from_airport(airport_data: AirportSearchData1):
 
 
 @router.post("/search-to-airport")
-async def search_to_airport(search_data: AirportSearchData2):
-    url = "https://tripadvisor16.p.rapidapi.com/api/v1/flights/searchAirport"
-    querystring = {"query": search_data.to_}
-    headers = {
-        "X-RapidAPI-Key": os.getenv("X_RAPIDAPI_KEY", ""),
-        "X-RapidAPI-Host": os.getenv("X_RAPIDAPI_HOST", ""),
-    }
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            url,
-            headers=headers,
-            params=querystring,
-            timeout=httpx.Timeout(timeout=40.0),
-        )
-    response_data = response.json()
-
+async def search_to_airport(
+    search_data: AirportSearchData2,
+    client: httpx.AsyncClient = Depends(upstream.tripadvisor),
+    cache: ResponseCache = Depends(get_cache),
+):
     try:
-        to_parent_id = response_data["data"][0]["details"]["parent_ids"][0]
-        to_airport_code = response_data["data"][0]["airportCode"]
+        airport = await resolve_airport(search_data.to_, client, cache)
 
-        print("To Parent ID:", to_parent_id)
-        print("To Airport Code:", to_airport_code)
+        print("To Parent ID:", airport["parent_id"])
+        print("To Airport Code:", airport["airport_code"])
 
-        return {"To_parent_id": to_parent_id, "ToAirportCode": to_airport_code}
+        return {
+            "To_parent_id": airport["parent_id"],
+            "ToAirportCode": airport["airport_code"],
+        }
 
+    except airports.AmbiguousAirport as e:
+        raise ambiguous_airport(e)
     except (IndexError, KeyError) as e:
         raise HTTPException(
             status_code=400, detail=f"Error extracting to airport information: {str(e)}"
         )
 
 
+def ambiguous_airport(error: airports.AmbiguousAirport) -> HTTPException:
+    return HTTPException(
+        status_code=400, detail={"error": str(error), "candidates": error.candidates}
+    )
+
+
+@router.post("/resolve-airports")
+async def resolve_airports(
+    request: AirportResolveRequest,
+    client: httpx.AsyncClient = Depends(upstream.tripadvisor),
+    cache: ResponseCache = Depends(get_cache),
+):
+    queries = list(dict.fromkeys(request.queries))
+    results = await asyncio.gather(
+        *(resolve_airport(query, client, cache) for query in queries),
+        return_exceptions=True,
+    )
+    resolved = dict(zip(queries, results))
+    return {
+        "airports": [
+            airport_result(query, resolved[query]) for query in request.queries
+        ]
+    }
+
+
+def airport_result(query: str, result: Any) -> dict:
+    if isinstance(result, airports.AmbiguousAirport):
+        return {"query": query, "status": "ambiguous", "candidates": result.candidates}
+    if isinstance(result, (IndexError, KeyError)):
+        return {"query": query, "status": "not_found"}
+    if isinstance(result, HTTPException):
+        return {"query": query, "status": "error", "error": result.detail}
+    if isinstance(result, ratelimit.UpstreamThrottled):
+        return throttled(result, query=query)
+    if isinstance(result, Exception):
+        return {"query": query, "status": "error", "error": str(result)}
+    return {"query": query, "status": "ok", **result}
+
+
+async def resolve_airport(
+    query: str, client: httpx.AsyncClient, cache: ResponseCache
+) -> dict:
+    """Local index first, then the cached ``fetch_airport``.
+
+    Only exact or confident local matches skip upstream; anything else is
+    looked up. When upstream finds nothing either, ``AmbiguousAirport``
+    carries the indexed entries the query is close to as a hint. Queries
+    differing only in case/spacing share a cache entry, and every upstream
+    answer is added to the local index.
+    """
+    index = airports.get_index()
+    airport = index.lookup(query)
+    if airport is not None:
+        return airport
+    normalized = AirportQuery(query=" ".join(query.split()).casefold())
+    try:
+        airport = await cache.get_or_fetch(
+            "search-airport",
+            normalized,
+            lambda: fetch_airport(normalized.query, client),
+            config.settings.CACHE_TTL_SEARCH_AIRPORT,
+        )
+    except (IndexError, KeyError):
+        candidates = index.candidates(query)
+        if candidates:
+            raise airports.AmbiguousAirport(query, candidates)
+        raise
+    index.learn(query, airport)
+    return airport
+
+
+async def fetch_airport(query: str, client: httpx.AsyncClient) -> dict:
+    """Best airport match for ``query``; IndexError/KeyError if there is none."""
+    url = "https://tripadvisor16.p.rapidapi.com/api/v1/flights/searchAirport"
+    headers = {
+        "X-RapidAPI-Key": os.getenv("X_RAPIDAPI_KEY") or "",
+        "X-RapidAPI-Host": os.getenv("X_RAPIDAPI_HOST") or "",
+    }
+    response = await client.get(url, headers=headers, params={"query": query})
+    if response.status_code != 200:
+        raise HTTPException(
+            status_code=response.status_code, detail="Error fetching airport data"
+        )
+    best = response.json()["data"][0]
+    return {
+        "parent_id": best["details"]["parent_ids"][0],
+        "airport_code": best["airportCode"],
+    }
+
+
 @router.post("/search-round-trip-flights")
-async def search_round_trip_flight(data: SearchFlight):
+async def search_round_trip_flight(
+    data: SearchFlight,
+    response: Response,
+    query: FlightQuery = Depends(flight_query),
+    client: httpx.AsyncClient = Depends(upstream.tripadvisor),
+    cache: ResponseCache = Depends(get_cache),
+):
+    try:
+        flights = await cache.get_or_fetch(
+            "search-round-trip-flights",
+            data,
+            lambda: fetch_round_trip_flights(data, client),
+            config.settings.CACHE_TTL_SEARCH_FLIGHTS,
+        )
+    except ratelimit.UpstreamThrottled:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    results = flight_results.for_document(flights)
+    total, page = select(results.keys, query)
+    response.headers["X-Total-Count"] = str(total)
+    return results.rows(page)
+
+
+async def fetch_round_trip_flights(data: SearchFlight, client: httpx.AsyncClient):
     url = "https://tripadvisor16.p.rapidapi.com/api/v1/flights/searchFlights"
     querystring = data.dict()
     headers = {
@@ -171,133 +276,115 @@ async def search_round_trip_flight(data: SearchFlight):
     }
     print(querystring)
 
-    try:
-        response = requests.get(url, headers=headers, params=querystring)
-        if response.status_code != 200:
-            raise HTTPException(
-                status_code=response.status_code, detail="Error fetching flight data"
-            )
-
-        flight_data = response.json()
-        flight_pairs = []
-        pair_info: Dict[str, Any] = {}
-
-        for flight in flight_data["data"]["flights"]:
-            pair_info = {"outbound": None, "return": None, "price": None}
-
-            if flight["segments"]:
-                outbound_leg = flight["segments"][0]["legs"][0]
-                return_leg = (
-                    flight["segments"][1]["legs"][0]
-                    if len(flight["segments"]) > 1
-                    else None
-                )
-
-                departure_time_outbound = datetime.fromisoformat(
-                    outbound_leg["departureDateTime"]
-                )
-                arrival_time_outbound = datetime.fromisoformat(
-                    outbound_leg["arrivalDateTime"]
-                )
-                duration_outbound = arrival_time_outbound - departure_time_outbound
-                hours, remainder = divmod(duration_outbound.seconds, 3600)
-                minutes, seconds = divmod(remainder, 60)
-
-                pair_info["outbound"] = {
-                    "Airline Name": outbound_leg["operatingCarrier"]["displayName"],
-                    "Flight Number": outbound_leg["flightNumber"],
-                    "Departure Time": departure_time_outbound.strftime("%H:%M"),
-                    "Arrival Time": arrival_time_outbound.strftime("%H:%M"),
-                    "Duration": f"{hours:02d} h {minutes:02d} m",
-                    "Number of Stops": outbound_leg["numStops"],
-                    "Airline Logo": outbound_leg["operatingCarrier"]["logoUrl"],
-                    "Source City Code": outbound_leg["originStationCode"],
-                    "Destination City Code": outbound_leg["destinationStationCode"],
-                }
-
-                if return_leg:
-
-                    departure_time_return = datetime.fromisoformat(
-                        return_leg["departureDateTime"]
-                    )
-                    arrival_time_return = datetime.fromisoformat(
-                        return_leg["arrivalDateTime"]
-                    )
-                    duration_return = arrival_time_return - departure_time_return
-                    hours, remainder = divmod(duration_return.seconds, 3600)
-                    minutes, seconds = divmod(remainder, 60)
-
-                    pair_info["return"] = {
-                        "Airline Name": return_leg["operatingCarrier"]["displayName"],
-                        "Flight Number": return_leg["flightNumber"],
-                        "Departure Time": departure_time_return.strftime("%H:%M"),
-                        "Arrival Time": arrival_time_return.strftime("%H:%M"),
-                        "Duration": f"{hours:02d} h {minutes:02d} m",
-                        "Number of Stops": return_leg["numStops"],
-                        "Airline Logo": return_leg["operatingCarrier"]["logoUrl"],
-                        "Source City Code": return_leg["originStationCode"],
-                        "Destination City Code": return_leg["destinationStationCode"],
-                    }
-
-                if flight["purchaseLinks"]:
-                    pair_info["price"] = flight["purchaseLinks"][0]["totalPrice"]
-
-                flight_pairs.append(pair_info)
-
-        return flight_pairs
+    response = await client.get(url, headers=headers, params=querystring)
+    if response.status_code != 200:
+        raise HTTPException(
+            status_code=response.status_code, detail="Error fetching flight data"
+        )
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    flight_data = response.json()
+    return flight_results.round_trip(flight_data["data"]["flights"])
 
 
 @router.post("/get-weather")
-async def get_weather(data: SearchWeather):
-    api_key = os.getenv("WEATHER_API_KEY") or ""
+async def get_weather(
+    data: SearchWeather,
+    client: httpx.AsyncClient = Depends(upstream.openweather),
+    cache: ResponseCache = Depends(get_cache),
+):
     query = data.dict()
     print("Query is", query)
-    city = query["city"]
-    url = f"http://api.openweathermap.org/data/2.5/weather?q={city}&appid={api_key}"
-    response = requests.get(url)
-    weather_info = []
-    if response.status_code == 200:
-        data = response.json()
-        temp = data["main"]["temp"]
-        desc = data["weather"][0]["main"]
-        feels_like = data["main"]["feels_like"]
-        humidity = data["main"]["humidity"]
-
-        weather_info.append(
-            {
-                "Temperature": temp,
-                "Description": desc,
-                "Feels": feels_like,
-                "Humidity": humidity,
-            }
-        )
-        return weather_info
-    else:
+    try:
+        return await city_weather(query["city"], client, cache)
+    except HTTPException:
         print("Error fetching weather data")
 
 
-@router.post("/add_favorite_flight", response_model=list[FavoriteFlight])
+@router.post("/get-weather/batch")
+async def get_weather_batch(
+    request: WeatherBatchRequest,
+    client: httpx.AsyncClient = Depends(upstream.openweather),
+    cache: ResponseCache = Depends(get_cache),
+):
+    """Weather for several cities; cached ones are answered without a call and
+    the rest are fetched concurrently."""
+    cities = list(dict.fromkeys(request.cities))
+    results = await asyncio.gather(
+        *(city_weather(city, client, cache) for city in cities),
+        return_exceptions=True,
+    )
+    fetched = dict(zip(cities, results))
+    return {"weather": [weather_result(city, fetched[city]) for city in request.cities]}
+
+
+def throttled(error: ratelimit.UpstreamThrottled, **fields) -> dict:
+    """Batch entry (or trip search section) for a call that could not get its
+    upstream turn; asking again after ``retry_after`` seconds may succeed."""
+    return {
+        **fields,
+        "status": "throttled",
+        "error": str(error),
+        "retry_after": error.retry_after_seconds,
+    }
+
+
+def weather_result(city: str, result: Any) -> dict:
+    if isinstance(result, HTTPException):
+        status_name = "not_found" if result.status_code == 404 else "error"
+        return {"city": city, "status": status_name, "error": result.detail}
+    if isinstance(result, ratelimit.UpstreamThrottled):
+        return throttled(result, city=city)
+    if isinstance(result, Exception):
+        return {"city": city, "status": "error", "error": str(result)}
+    return {"city": city, "status": "ok", "weather": result}
+
+
+async def city_weather(
+    city: str, client: httpx.AsyncClient, cache: ResponseCache
+) -> list:
+    """``fetch_weather`` through the cache; cities differing only in
+    case/spacing share an entry."""
+    normalized = SearchWeather(city=" ".join(city.split()).casefold())
+    return await cache.get_or_fetch(
+        "weather",
+        normalized,
+        lambda: fetch_weather(normalized.city, client),
+        config.settings.CACHE_TTL_WEATHER,
+    )
+
+
+async def fetch_weather(city: str, client: httpx.AsyncClient):
+    api_key = os.getenv("WEATHER_API_KEY") or ""
+    url = "http://api.openweathermap.org/data/2.5/weather"
+    response = await client.get(url, params={"q": city, "appid": api_key})
+    if response.status_code != 200:
+        raise HTTPException(
+            status_code=response.status_code, detail="Error fetching weather data"
+        )
+    data = response.json()
+    temp = data["main"]["temp"]
+    desc = data["weather"][0]["main"]
+    feels_like = data["main"]["feels_like"]
+    humidity = data["main"]["humidity"]
+
+    return [
+        {
+            "Temperature": temp,
+            "Description": desc,
+            "Feels": feels_like,
+            "Humidity": humidity,
+        }
+    ]
+
+
+@router.post("/add_favorite_flight", response_model=list[FavoriteFlightResult])
 async def add_favorite_flight(
     favorite_flights: list[FavoriteFlight],
-    current_user: User = Depends(get_current_user),
+    current_user: UserDisplay = Depends(get_current_user),
     db: Database = Depends(get_db),
 ):
-    results = []
-    for favorite_flight in favorite_flights:
-        flight_result = await db_user.add_favorite_flight(
-            db, favorite_flight, current_user.id
-        )
-        if flight_result:
-            results.append(favorite_flight)
-        else:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Could not save a favorite flight: {favorite_flight}",
-            )
-    if not results:
+    results = await db_user.add_favorite_flights(db, favorite_flights, current_user.id)
+    if results and all(result["status"] == "error" for result in results):
         raise HTTPException(
             status_code=500, detail="Could not save any favorite flights"
         )
@@ -305,30 +392,58 @@ async def add_favorite_flight(
 
 
 @router.post("/add_save_trip")
-async def save_for_later(request: Request, db: Database = Depends(get_db)):
+async def save_for_later(
+    trip: SaveForLater,
+    current_user: UserDisplay = Depends(get_current_user),
+    db: Database = Depends(get_db),
+):
+    if trip.user_email != current_user.email:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Cannot save a trip for another user",
+        )
     try:
-        request_json = await request.json()
-        user_email = request_json.get("userEmail")
-        users_collection = db["users"]
-        user = users_collection.find_one({"email": user_email})
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-        user_id_str = str(user["_id"])
-        request_json["user_id"] = user_id_str
-        saved_trips_collection = db["saved_trips"]
-        insert_result = saved_trips_collection.insert_one(request_json)
+        trip_id = await db_user.save_trip(db, trip, current_user)
 
         return {
             "message": "Trip saved successfully",
-            "id": str(insert_result.inserted_id),
+            "id": trip_id,
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
 
 
 @router.post("/search-one-way-flights")
-async def search_one_way_flight(data: SearchOneWayFlight):
+async def search_one_way_flight(
+    data: SearchOneWayFlight,
+    response: Response,
+    query: FlightQuery = Depends(flight_query),
+    client: httpx.AsyncClient = Depends(upstream.tripadvisor),
+    cache: ResponseCache = Depends(get_cache),
+):
+    try:
+        flights = await cache.get_or_fetch(
+            "search-one-way-flights",
+            data,
+            lambda: fetch_one_way_flights(data, client),
+            config.settings.CACHE_TTL_SEARCH_FLIGHTS,
+        )
+
+    except ratelimit.UpstreamThrottled:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    results = flight_results.for_document(flights)
+    total, page = select(results.keys, query)
+    response.headers["X-Total-Count"] = str(total)
+    return results.rows(page)
+
+
+async def fetch_one_way_flights(data: SearchOneWayFlight, client: httpx.AsyncClient):
     url = "https://tripadvisor16.p.rapidapi.com/api/v1/flights/searchFlights"
     querystring = data.dict()
     headers = {
@@ -337,98 +452,65 @@ async def search_one_way_flight(data: SearchOneWayFlight):
     }
     print(querystring)
 
-    try:
-        response = requests.get(url, headers=headers, params=querystring)
-        if response.status_code != 200:
-            raise HTTPException(
-                status_code=response.status_code, detail="Error fetching flight data"
-            )
-
-        data = response.json()
-        flights_info = []
-
-        if "data" in data and "flights" in data["data"]:
-            for flight in data["data"]["flights"]:
-                for segment in flight["segments"]:
-                    for leg in segment["legs"]:
-                        airline_name = leg["operatingCarrier"]["displayName"]
-                        flight_number = leg["flightNumber"]
-                        departure_time_str = leg["departureDateTime"]
-                        departure_with_tz = datetime.strptime(
-                            departure_time_str, "%Y-%m-%dT%H:%M:%S%z"
-                        )
-                        final_departure_time = departure_with_tz.strftime("%H:%M")
-
-                        arrival_time_str = leg["arrivalDateTime"]
-                        arrival_with_tz = datetime.strptime(
-                            arrival_time_str, "%Y-%m-%dT%H:%M:%S%z"
-                        )
-                        final_arrival_time = arrival_with_tz.strftime("%H:%M")
-
-                        time_taken = arrival_with_tz - departure_with_tz
-                        hours, remainder = divmod(time_taken.seconds, 3600)
-                        minutes, _ = divmod(remainder, 60)
-
-                        number_of_stops = (
-                            "Direct"
-                            if leg["numStops"] == 0
-                            else f"{leg['numStops']} Stop(s)"
-                        )
-
-                        airline_logo = leg["operatingCarrier"]["logoUrl"]
-
-                        flights_info.append(
-                            {
-                                "Airline Name": airline_name,
-                                "Flight Number": flight_number,
-                                "Departure Time": final_departure_time,
-                                "Arrival Time": final_arrival_time,
-                                "Duration": f"{hours:02d} h {minutes:02d} m",
-                                "Number of Stops": number_of_stops,
-                                "Price of Flight": flight["purchaseLinks"][0][
-                                    "totalPrice"
-                                ],
-                                "Airline Logo": airline_logo,
-                            }
-                        )
-
-        return flights_info
+    response = await client.get(url, headers=headers, params=querystring)
+    if response.status_code != 200:
+        raise HTTPException(
+            status_code=response.status_code, detail="Error fetching flight data"
+        )
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    data = response.json()
+    return flight_results.one_way(data.get("data", {}).get("flights", []))
 
 
 @router.get("/get_saved_trips/", status_code=status.HTTP_200_OK)
 @router.get("/get_saved_trips", status_code=status.HTTP_200_OK)
 async def get_saved_trips(
-    current_user: User = Depends(get_current_user),
+    limit: int = Query(
+        config.settings.SAVED_TRIPS_PAGE_SIZE,
+        ge=1,
+        le=config.settings.SAVED_TRIPS_MAX_PAGE_SIZE,
+    ),
+    after: Optional[str] = None,
+    current_user: UserDisplay = Depends(get_current_user),
     db: Database = Depends(get_db),
 ):
 
     try:
         logger.info("Fetching user's saved trips")
-        saved_trips_collection = db["saved_trips"]
         logger.info(f"Looking up trips for user email: {current_user.email}")
-        saved_trips_cursor = saved_trips_collection.find(
-            {"userEmail": current_user.email}
-        )
-
-        saved_trips = list(saved_trips_cursor)
+        page = await db_user.get_saved_trips(db, current_user.email, limit, after)
 
-        logger.info(f"Number of trips found: {len(saved_trips)}")
-        for trip in saved_trips:
-            trip.pop("_id", None)
+        logger.info(f"Number of trips found: {len(page['trips'])}")
 
-        return {"message": "Saved trips fetched successfully", "trips": saved_trips}
+        return {"message": "Saved trips fetched successfully", **page}
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"An error occurred: {str(e)}")
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
 
 
+@router.get("/get_saved_trips/stream", status_code=status.HTTP_200_OK)
+async def stream_saved_trips(
+    after: Optional[str] = None,
+    current_user: UserDisplay = Depends(get_current_user),
+    db: Database = Depends(get_db),
+):
+    trips = db_user.iter_saved_trips(db, current_user.email, after)
+
+    async def ndjson():
+        async for trip in trips:
+            yield json.dumps(jsonable_encoder(trip)) + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
 # read one user
 @router.get("/{id}", response_model=UserDisplay)
-async def get_user(id: str, current_user: Annotated[User, Depends(get_current_user)]):
+async def get_user(
+    id: str, current_user: Annotated[UserDisplay, Depends(get_current_user)]
+):
     if id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -1,4 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field, HttpUrl, AnyHttpUrl
+import datetime
 import re
 from typing import List, Optional, Union
 
@@ -75,6 +76,14 @@ class AirportSearchData2(BaseModel):
     to_: str
 
 
+class AirportQuery(BaseModel):
+    query: str
+
+
+class AirportResolveRequest(BaseModel):
+    queries: list[str] = Field(..., min_length=1, max_length=20)
+
+
 # Flight Search Model
 class SearchFlight(BaseModel):
     sourceAirportCode: str
@@ -104,10 +113,21 @@ class FavoriteFlight(BaseModel):
     total_price: float
 
 
+class FavoriteFlightResult(BaseModel):
+    index: int
+    status: str  # "saved", "duplicate" or "error"
+    id: Optional[str] = None
+    error: Optional[str] = None
+
+
 class SearchWeather(BaseModel):
     city: str
 
 
+class WeatherBatchRequest(BaseModel):
+    cities: list[str] = Field(..., min_length=1, max_length=20)
+
+
 class Location(BaseModel):
     location: str
 
@@ -320,16 +340,18 @@ class HotelDetailDisplay(BaseModel):
     amenitiesScreen: Optional[List[AmenityDetail]] = None
 
 
+# flight search rows as the client holds them: round-trip legs count their
+# stops, one-way rows carry the display string and no city codes
 class FlightDetails(BaseModel):
-    airline_name: str = Field(..., alias="Airline Name")
-    flight_number: int = Field(..., alias="Flight Number")
-    departure_time: str = Field(..., alias="Departure Time")
-    arrival_time: str = Field(..., alias="Arrival Time")
-    duration: str = Field(..., alias="Duration")
-    number_of_stops: int = Field(..., alias="Number of Stops")
-    airline_logo: HttpUrl = Field(..., alias="Airline Logo")
-    source_city_code: str = Field(..., alias="Source City Code")
-    destination_city_code: str = Field(..., alias="Destination City Code")
+    airline_name: Optional[str] = Field(None, alias="Airline Name")
+    flight_number: Optional[int] = Field(None, alias="Flight Number")
+    departure_time: Optional[str] = Field(None, alias="Departure Time")
+    arrival_time: Optional[str] = Field(None, alias="Arrival Time")
+    duration: Optional[str] = Field(None, alias="Duration")
+    number_of_stops: Optional[Union[int, str]] = Field(None, alias="Number of Stops")
+    airline_logo: Optional[HttpUrl] = Field(None, alias="Airline Logo")
+    source_city_code: Optional[str] = Field(None, alias="Source City Code")
+    destination_city_code: Optional[str] = Field(None, alias="Destination City Code")
 
     class Config:
         json_encoders = {
@@ -341,18 +363,19 @@ class AccommodationPhoto(BaseModel):
     sizes: dict
 
 
+# hotel search cards, where any upstream value may be null
 class HotelsData(BaseModel):
-    accomodation_id: str
-    accomodation: str
-    breakfast_info: str
-    accomodation_region: str
-    accomodation_rating: dict
-    accomodation_provider: str
-    priceForDisplay: str
+    accomodation_id: Optional[str] = None
+    accomodation: Optional[str] = None
+    breakfast_info: Optional[str] = None
+    accomodation_region: Optional[str] = None
+    accomodation_rating: Optional[dict] = None
+    accomodation_provider: Optional[str] = None
+    priceForDisplay: Optional[str] = None
     strikethroughPrice: Optional[str] = None
-    priceDetails: str
+    priceDetails: Optional[str] = None
     priceSummary: Optional[str] = None
-    accomodation_photos: List[AccommodationPhoto]
+    accomodation_photos: List[AccommodationPhoto] = []
 
 
 class CartItem(BaseModel):
@@ -428,6 +451,21 @@ class AttractionRequest(BaseModel):
     currency: str
 
 
+class TripSearchRequest(BaseModel):
+    from_: str
+    to_: str
+    date: datetime.date
+    returnDate: Optional[datetime.date] = None
+    itineraryType: str = "ROUND_TRIP"
+    sortOrder: str = "PRICE"
+    numAdults: int = 1
+    numSeniors: int = 0
+    classOfService: str = "ECONOMY"
+    city: Optional[str] = None  # weather location, defaults to to_
+    language: str = "en_US"
+    currency: str = "USD"
+
+
 class SearchOneWayFlight(BaseModel):
     sourceAirportCode: str
     destinationAirportCode: str
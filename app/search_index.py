@@ -0,0 +1,114 @@
+"""In-process text index for short names (airports, cities, hotel locations).
+
+Keys are normalized (case, accents and punctuation folded) and kept in a
+sorted list, so a prefix lookup is two bisections. A trigram inverted index
+over the same keys answers typo-tolerant lookups ranked by Jaccard
+similarity. Everything lives in plain dicts and lists; a lookup against a few
+thousand names takes microseconds.
+"""
+
+import re
+import unicodedata
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+from typing import Dict, Generic, Iterable, List, Set, Tuple, TypeVar
+
+T = TypeVar("T")
+
+_WORD = re.compile(r"[^\W_]+")
+
+
+def normalize(text: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(_WORD.findall(stripped))
+
+
+def trigrams(key: str) -> Set[str]:
+    padded = f"  {key} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex(Generic[T]):
+    def __init__(self):
+        self._items: Dict[str, T] = {}
+        self._keys: List[str] = []
+        self._key_ids: Dict[str, Set[str]] = defaultdict(set)
+        self._key_trigrams: Dict[str, int] = {}
+        self._trigram_keys: Dict[str, Set[str]] = defaultdict(set)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self._items
+
+    def get(self, item_id: str) -> T:
+        return self._items[item_id]
+
+    def items(self) -> Iterable[Tuple[str, T]]:
+        return self._items.items()
+
+    def keys_of(self, item_id: str) -> List[str]:
+        return [key for key, ids in self._key_ids.items() if item_id in ids]
+
+    def add(self, item_id: str, item: T, keys: Iterable[str]) -> None:
+        """Stores ``item`` (replacing an older one) and indexes it under ``keys``."""
+        self._items[item_id] = item
+        for text in keys:
+            key = normalize(text)
+            if not key:
+                continue
+            if key not in self._key_ids:
+                insort(self._keys, key)
+                grams = trigrams(key)
+                self._key_trigrams[key] = len(grams)
+                for gram in grams:
+                    self._trigram_keys[gram].add(key)
+            self._key_ids[key].add(item_id)
+
+    def exact(self, text: str) -> List[T]:
+        return [self._items[i] for i in sorted(self._key_ids.get(normalize(text), ()))]
+
+    def prefix_keys(self, text: str) -> List[str]:
+        """Normalized keys starting with ``text``, shortest first."""
+        key = normalize(text)
+        if not key:
+            return []
+        start = bisect_left(self._keys, key)
+        end = bisect_left(self._keys, key + "\uffff", start)
+        return sorted(self._keys[start:end], key=len)
+
+    def prefix_ids(self, text: str) -> List[str]:
+        """Ids of items with a key starting with ``text``, shortest key first."""
+        ids: Dict[str, None] = {}
+        for match in self.prefix_keys(text):
+            for item_id in sorted(self._key_ids[match]):
+                ids.setdefault(item_id)
+        return list(ids)
+
+    def prefix(self, text: str, limit: int = 10) -> List[T]:
+        return [self._items[i] for i in self.prefix_ids(text)[:limit]]
+
+    def fuzzy(
+        self, text: str, min_similarity: float = 0.5, limit: int = 5
+    ) -> List[Tuple[float, T]]:
+        """Items whose closest key shares enough trigrams with ``text``."""
+        key = normalize(text)
+        if not key:
+            return []
+        grams = trigrams(key)
+        shared: Counter = Counter()
+        for gram in grams:
+            shared.update(self._trigram_keys.get(gram, ()))
+
+        best: Dict[str, float] = {}
+        for candidate, common in shared.items():
+            score = common / (len(grams) + self._key_trigrams[candidate] - common)
+            if score < min_similarity:
+                continue
+            for item_id in self._key_ids[candidate]:
+                if score > best.get(item_id, 0.0):
+                    best[item_id] = score
+        ranked = sorted(best.items(), key=lambda entry: (-entry[1], entry[0]))
+        return [(score, self._items[i]) for i, score in ranked[:limit]]
@@ -0,0 +1,153 @@
+import asyncio
+import re
+import httpx
+import pytest
+from bson import ObjectId
+from mongomock import MongoClient
+from app.main import app
+from app import airports, locations, upstream, cache, jwttoken, ratelimit
+from app.config import settings
+from app.db import db_user
+from app.db.database import get_db
+from app.jwttoken import create_access_token
+
+# the suite runs against mongomock; there is no mongod to build indexes on
+settings.MONGO_CREATE_INDEXES = False
+# start every test with an empty airport index so lookups reach the mocks
+settings.AIRPORT_SNAPSHOT_PATH = ""
+settings.LOCATION_INDEX_WARM = False
+
+
+class MockUpstream:
+    """Stand-in for the upstream APIs, registered like ``responses.add``."""
+
+    def __init__(self):
+        self.routes = []
+        self.calls = []
+
+    def add(self, method, url, json=None, status=200, latency=0.0, headers=None):
+        self.routes.append((method, url, json, status, latency, headers))
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        self.calls.append(request)
+        url = str(request.url.copy_with(query=None))
+        for method, pattern, json, status, latency, headers in self.routes:
+            if method != request.method:
+                continue
+            if isinstance(pattern, re.Pattern):
+                matched = pattern.match(str(request.url))
+            else:
+                matched = pattern == url
+            if matched:
+                if latency:
+                    await asyncio.sleep(latency)
+                return httpx.Response(status, json=json, headers=headers)
+        raise httpx.ConnectError(f"No mock registered for {request.method} {url}")
+
+    def client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=httpx.MockTransport(self.handler))
+
+
+@pytest.fixture(autouse=True)
+def fresh_caches():
+    cache.reset()
+    airports.reset()
+    locations.reset()
+    db_user.user_profiles.clear()
+    jwttoken.verified_tokens.clear()
+    ratelimit.reset()
+    yield
+    cache.reset()
+    airports.reset()
+    locations.reset()
+    db_user.user_profiles.clear()
+    jwttoken.verified_tokens.clear()
+    ratelimit.reset()
+
+
+@pytest.fixture
+def mock_upstream():
+    mock = MockUpstream()
+    client = mock.client()
+    for dependency in (
+        upstream.tripadvisor,
+        upstream.tourist_attraction,
+        upstream.openweather,
+    ):
+        app.dependency_overrides[dependency] = lambda: client
+    yield mock
+    for dependency in (
+        upstream.tripadvisor,
+        upstream.tourist_attraction,
+        upstream.openweather,
+    ):
+        app.dependency_overrides.pop(dependency, None)
+
+
+class Ticker:
+    """Counts 5 ms sleeps of a background task while the ``with`` block runs;
+    few ticks mean the block held the event loop."""
+
+    def __init__(self):
+        self.ticks = 0
+        self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(0.005)
+            self.ticks += 1
+
+    def __enter__(self) -> "Ticker":
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._task.cancel()
+
+
+@pytest.fixture
+def ticker():
+    return Ticker()
+
+
+@pytest.fixture
+def mock_db():
+    mongo = MongoClient()
+    db = mongo["test_database"]
+    yield db
+    mongo.close()
+
+
+@pytest.fixture
+def override_get_db(mock_db):
+    async def _override_get_db():
+        return mock_db
+
+    app.dependency_overrides[get_db] = _override_get_db
+    yield
+    app.dependency_overrides.pop(get_db, None)
+
+
+@pytest.fixture
+def user(mock_db):
+    """A stored user and the headers of a token issued to them."""
+    user_id = ObjectId()
+    email = "john.doe@example.com"
+    mock_db["users"].insert_one(
+        {
+            "_id": user_id,
+            "firstname": "John",
+            "lastname": "Doe",
+            "username": "johndoe",
+            "email": email,
+            "mobile": "1234567890",
+            "country": "USA",
+            "password": "hashed_password",
+        }
+    )
+    token = create_access_token(data={"user_email": email, "user_id": str(user_id)})
+    return {
+        "id": str(user_id),
+        "email": email,
+        "headers": {"Authorization": f"Bearer {token}"},
+    }
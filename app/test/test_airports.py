@@ -0,0 +1,149 @@
+from pathlib import Path
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app import airports
+from app.airports import AirportIndex
+from app.search_index import SearchIndex, normalize
+
+client = TestClient(app)
+
+SNAPSHOT = str(Path(airports.__file__).parent / "data" / "airports.csv")
+
+
+@pytest.fixture
+def index():
+    return AirportIndex.load(SNAPSHOT)
+
+
+def test_normalize_folds_case_accents_and_punctuation():
+    assert normalize("  São-Paulo, BR ") == "sao paulo br"
+    assert normalize("Washington D.C.") == "washington d c"
+
+
+def test_search_index_prefix_and_fuzzy():
+    index: SearchIndex[str] = SearchIndex()
+    index.add("1", "San Francisco", ["San Francisco"])
+    index.add("2", "San Diego", ["San Diego"])
+    index.add("3", "Santiago", ["Santiago"])
+
+    assert index.prefix("san") == ["Santiago", "San Diego", "San Francisco"]
+    assert index.prefix("san d") == ["San Diego"]
+    assert index.prefix("x") == []
+    assert index.fuzzy("San Fransisco")[0][1] == "San Francisco"
+    assert index.fuzzy("Tokyo") == []
+
+
+def test_snapshot_lookups(index):
+    assert index.lookup("Paris") == {"parent_id": 187147, "airport_code": "PAR"}
+    assert index.lookup("new york")["airport_code"] == "NYC"
+    assert index.lookup("lax")["airport_code"] == "LAX"
+    assert index.lookup("Washington, D.C.")["airport_code"] == "WAS"
+    # long enough unique prefix and close typo
+    assert index.lookup("Barcel")["airport_code"] == "BCN"
+    assert index.lookup("Amsterdamm")["airport_code"] == "AMS"
+    # unknown and too-short queries are misses
+    assert index.lookup("Reykjavik") is None
+    assert index.lookup("B") is None
+    assert index.stats() == {
+        "entries": 18,
+        "exact": 4,
+        "prefix": 1,
+        "fuzzy": 1,
+        "misses": 2,
+    }
+
+
+def test_learned_queries_survive_a_snapshot_round_trip(index, tmp_path):
+    index.learn("Reykjavík", {"parent_id": 189970, "airport_code": "REK"})
+    assert index.lookup("reykjavik")["airport_code"] == "REK"
+
+    path = tmp_path / "airports.csv"
+    index.save(str(path))
+    reloaded = AirportIndex.load(str(path))
+    assert len(reloaded) == len(index)
+    assert reloaded.lookup("Reykjavik") == {"parent_id": 189970, "airport_code": "REK"}
+    assert reloaded.lookup("Washington DC")["airport_code"] == "WAS"
+
+
+def test_resolution_skips_upstream_for_indexed_cities(mock_upstream, monkeypatch):
+    monkeypatch.setattr(airports.settings, "AIRPORT_SNAPSHOT_PATH", SNAPSHOT)
+    mock_upstream.add(
+        "GET",
+        "https://tripadvisor16.p.rapidapi.com/api/v1/flights/searchAirport",
+        json={"data": [{"details": {"parent_ids": [1]}, "airportCode": "XYZ"}]},
+    )
+
+    response = client.post(
+        "/user/resolve-airports", json={"queries": ["Paris", "London", "Nowhere"]}
+    )
+    codes = [a["airport_code"] for a in response.json()["airports"]]
+    assert codes == ["PAR", "LON", "XYZ"]
+    assert len(mock_upstream.calls) == 1
+
+    # the upstream answer was learned
+    response = client.post("/user/search-from-airport", json={"from_": "nowhere"})
+    assert response.json() == {"From_parent_id": 1, "FromAirportCode": "XYZ"}
+    assert len(mock_upstream.calls) == 1
+
+
+def test_near_misses_are_candidates_not_matches(index):
+    # look-alikes and short prefixes never resolve on their own
+    for query in ("Parish", "Pariss", "Bar", "San", "Los Angelos"):
+        assert index.lookup(query) is None, query
+    assert [c["airport_code"] for c in index.candidates("Parish")] == ["PAR"]
+    assert index.candidates("Los Angelos") == [
+        {"parent_id": 32655, "airport_code": "LAX", "name": "Los Angeles"}
+    ]
+    # a unique prefix must cover most of the name
+    assert [c["airport_code"] for c in index.candidates("Bar")] == ["BCN"]
+    assert index.lookup("Barc") is None
+    assert index.lookup("Barcel")["airport_code"] == "BCN"
+    assert index.candidates("Reykjavik") == []
+
+
+AIRPORT_URL = "https://tripadvisor16.p.rapidapi.com/api/v1/flights/searchAirport"
+
+
+def test_near_misses_go_upstream(mock_upstream, monkeypatch):
+    monkeypatch.setattr(airports.settings, "AIRPORT_SNAPSHOT_PATH", SNAPSHOT)
+    mock_upstream.add(
+        "GET",
+        AIRPORT_URL,
+        json={"data": [{"details": {"parent_ids": [2]}, "airportCode": "SAN"}]},
+    )
+
+    # an exact IATA code missing from the snapshot ("SAN" looks like SFO's
+    # "San Francisco") and multi-word names next to indexed cities
+    queries = ["SAN", "Miami Beach", "Paris Orly", "Washington Dulles"]
+    response = client.post("/user/resolve-airports", json={"queries": queries})
+
+    assert [a["status"] for a in response.json()["airports"]] == ["ok"] * 4
+    assert [call.url.params["query"] for call in mock_upstream.calls] == [
+        "san",
+        "miami beach",
+        "paris orly",
+        "washington dulles",
+    ]
+    response = client.post("/user/search-to-airport", json={"to_": "Londonderry"})
+    assert response.status_code == 200
+    assert len(mock_upstream.calls) == 5
+
+
+def test_unknown_queries_offer_candidates(mock_upstream, monkeypatch):
+    monkeypatch.setattr(airports.settings, "AIRPORT_SNAPSHOT_PATH", SNAPSHOT)
+    mock_upstream.add("GET", AIRPORT_URL, json={"data": []})
+
+    response = client.post(
+        "/user/resolve-airports", json={"queries": ["Parish", "Paris", "Reykjavik"]}
+    )
+    parish, paris, reykjavik = response.json()["airports"]
+    assert parish["status"] == "ambiguous"
+    assert [c["airport_code"] for c in parish["candidates"]] == ["PAR"]
+    assert paris["status"] == "ok"
+    assert reykjavik["status"] == "not_found"
+    assert len(mock_upstream.calls) == 2
+
+    response = client.post("/user/search-from-airport", json={"from_": "Parish"})
+    assert response.status_code == 400
+    assert response.json()["detail"]["candidates"][0]["name"] == "Paris"
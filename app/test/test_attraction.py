@@ -1,7 +1,11 @@
+import copy
+import json
+from pathlib import Path
 import pytest
-import responses
 from fastapi.testclient import TestClient
 from app.main import app
+from app.config import settings
+from app.router import attraction
 
 client = TestClient(app)
 
@@ -15,10 +19,9 @@ def attraction_search_data_success():
     }
 
 
-@responses.activate
-def test_search_attractions_success(attraction_search_data_success):
-    responses.add(
-        responses.POST,
+def test_search_attractions_success(mock_upstream, attraction_search_data_success):
+    mock_upstream.add(
+        "POST",
         "https://tourist-attraction.p.rapidapi.com/search",
         json={"results": {"data": []}},
         status=200,
@@ -39,10 +42,9 @@ def attraction_search_data_failure():
     }
 
 
-@responses.activate
-def test_search_attractions_failure(attraction_search_data_failure):
-    responses.add(
-        responses.POST,
+def test_search_attractions_failure(mock_upstream, attraction_search_data_failure):
+    mock_upstream.add(
+        "POST",
         "https://tourist-attraction.p.rapidapi.com/search",
         json={"results": {"data": []}},
         status=500,
@@ -52,3 +54,118 @@ def test_search_attractions_failure(attraction_search_data_failure):
         "/attraction/search-attractions", json=attraction_search_data_failure
     )
     assert response.status_code != 200
+
+
+def test_search_attractions_fast_responses_match(mock_upstream, monkeypatch):
+    fixture = Path(__file__).parent / "fixtures" / "attractions.json"
+    mock_upstream.add(
+        "POST",
+        "https://tourist-attraction.p.rapidapi.com/search",
+        json=json.loads(fixture.read_text()),
+    )
+    body = {"location_id": "187147", "language": "en_US", "currency": "USD"}
+
+    validated = client.post("/attraction/search-attractions", json=body)
+    monkeypatch.setattr(settings, "FAST_RESPONSES", True)
+    fast = client.post(
+        "/attraction/search-attractions", json={**body, "language": "fr_FR"}
+    )
+
+    assert validated.status_code == fast.status_code == 200
+    assert fast.json() == validated.json()
+    assert len(fast.json()) == 2
+
+
+def test_to_attraction():
+    fixture = Path(__file__).parent / "fixtures" / "attractions.json"
+    source = json.loads(fixture.read_text())["results"]["data"][0]
+    result = attraction.to_attraction(source)
+
+    assert result.attraction_name == "Louvre Museum"
+    assert result.attraction_reviews_count == 94122
+    assert result.attraction_subtype == ["Art Museums", "Speciality Museums"]
+    assert str(result.attraction_photos.small).endswith(
+        "photo-l/0e/01/2c/8a/louvre.jpg"
+    )
+    assert result.attraction_booking.provider_name == "Viator"
+    assert result.attraction_offer_tours[0].partner == "Viator"
+    # missing and null upstream values
+    plain = attraction.to_attraction.plain(
+        {**source, "photo": None, "booking": None, "offer_group": {}}
+    )
+    assert plain["attraction_photos"] == dict.fromkeys(
+        ("small", "medium", "large", "original")
+    )
+    assert plain["attraction_booking"] == {"provider_name": None, "url": None}
+    assert plain["attraction_offer_tours"] == []
+
+
+def test_fast_responses_validate_once_when_cached(mock_upstream, monkeypatch):
+    monkeypatch.setattr(settings, "FAST_RESPONSES", True)
+    fixture = json.loads(
+        (Path(__file__).parent / "fixtures" / "attractions.json").read_text()
+    )
+    # attraction_name is required by the response model
+    fixture["results"]["data"][1]["name"] = None
+    mock_upstream.add(
+        "POST", "https://tourist-attraction.p.rapidapi.com/search", json=fixture
+    )
+    body = {"location_id": "187147", "language": "en_US", "currency": "USD"}
+
+    first = client.post("/attraction/search-attractions", json=body)
+    again = client.post("/attraction/search-attractions?sort=-rating", json=body)
+
+    assert first.status_code == again.status_code == 200
+    assert first.headers["X-Total-Count"] == "1"
+    assert [a["attraction_name"] for a in first.json()] == ["Louvre Museum"]
+    assert again.json() == first.json()
+    assert first.json()[0]["attraction_photos"]["small"].startswith("https://")
+    assert len(mock_upstream.calls) == 1
+
+
+def test_search_attractions_skips_malformed_records(mock_upstream):
+    fixture = json.loads(
+        (Path(__file__).parent / "fixtures" / "attractions.json").read_text()
+    )
+    records = []
+    for i in range(15):
+        record = copy.deepcopy(fixture["results"]["data"][i % 2])
+        record["location_id"] = str(i)
+        records.append(record)
+    records[13]["description"] = None
+    fixture["results"]["data"] = records
+    mock_upstream.add(
+        "POST", "https://tourist-attraction.p.rapidapi.com/search", json=fixture
+    )
+    body = {"location_id": "187147", "language": "en_US", "currency": "USD"}
+
+    response = client.post("/attraction/search-attractions?offset=10", json=body)
+
+    assert response.status_code == 200
+    assert response.headers["X-Total-Count"] == "14"
+    assert [a["location_id"] for a in response.json()] == ["10", "11", "12", "14"]
+
+
+def test_search_attractions_sort_filter_and_page(mock_upstream):
+    fixture = Path(__file__).parent / "fixtures" / "attractions.json"
+    mock_upstream.add(
+        "POST",
+        "https://tourist-attraction.p.rapidapi.com/search",
+        json=json.loads(fixture.read_text()),
+    )
+    body = {"location_id": "187147", "language": "en_US", "currency": "USD"}
+
+    def names(params):
+        response = client.post(f"/attraction/search-attractions{params}", json=body)
+        assert response.status_code == 200
+        return response.headers["X-Total-Count"], [
+            a["attraction_name"] for a in response.json()
+        ]
+
+    louvre, second = names("")[1]
+    assert names("?sort=rating") == ("2", [second, louvre])
+    assert names("?sort=-price") == ("2", [louvre, second])
+    assert names("?max_price=80") == ("1", [louvre])
+    assert names("?provider=VIATOR") == ("1", [louvre])
+    assert names("?limit=1&offset=1") == ("2", [second])
+    assert len(mock_upstream.calls) == 1
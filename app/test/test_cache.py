@@ -0,0 +1,162 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from mongomock import MongoClient
+from app.main import app
+from app.cache import MemoryBackend, MongoBackend, ResponseCache
+from app.schemas import HotelDetailsRequest
+
+client = TestClient(app)
+
+SEARCH_HOTELS_URL = "https://tripadvisor16.p.rapidapi.com/api/v1/hotels/searchHotels"
+
+
+@pytest.fixture
+def hotel_search():
+    return {
+        "geoId": 60763,
+        "checkIn": "2024-05-01",
+        "checkOut": "2024-05-03",
+        "adults": 2,
+    }
+
+
+@pytest.fixture
+def hotels_payload():
+    return {
+        "data": {
+            "data": [
+                {
+                    "id": "1",
+                    "title": "Hotel One",
+                    "bubbleRating": {"rating": 4.5, "count": "120"},
+                    "provider": "Booking.com",
+                    "priceForDisplay": "$120",
+                    "cardPhotos": [
+                        {
+                            "sizes": {
+                                "maxHeight": 100,
+                                "maxWidth": 100,
+                                "urlTemplate": "https://example.com/p.jpg",
+                            }
+                        }
+                    ],
+                }
+            ]
+        }
+    }
+
+
+def test_identical_hotel_searches_hit_upstream_once(
+    mock_upstream, hotel_search, hotels_payload
+):
+    mock_upstream.add("GET", SEARCH_HOTELS_URL, json=hotels_payload)
+
+    first = client.post("/hotel/search-hotels", json=hotel_search)
+    second = client.post("/hotel/search-hotels", json=hotel_search)
+
+    assert first.status_code == second.status_code == 200
+    assert first.json() == second.json()
+    assert len(mock_upstream.calls) == 1
+
+    stats = client.get("/metrics/cache").json()
+    assert stats["endpoints"]["search-hotels"]["hits"] == 1
+    assert stats["endpoints"]["search-hotels"]["misses"] == 1
+
+
+def test_failed_upstream_call_is_not_cached(mock_upstream, hotel_search):
+    mock_upstream.add("GET", SEARCH_HOTELS_URL, json={}, status=500)
+
+    assert client.post("/hotel/search-hotels", json=hotel_search).status_code == 500
+    assert client.post("/hotel/search-hotels", json=hotel_search).status_code == 500
+    assert len(mock_upstream.calls) == 2
+
+
+def test_cache_key_ignores_field_order():
+    a = HotelDetailsRequest(geoId=1, checkIn="a", checkOut="b", adults=2)
+    b = HotelDetailsRequest(adults=2, checkOut="b", checkIn="a", geoId="1")
+
+    assert ResponseCache.key("search-hotels", a) == ResponseCache.key(
+        "search-hotels", b
+    )
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryBackend(max_bytes=30)
+    await backend.set("a", "x" * 10, ttl=60)
+    await backend.set("b", "y" * 10, ttl=60)
+    await backend.get("a")
+    await backend.set("c", "z" * 10, ttl=60)
+
+    assert await backend.get("a") == "x" * 10
+    assert await backend.get("b") is None
+    assert await backend.get("c") == "z" * 10
+    assert backend.size <= backend.max_bytes
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_expires_entries():
+    backend = MemoryBackend(max_bytes=1000)
+    await backend.set("a", [1, 2, 3], ttl=0)
+
+    assert await backend.get("a") is None
+    assert len(backend) == 0
+
+
+@pytest.mark.asyncio
+async def test_mongo_backend_shares_entries_between_caches():
+    db = MongoClient()["test_database"]
+    writer = ResponseCache(MongoBackend(db, "upstream_cache"))
+    reader = ResponseCache(MongoBackend(db, "upstream_cache"))
+    request = HotelDetailsRequest(geoId=1, checkIn="a", checkOut="b", adults=2)
+
+    async def fetch():
+        return [{"accomodation": "Hotel One"}]
+
+    async def unreachable():
+        raise AssertionError("should be served from the shared cache")
+
+    await writer.get_or_fetch("search-hotels", request, fetch, ttl=60)
+    value = await reader.get_or_fetch("search-hotels", request, unreachable, ttl=60)
+
+    assert value == [{"accomodation": "Hotel One"}]
+    assert reader.stats()["endpoints"]["search-hotels"]["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_fetch():
+    cache = ResponseCache(MemoryBackend(max_bytes=1000))
+    request = HotelDetailsRequest(geoId=1, checkIn="a", checkOut="b", adults=2)
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return ["result"]
+
+    results = await asyncio.gather(
+        *(cache.get_or_fetch("search", request, fetch, ttl=60) for _ in range(20))
+    )
+
+    assert calls == 1
+    assert results == [["result"]] * 20
+    assert cache.stats()["endpoints"]["search"]["coalesced"] == 19
+
+
+@pytest.mark.asyncio
+async def test_stale_entry_is_served_while_refreshing():
+    cache = ResponseCache(MemoryBackend(max_bytes=1000), stale_ttl=60)
+    request = HotelDetailsRequest(geoId=1, checkIn="a", checkOut="b", adults=2)
+    versions = iter(["old", "new"])
+
+    async def fetch():
+        return next(versions)
+
+    assert await cache.get_or_fetch("search", request, fetch, ttl=0) == "old"
+    # expired but within the stale window: old value now, refresh behind it
+    assert await cache.get_or_fetch("search", request, fetch, ttl=60) == "old"
+    await asyncio.sleep(0)
+    assert await cache.get_or_fetch("search", request, fetch, ttl=60) == "new"
+    assert cache.stats()["endpoints"]["search"]["stale"] == 1
@@ -1,28 +1,12 @@
+import json
 import pytest
+from datetime import datetime
+from pathlib import Path
+from bson import ObjectId
 from fastapi.testclient import TestClient
 from app.main import app
-from app.db.database import (
-    get_db,
-)
-from mongomock import MongoClient
-
-
-@pytest.fixture
-def mock_db():
-    client = MongoClient()
-    db = client["test_database"]
-    yield db
-    client.close()
-
-
-@pytest.fixture
-def override_get_db(mock_db):
-    async def _override_get_db():
-        return mock_db
-
-    app.dependency_overrides[get_db] = _override_get_db
-    yield
-    app.dependency_overrides.clear()
+from app.config import settings
+from app.jwttoken import create_access_token
 
 
 @pytest.fixture
@@ -31,16 +15,200 @@ def test_client():
         yield client
 
 
-@pytest.mark.asyncio
-async def test_add_save_trip_success(test_client, override_get_db, mock_db):
-    user_email = "user@example.com"
-    mock_db["users"].insert_one({"email": user_email, "_id": "user_id_123"})
-    trip_details = {"userEmail": user_email, "tripDetails": "Trip to Hawaii"}
+HOTEL = {
+    "accomodation_id": "1",
+    "accomodation": "Beach Resort",
+    "breakfast_info": "Breakfast included",
+    "accomodation_region": "Honolulu",
+    "accomodation_rating": {"rating": 4.5},
+    "accomodation_provider": "Expedia",
+    "priceForDisplay": "$200",
+    "priceDetails": "per night",
+    "accomodation_photos": [{"sizes": {"w": 100}}],
+}
+
+
+def test_add_save_trip_success(test_client, override_get_db, mock_db, user):
+    user_email = user["email"]
+    trip_details = {
+        "userEmail": user_email,
+        "cartItems": [{"hotel": HOTEL, "price": 200.0}],
+        "tripDetails": "Trip to Hawaii",
+    }
 
-    response = test_client.post("/user/add_save_trip", json=trip_details)
+    response = test_client.post(
+        "/user/add_save_trip", json=trip_details, headers=user["headers"]
+    )
     assert response.status_code == 200
     assert response.json()["message"] == "Trip saved successfully"
 
     saved_trip = mock_db["saved_trips"].find_one({"userEmail": user_email})
     assert saved_trip is not None
-    assert saved_trip["tripDetails"] == "Trip to Hawaii"
+    assert saved_trip["user_id"] == str(mock_db["users"].find_one()["_id"])
+    assert saved_trip["cartItems"] == [{"hotel": HOTEL, "price": 200.0}]
+    assert "tripDetails" not in saved_trip
+    assert "createdAt" in saved_trip
+
+
+def test_add_save_trip_requires_matching_user(
+    test_client, override_get_db, mock_db, user
+):
+    trip = {"userEmail": user["email"], "cartItems": []}
+    assert test_client.post("/user/add_save_trip", json=trip).status_code == 401
+
+    trip["userEmail"] = "someone@example.com"
+    response = test_client.post(
+        "/user/add_save_trip", json=trip, headers=user["headers"]
+    )
+    assert response.status_code == 403
+
+    trip = {"userEmail": user["email"], "cartItems": [{"price": "free"}]}
+    response = test_client.post(
+        "/user/add_save_trip", json=trip, headers=user["headers"]
+    )
+    assert response.status_code == 422
+    assert mock_db["saved_trips"].count_documents({}) == 0
+
+
+def test_add_save_trip_rejects_oversized_documents(
+    test_client, override_get_db, mock_db, user, monkeypatch
+):
+    monkeypatch.setattr(settings, "SAVED_TRIP_MAX_BYTES", 1024)
+    trip = {
+        "userEmail": user["email"],
+        "cartItems": [{"hotel": HOTEL, "price": 200.0}] * 20,
+    }
+    response = test_client.post(
+        "/user/add_save_trip", json=trip, headers=user["headers"]
+    )
+    assert response.status_code == 413
+    assert mock_db["saved_trips"].count_documents({}) == 0
+
+
+FIXTURES = Path(__file__).parent / "fixtures"
+API = "https://tripadvisor16.p.rapidapi.com/api/v1"
+
+
+def test_add_save_trip_accepts_search_results(
+    test_client, override_get_db, mock_db, user, mock_upstream
+):
+    mock_upstream.add(
+        "GET",
+        f"{API}/flights/searchFlights",
+        json=json.loads((FIXTURES / "flights.json").read_text()),
+    )
+    mock_upstream.add(
+        "GET",
+        f"{API}/hotels/searchHotels",
+        json=json.loads((FIXTURES / "hotels.json").read_text()),
+    )
+    flights = test_client.post(
+        "/user/search-one-way-flights",
+        json={
+            "sourceAirportCode": "JFK",
+            "destinationAirportCode": "CDG",
+            "date": "2024-06-01",
+            "itineraryType": "ONE_WAY",
+            "sortOrder": "PRICE",
+            "numAdults": 1,
+            "numSeniors": 0,
+            "classOfService": "ECONOMY",
+        },
+    ).json()
+    hotels = test_client.post(
+        "/hotel/search-hotels",
+        json={
+            "geoId": 187147,
+            "checkIn": "2024-06-01",
+            "checkOut": "2024-06-03",
+            "adults": 1,
+        },
+    ).json()
+    # one-way rows say "Direct" and have no city codes; the second hotel
+    # has no breakfast or price details
+    assert flights[0]["Number of Stops"] == "Direct"
+    assert hotels[1]["breakfast_info"] is None
+
+    trip = {
+        "userEmail": user["email"],
+        "cartItems": [
+            {"outbound": flights[0], "hotel": hotel, "price": 900.0} for hotel in hotels
+        ],
+    }
+    response = test_client.post(
+        "/user/add_save_trip", json=trip, headers=user["headers"]
+    )
+
+    assert response.status_code == 200
+    saved = mock_db["saved_trips"].find_one({"userEmail": user["email"]})
+    outbound = saved["cartItems"][0]["outbound"]
+    assert outbound["Number of Stops"] == "Direct"
+    assert outbound["Airline Name"] == flights[0]["Airline Name"]
+    assert saved["cartItems"][1]["hotel"]["accomodation"] == hotels[1]["accomodation"]
+
+
+@pytest.fixture
+def saved_trips(mock_db):
+    user_id = ObjectId()
+    email = "trips@example.com"
+    mock_db["users"].insert_one(
+        {
+            "_id": user_id,
+            "firstname": "Trip",
+            "lastname": "Saver",
+            "username": "trips",
+            "email": email,
+            "mobile": "1234567890",
+            "country": "USA",
+            "password": "hashed_password",
+        }
+    )
+    for i in range(5):
+        mock_db["saved_trips"].insert_one(
+            {
+                "userEmail": email,
+                "cartItems": [{"id": str(i)}],
+                "createdAt": datetime(2024, 1, 1 + i),
+                "rawPayload": "x" * 1000,
+            }
+        )
+    mock_db["saved_trips"].insert_one({"userEmail": "other@example.com"})
+    token = create_access_token(data={"user_email": email, "user_id": str(user_id)})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_saved_trips_are_paginated_newest_first(
+    test_client, override_get_db, saved_trips
+):
+    first = test_client.get("/user/get_saved_trips?limit=2", headers=saved_trips)
+    assert first.status_code == 200
+    page = first.json()
+    assert [trip["cartItems"][0]["id"] for trip in page["trips"]] == ["4", "3"]
+    assert page["next_cursor"] == page["trips"][-1]["id"]
+    assert "rawPayload" not in page["trips"][0]
+
+    after = page["next_cursor"]
+    rest = test_client.get(
+        f"/user/get_saved_trips?limit=10&after={after}", headers=saved_trips
+    ).json()
+    assert [trip["cartItems"][0]["id"] for trip in rest["trips"]] == ["2", "1", "0"]
+    assert rest["next_cursor"] is None
+
+
+def test_saved_trips_rejects_bad_cursor_and_limit(
+    test_client, override_get_db, saved_trips
+):
+    response = test_client.get("/user/get_saved_trips?after=nope", headers=saved_trips)
+    assert response.status_code == 400
+    response = test_client.get("/user/get_saved_trips?limit=0", headers=saved_trips)
+    assert response.status_code == 422
+
+
+def test_saved_trips_stream_ndjson(test_client, override_get_db, saved_trips):
+    response = test_client.get("/user/get_saved_trips/stream", headers=saved_trips)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    trips = [json.loads(line) for line in response.text.splitlines()]
+    assert len(trips) == 5
+    assert trips[0]["cartItems"] == [{"id": "4"}]
+    assert trips[0]["createdAt"] == "2024-01-05T00:00:00"
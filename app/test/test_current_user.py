@@ -0,0 +1,63 @@
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from app.main import app
+from app.db.db_user import update_user_info
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from jose import jwt
+from app.jwttoken import create_access_token, verify_token, verified_tokens
+from app import jwttoken
+
+client = TestClient(app)
+
+
+def test_me_is_served_from_profile_cache(override_get_db, mock_db, user):
+    first = client.get("/user/me", headers=user["headers"])
+    mock_db["users"].delete_many({})
+    second = client.get("/user/me", headers=user["headers"])
+
+    assert first.status_code == second.status_code == 200
+    assert second.json() == first.json()
+    assert "password" not in second.json()
+
+
+@pytest.mark.asyncio
+async def test_update_user_info_invalidates_cached_profile(
+    override_get_db, mock_db, user
+):
+    assert client.get("/user/me", headers=user["headers"]).json()["firstname"] == (
+        "John"
+    )
+
+    await update_user_info(mock_db, "john.doe@example.com", {"firstname": "Jane"})
+
+    response = client.get(f"/user/{user['id']}", headers=user["headers"])
+    assert response.json()["firstname"] == "Jane"
+
+
+def test_verified_token_is_cached():
+    token = create_access_token(data={"user_email": "a@example.com", "user_id": "1"})
+
+    assert verify_token(token) == {"email": "a@example.com", "id": "1"}
+    assert len(verified_tokens) == 1
+    with patch("app.jwttoken.jwt.decode", side_effect=AssertionError):
+        assert verify_token(token) == {"email": "a@example.com", "id": "1"}
+
+
+def test_invalid_tokens_are_rejected_and_not_cached():
+    expired = jwt.encode(
+        {
+            "user_email": "a@example.com",
+            "user_id": "1",
+            "exp": datetime.utcnow() - timedelta(minutes=1),
+        },
+        jwttoken.SECRET_KEY,
+        algorithm=jwttoken.ALGORITHM,
+    )
+
+    for token in ("not-a-token", expired):
+        with pytest.raises(HTTPException) as exc_info:
+            verify_token(token)
+        assert exc_info.value.status_code == 401
+    assert len(verified_tokens) == 0
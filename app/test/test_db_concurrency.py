@@ -0,0 +1,43 @@
+import asyncio
+import time
+import pytest
+from unittest.mock import patch
+from mongomock.collection import Collection
+from app.db.db_user import get_user
+from app.schemas import UserGet
+
+QUERY_LATENCY = 0.05
+original_find_one = Collection.find_one
+
+
+def slow_find_one(self, *args, **kwargs):
+    # stand-in for a slow network round-trip to mongod
+    time.sleep(QUERY_LATENCY)
+    return original_find_one(self, *args, **kwargs)
+
+
+async def timed_lookups(db, parallel: int) -> float:
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(get_user(db, UserGet(username="johndoe")) for _ in range(parallel))
+    )
+    return time.perf_counter() - start
+
+
+@pytest.mark.asyncio
+async def test_db_lookups_do_not_block_event_loop(mock_db, user):
+    with patch.object(Collection, "find_one", slow_find_one):
+        single = await timed_lookups(mock_db, 1)
+        parallel = await timed_lookups(mock_db, 16)
+
+    # blocking calls would serialize to 16 * QUERY_LATENCY
+    assert parallel < single * 4
+    assert parallel < QUERY_LATENCY * 16 / 2
+
+
+@pytest.mark.asyncio
+async def test_event_loop_stays_responsive_during_query(mock_db, user, ticker):
+    with ticker, patch.object(Collection, "find_one", slow_find_one):
+        await get_user(mock_db, UserGet(username="johndoe"))
+
+    assert ticker.ticks >= 3
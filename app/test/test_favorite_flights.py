@@ -0,0 +1,87 @@
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.config import settings
+from app.db import aio, db_user
+from app.schemas import FavoriteFlight
+
+client = TestClient(app)
+
+
+def flight(number, price=199.0):
+    return {
+        "outbound": {
+            "airline": "Delta",
+            "sourceAirportCode": "JFK",
+            "destinationAirportCode": "LAX",
+            "departureDate": "2024-06-01",
+            "classOfService": "ECONOMY",
+            "flightNumber": str(number),
+            "bookingReference": None,
+        },
+        "total_price": price,
+    }
+
+
+def test_batch_is_saved_and_deduplicated(override_get_db, mock_db, user):
+    batch = [flight(1), flight(2), flight(1)]
+    response = client.post(
+        "/user/add_favorite_flight", json=batch, headers=user["headers"]
+    )
+    assert response.status_code == 200
+    results = response.json()
+    assert [r["status"] for r in results] == ["saved", "saved", "duplicate"]
+    assert mock_db["favorite_flights"].count_documents({}) == 2
+
+    again = client.post(
+        "/user/add_favorite_flight",
+        json=[flight(2), flight(3)],
+        headers=user["headers"],
+    ).json()
+    assert [r["status"] for r in again] == ["duplicate", "saved"]
+    assert again[0]["id"] == results[1]["id"]
+    assert mock_db["favorite_flights"].count_documents({}) == 3
+
+
+def test_batch_is_split_into_insert_many_chunks(
+    override_get_db, mock_db, user, monkeypatch
+):
+    monkeypatch.setattr(settings, "FAVORITE_FLIGHTS_BATCH_SIZE", 2)
+    batch = [flight(n) for n in range(5)]
+    results = client.post(
+        "/user/add_favorite_flight", json=batch, headers=user["headers"]
+    ).json()
+    assert [r["index"] for r in results] == [0, 1, 2, 3, 4]
+    assert all(r["status"] == "saved" for r in results)
+    assert mock_db["favorite_flights"].count_documents({}) == 5
+
+
+def test_unique_index_violation_is_reported_per_item(
+    override_get_db, mock_db, user, monkeypatch
+):
+    collection = mock_db["favorite_flights"]
+    collection.create_index([("user_id", 1), ("contentHash", 1)], unique=True)
+    user_id = str(mock_db["users"].find_one()["_id"])
+    collection.insert_one(
+        {
+            "user_id": user_id,
+            "contentHash": db_user.favorite_flight_hash(
+                FavoriteFlight.model_validate(flight(7))
+            ),
+        }
+    )
+    # the flight is stored by a concurrent request after the duplicate lookup
+    find = aio.AsyncCollection.find
+    monkeypatch.setattr(
+        aio.AsyncCollection,
+        "find",
+        lambda self, query, *args: find(self, {"_id": None}, *args),
+    )
+
+    results = client.post(
+        "/user/add_favorite_flight",
+        json=[flight(7), flight(8)],
+        headers=user["headers"],
+    ).json()
+    assert [r["status"] for r in results] == ["duplicate", "saved"]
+    assert collection.count_documents({}) == 2
@@ -1,5 +1,10 @@
+import asyncio
+import json
+import re
+import time
+from pathlib import Path
+import httpx
 import pytest
-import responses
 from fastapi.testclient import TestClient
 from app.main import app
 
@@ -21,10 +26,9 @@ def flight_search_data_success():
     }
 
 
-@responses.activate
-def test_search_round_trip_flight_success(flight_search_data_success):
-    responses.add(
-        responses.GET,
+def test_search_round_trip_flight_success(mock_upstream, flight_search_data_success):
+    mock_upstream.add(
+        "GET",
         "https://tripadvisor16.p.rapidapi.com/api/v1/flights/searchFlights",
         json={"data": {"flights": []}},
         status=200,
@@ -51,10 +55,9 @@ def flight_search_data_failure():
     }
 
 
-@responses.activate
-def test_search_round_trip_flight_failure(flight_search_data_failure):
-    responses.add(
-        responses.GET,
+def test_search_round_trip_flight_failure(mock_upstream, flight_search_data_failure):
+    mock_upstream.add(
+        "GET",
         "https://tripadvisor16.p.rapidapi.com/api/v1/flights/searchFlights",
         json={"data": {"flights": []}},
         status=500,
@@ -71,8 +74,7 @@ def airport_search_data_from_success():
     return {"from_": "JFK"}
 
 
-@responses.activate
-def test_search_from_airport_success(airport_search_data_from_success):
+def test_search_from_airport_success(mock_upstream, airport_search_data_from_success):
     mock_response_data = {
         "data": [
             {
@@ -83,8 +85,8 @@ def test_search_from_airport_success(airport_search_data_from_success):
             }
         ]
     }
-    responses.add(
-        responses.GET,
+    mock_upstream.add(
+        "GET",
         "https://tripadvisor16.p.rapidapi.com/api/v1/flights/searchAirport",
         json=mock_response_data,
         status=200,
@@ -101,8 +103,7 @@ def airport_search_data_from_failure():
     return {"from_": "XXX"}
 
 
-@responses.activate
-def test_search_from_airport_failure(airport_search_data_from_failure):
+def test_search_from_airport_failure(mock_upstream, airport_search_data_from_failure):
     mock_response_data = {
         "data": [
             {
@@ -113,8 +114,8 @@ def test_search_from_airport_failure(airport_search_data_from_failure):
             }
         ]
     }
-    responses.add(
-        responses.GET,
+    mock_upstream.add(
+        "GET",
         "https://tripadvisor16.p.rapidapi.com/api/v1/flights/searchAirport",
         json=mock_response_data,
         status=400,
@@ -131,8 +132,7 @@ def airport_search_data_to_success():
     return {"to_": "JFK"}
 
 
-@responses.activate
-def test_search_to_airport_success(airport_search_data_to_success):
+def test_search_to_airport_success(mock_upstream, airport_search_data_to_success):
     mock_response_data = {
         "data": [
             {
@@ -143,8 +143,8 @@ def test_search_to_airport_success(airport_search_data_to_success):
             }
         ]
     }
-    responses.add(
-        responses.GET,
+    mock_upstream.add(
+        "GET",
         "https://tripadvisor16.p.rapidapi.com/api/v1/flights/searchAirport",
         json=mock_response_data,
         status=200,
@@ -161,8 +161,7 @@ def airport_search_data_to_failure():
     return {"to_": "XXX"}
 
 
-@responses.activate
-def test_search_to_airport_failure(airport_search_data_to_failure):
+def test_search_to_airport_failure(mock_upstream, airport_search_data_to_failure):
     mock_response_data = {
         "data": [
             {
@@ -173,8 +172,8 @@ def test_search_to_airport_failure(airport_search_data_to_failure):
             }
         ]
     }
-    responses.add(
-        responses.GET,
+    mock_upstream.add(
+        "GET",
         "https://tripadvisor16.p.rapidapi.com/api/v1/flights/searchAirport",
         json=mock_response_data,
         status=400,
@@ -184,3 +183,175 @@ def test_search_to_airport_failure(airport_search_data_to_failure):
         "/user/search-to-airport", json=airport_search_data_to_failure
     )
     assert response.status_code != 200
+
+
+@pytest.mark.asyncio
+async def test_concurrent_flight_searches_overlap(
+    mock_upstream, flight_search_data_success
+):
+    latency = 0.2
+    searches = 10
+    mock_upstream.add(
+        "GET",
+        "https://tripadvisor16.p.rapidapi.com/api/v1/flights/searchFlights",
+        json={"data": {"flights": []}},
+        status=200,
+        latency=latency,
+    )
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        start = time.perf_counter()
+        responses = await asyncio.gather(
+            *(
+                c.post(
+                    "/user/search-round-trip-flights",
+                    json=flight_search_data_success,
+                )
+                for _ in range(searches)
+            )
+        )
+        elapsed = time.perf_counter() - start
+
+    assert all(response.status_code == 200 for response in responses)
+    # a blocking client would take searches * latency
+    assert elapsed < latency * 3
+
+
+def airport(code, parent_id):
+    return {"data": [{"details": {"parent_ids": [parent_id]}, "airportCode": code}]}
+
+
+def test_resolve_airports_concurrently_through_the_cache(mock_upstream):
+    url = "https://tripadvisor16.p.rapidapi.com/api/v1/flights/searchAirport"
+    latency = 0.2
+    mock_upstream.add(
+        "GET", re.compile(f"{url}.*paris"), json=airport("CDG", 187147), latency=latency
+    )
+    mock_upstream.add(
+        "GET",
+        re.compile(f"{url}.*london"),
+        json=airport("LHR", 186338),
+        latency=latency,
+    )
+    mock_upstream.add("GET", re.compile(f"{url}.*nowhere"), json={"data": []})
+
+    start = time.perf_counter()
+    response = client.post(
+        "/user/resolve-airports",
+        json={"queries": ["Paris", "London", "nowhere", "  paris "]},
+    )
+    elapsed = time.perf_counter() - start
+
+    assert response.status_code == 200
+    airports = response.json()["airports"]
+    assert [a["status"] for a in airports] == ["ok", "ok", "not_found", "ok"]
+    assert airports[0] == {
+        "query": "Paris",
+        "status": "ok",
+        "parent_id": 187147,
+        "airport_code": "CDG",
+    }
+    assert airports[3]["airport_code"] == "CDG"
+    assert elapsed < latency * 2
+    assert len(mock_upstream.calls) == 3
+
+    # the single-airport endpoints read the same cache entries
+    response = client.post("/user/search-to-airport", json={"to_": "LONDON"})
+    assert response.json() == {"To_parent_id": 186338, "ToAirportCode": "LHR"}
+    assert len(mock_upstream.calls) == 3
+
+
+def test_resolve_airports_limits_the_batch(mock_upstream):
+    response = client.post("/user/resolve-airports", json={"queries": []})
+    assert response.status_code == 422
+    response = client.post("/user/resolve-airports", json={"queries": ["a"] * 21})
+    assert response.status_code == 422
+
+
+SEARCH_FLIGHTS = "https://tripadvisor16.p.rapidapi.com/api/v1/flights/searchFlights"
+FLIGHTS = json.loads((Path(__file__).parent / "fixtures" / "flights.json").read_text())
+
+
+def test_round_trip_flights_carry_typed_keys(mock_upstream, flight_search_data_success):
+    mock_upstream.add("GET", SEARCH_FLIGHTS, json=FLIGHTS)
+
+    response = client.post(
+        "/user/search-round-trip-flights", json=flight_search_data_success
+    )
+
+    assert response.status_code == 200
+    assert response.headers["X-Total-Count"] == "2"
+    assert [flight["keys"] for flight in response.json()] == [
+        {"price": 812.4, "duration": 950, "stops": 0, "departure": 1110},
+        {"price": 640.0, "duration": 1345, "stops": 1, "departure": 1260},
+    ]
+
+
+def test_round_trip_flights_resort_from_the_cache(
+    mock_upstream, flight_search_data_success
+):
+    mock_upstream.add("GET", SEARCH_FLIGHTS, json=FLIGHTS)
+    url = "/user/search-round-trip-flights"
+
+    by_price = client.post(f"{url}?sort=price", json=flight_search_data_success)
+    by_duration = client.post(f"{url}?sort=duration", json=flight_search_data_success)
+    cheapest = client.post(f"{url}?sort=price&limit=1", json=flight_search_data_success)
+    second = client.post(
+        f"{url}?sort=price&limit=1&offset=1", json=flight_search_data_success
+    )
+
+    assert [f["price"] for f in by_price.json()] == [640.0, 812.4]
+    assert [f["price"] for f in by_duration.json()] == [812.4, 640.0]
+    assert [f["price"] for f in cheapest.json()] == [640.0]
+    assert [f["price"] for f in second.json()] == [812.4]
+    assert second.headers["X-Total-Count"] == "2"
+    assert len(mock_upstream.calls) == 1
+
+
+def test_round_trip_flight_filters(mock_upstream, flight_search_data_success):
+    mock_upstream.add("GET", SEARCH_FLIGHTS, json=FLIGHTS)
+    url = "/user/search-round-trip-flights"
+
+    def prices(params):
+        response = client.post(f"{url}?{params}", json=flight_search_data_success)
+        assert response.status_code == 200
+        return [flight["price"] for flight in response.json()]
+
+    assert prices("max_stops=0") == [812.4]
+    assert prices("max_price=700") == [640.0]
+    assert prices("max_duration=1000") == [812.4]
+    assert prices("depart_after=20:00") == [640.0]
+    assert prices("depart_before=20:00&sort=-price") == [812.4]
+    assert prices("max_price=100") == []
+
+
+def test_flight_query_is_validated(mock_upstream, flight_search_data_success):
+    url = "/user/search-round-trip-flights"
+    for params in ("sort=airline", "depart_after=25:00", "limit=0"):
+        response = client.post(f"{url}?{params}", json=flight_search_data_success)
+        assert response.status_code == 422
+    assert mock_upstream.calls == []
+
+
+def test_one_way_flights_sort(mock_upstream):
+    mock_upstream.add("GET", SEARCH_FLIGHTS, json=FLIGHTS)
+    search = {
+        "sourceAirportCode": "JFK",
+        "destinationAirportCode": "CDG",
+        "date": "2024-06-01",
+        "itineraryType": "ONE_WAY",
+        "sortOrder": "PRICE",
+        "numAdults": 1,
+        "numSeniors": 0,
+        "classOfService": "ECONOMY",
+    }
+
+    response = client.post(
+        "/user/search-one-way-flights?sort=-departure&max_stops=0", json=search
+    )
+
+    assert response.status_code == 200
+    assert [leg["Departure Time"] for leg in response.json()] == ["18:30", "10:15"]
+    assert response.json()[0]["keys"]["price"] == 812.4
+    assert response.headers["X-Total-Count"] == "2"
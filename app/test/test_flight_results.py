@@ -0,0 +1,107 @@
+import json
+from pathlib import Path
+from app import flight_results
+from app.flight_query import FlightQuery, select
+from app.flight_results import FlightResults
+
+FIXTURE = Path(__file__).parent / "fixtures" / "flights.json"
+
+
+def flights():
+    return json.loads(FIXTURE.read_text())["data"]["flights"]
+
+
+def test_round_trip_document_is_columnar_and_json_ready():
+    document = flight_results.round_trip(flights())
+
+    assert document["carriers"] == [
+        [
+            "Air France",
+            flights()[0]["segments"][0]["legs"][0]["operatingCarrier"]["logoUrl"],
+        ],
+        [
+            "Delta",
+            flights()[1]["segments"][0]["legs"][0]["operatingCarrier"]["logoUrl"],
+        ],
+    ]
+    assert document["legs"]["carrier"] == [0, 0, 1, 1]
+    assert document["legs"]["departure"][0] == 1717281000  # 2024-06-01T18:30-04:00
+    assert document["legs"]["departure_offset"][:2] == [-240, 120]
+    assert document["itineraries"] == {
+        "outbound": [0, 2],
+        "return": [1, 3],
+        "price": [812.4, 640.0],
+    }
+    assert json.loads(json.dumps(document)) == document
+
+
+def test_round_trip_rows():
+    results = FlightResults(flight_results.round_trip(flights()))
+
+    first = results.row(0)
+    assert first["outbound"] == {
+        "Airline Name": "Air France",
+        "Flight Number": 7,
+        "Departure Time": "18:30",
+        "Arrival Time": "07:55",
+        "Duration": "07 h 25 m",
+        "Number of Stops": 0,
+        "Airline Logo": "https://static.tacdn.com/img2/flights/airlines/logos/100x100/AirFrance.png",
+        "Source City Code": "JFK",
+        "Destination City Code": "CDG",
+    }
+    assert first["return"]["Source City Code"] == "CDG"
+    assert first["price"] == 812.4
+    assert first["keys"] == {
+        "price": 812.4,
+        "duration": 950,
+        "stops": 0,
+        "departure": 1110,
+    }
+
+
+def test_one_way_rows():
+    results = FlightResults(flight_results.one_way(flights()))
+
+    assert len(results) == 4
+    row = results.row(2)
+    assert list(row) == [
+        "Airline Name",
+        "Flight Number",
+        "Departure Time",
+        "Arrival Time",
+        "Duration",
+        "Number of Stops",
+        "Price of Flight",
+        "Airline Logo",
+        "keys",
+    ]
+    assert row["Airline Name"] == "Delta"
+    assert row["Number of Stops"] == "1 Stop(s)"
+    assert row["Price of Flight"] == 640.0
+    assert row["keys"]["duration"] == 665
+
+
+def test_select_materializes_only_the_page():
+    results = FlightResults(flight_results.one_way(flights()))
+
+    total, page = select(results.keys, FlightQuery(sort="-duration", limit=1))
+
+    assert total == 4
+    assert page == [3]
+    assert [row["Flight Number"] for row in results.rows(page)] == [
+        flights()[1]["segments"][1]["legs"][0]["flightNumber"]
+    ]
+
+
+def test_rows_are_built_once_per_cached_document():
+    document = flight_results.one_way(flights())
+    results = flight_results.for_document(document)
+    first = results.rows([3, 0])
+
+    again = flight_results.for_document(document).rows([0])
+    assert again[0] is first[1]
+    assert first == FlightResults(document).rows([3, 0])
+    # an equal document from another cache read is a result set of its own
+    copy = json.loads(json.dumps(document))
+    assert flight_results.for_document(copy).rows([0])[0] is not first[1]
@@ -0,0 +1,42 @@
+import asyncio
+import time
+import pytest
+from unittest.mock import patch
+from app.db.hash import Hash, HashPool, get_pool
+
+
+@pytest.mark.asyncio
+async def test_async_hash_roundtrip():
+    hashed = await Hash.bcrypt_async("password123")
+
+    assert await Hash.verify_async(hashed, "password123")
+    assert not await Hash.verify_async(hashed, "wrong-password")
+    assert get_pool().stats()["completed"] >= 3
+
+
+@pytest.mark.asyncio
+async def test_hashing_does_not_block_event_loop(ticker):
+    with ticker:
+        await Hash.bcrypt_async("password123")
+
+    assert ticker.ticks >= 3
+
+
+@pytest.mark.asyncio
+async def test_pool_caps_concurrent_hashes():
+    pool = HashPool("thread", workers=4, max_concurrency=2)
+    peak = 0
+
+    def slow_hash(_):
+        time.sleep(0.02)
+        return pool.running
+
+    try:
+        results = await asyncio.gather(*(pool.run(slow_hash, i) for i in range(6)))
+        peak = max(results)
+    finally:
+        pool.shutdown()
+
+    assert peak <= 2
+    assert pool.stats()["completed"] == 6
+    assert pool.stats()["max_queued"] >= 4
@@ -0,0 +1,170 @@
+import copy
+import json
+from pathlib import Path
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app import fastjson
+from app.router import hotel
+from app.config import settings
+
+client = TestClient(app)
+
+URL = "https://tripadvisor16.p.rapidapi.com/api/v1/hotels/getHotelDetails"
+FIXTURE = Path(__file__).parent / "fixtures" / "hotel_details.json"
+
+
+@pytest.fixture
+def hotel_details_payload():
+    return json.loads(FIXTURE.read_text())
+
+
+def test_fastjson_matches_stdlib(hotel_details_payload):
+    raw = FIXTURE.read_bytes()
+    assert fastjson.loads(raw) == json.loads(raw)
+    assert fastjson.loads(raw.decode()) == hotel_details_payload
+
+
+def test_hotel_details(mock_upstream, hotel_details_payload):
+    mock_upstream.add("GET", URL, json=hotel_details_payload)
+
+    response = client.post(
+        "/hotel/get-hotels-details",
+        json={"id": "188150", "checkIn": "2024-06-01", "checkOut": "2024-06-03"},
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["accomodation_name"] == "1. Hotel Le Marais"
+    assert body["numberReviews"] == 1834
+    assert body["price"]["providerName"] == "Booking.com"
+    assert len(body["photos"]) == 3
+    assert [r["restaurant_name"] for r in body["restaurantsNearby"]] == [
+        "Bistro 0",
+        "Bistro 1",
+        "Bistro 2",
+    ]
+    assert body["attractionsNearby"][1]["attractionPhoto"] is None
+    assert body["qA"][1]["memberProfile"] is None
+    assert body["amenitiesScreen"][1]["content"] == ["Air conditioning", "Safe"]
+
+
+def test_hotel_details_upstream_error(mock_upstream):
+    mock_upstream.add("GET", URL, json={"status": False, "message": "Bad hotel id"})
+
+    response = client.post(
+        "/hotel/get-hotels-details",
+        json={"id": "x", "checkIn": "2024-06-01", "checkOut": "2024-06-03"},
+    )
+
+    assert response.status_code == 500
+    assert response.json()["detail"] == "Bad hotel id"
+
+
+def test_search_hotels_fast_responses_match(mock_upstream, monkeypatch):
+    url = "https://tripadvisor16.p.rapidapi.com/api/v1/hotels/searchHotels"
+    payload = json.loads((FIXTURE.parent / "hotels.json").read_text())
+    mock_upstream.add("GET", url, json=payload)
+    body = {"geoId": 187147, "checkIn": "2024-06-01", "checkOut": "2024-06-03"}
+
+    validated = client.post("/hotel/search-hotels", json={**body, "adults": 1})
+    monkeypatch.setattr(settings, "FAST_RESPONSES", True)
+    fast = client.post("/hotel/search-hotels", json={**body, "adults": 2})
+
+    assert validated.status_code == fast.status_code == 200
+    assert fast.json() == validated.json()
+    assert len(mock_upstream.calls) == 2
+
+
+def test_hotel_card():
+    source = json.loads((FIXTURE.parent / "hotels.json").read_text())["data"]["data"]
+    card = hotel.to_hotel_card(source[0])
+
+    assert card["accomodation_id"] == "188150"
+    assert card["accomodation_rating"] == {"rating": 4.5, "count": "1,834"}
+    assert card["priceForDisplay"] == "$245"
+    assert len(card["accomodation_photos"]) == 2
+    # missing and null upstream values
+    assert hotel.to_hotel_card({"bubbleRating": None, "cardPhotos": None}) == {
+        **dict.fromkeys(card, None),
+        "accomodation_rating": {"rating": 0.0, "count": "0"},
+        "accomodation_photos": [],
+    }
+    assert hotel.hotel_keys({"bubbleRating": {"rating": None}}) == {
+        "rating": 0.0,
+        "price": None,
+        "provider": None,
+    }
+
+
+def hotel_listing(count):
+    template = json.loads((FIXTURE.parent / "hotels.json").read_text())
+    hotels = []
+    for i in range(count):
+        hotel = copy.deepcopy(template["data"]["data"][i % 2])
+        hotel["id"] = str(i)
+        hotel["priceForDisplay"] = f"${(i * 37) % 500 + 100:,}" if i % 5 else None
+        hotel["provider"] = ("Booking.com", "Expedia.com", "Hotels.com")[i % 3]
+        hotel["bubbleRating"] = {"rating": (i % 4) + 2.0, "count": str(i)}
+        hotels.append(hotel)
+    template["data"]["data"] = hotels
+    return template
+
+
+def test_search_hotels_pages_the_cached_result_set(mock_upstream):
+    url = "https://tripadvisor16.p.rapidapi.com/api/v1/hotels/searchHotels"
+    mock_upstream.add("GET", url, json=hotel_listing(25))
+    body = {
+        "geoId": 187147,
+        "checkIn": "2024-06-01",
+        "checkOut": "2024-06-03",
+        "adults": 1,
+    }
+
+    def ids(params=""):
+        response = client.post(f"/hotel/search-hotels{params}", json=body)
+        assert response.status_code == 200
+        return response.headers["X-Total-Count"], [
+            hotel["accomodation_id"] for hotel in response.json()
+        ]
+
+    assert ids() == ("25", [str(i) for i in range(10)])
+    assert ids("?offset=20") == ("25", ["20", "21", "22", "23", "24"])
+
+    total, cheapest = ids("?sort=price&limit=3")
+    assert (total, cheapest) == ("25", ["14", "1", "2"])
+    # unpriced hotels sort last and fall out of price filters
+    assert ids("?sort=price&offset=20")[1] == ["0", "5", "10", "15", "20"]
+    assert ids("?max_price=150") == ("2", ["1", "14"])
+    assert ids("?provider=expedia.com&min_rating=4") == ("4", ["7", "10", "19", "22"])
+    assert ids("?provider=Hotels.com&provider=Expedia.com&limit=100")[0] == "16"
+    assert len(mock_upstream.calls) == 1
+
+
+def test_search_hotels_skips_malformed_records(mock_upstream):
+    url = "https://tripadvisor16.p.rapidapi.com/api/v1/hotels/searchHotels"
+    payload = hotel_listing(15)
+    payload["data"]["data"][12]["cardPhotos"][0]["sizes"]["maxHeight"] = "tall"
+    mock_upstream.add("GET", url, json=payload)
+    body = {"geoId": 1, "checkIn": "2024-06-01", "checkOut": "2024-06-03", "adults": 1}
+
+    response = client.post("/hotel/search-hotels?offset=10", json=body)
+
+    assert response.status_code == 200
+    assert response.headers["X-Total-Count"] == "14"
+    ids = [hotel["accomodation_id"] for hotel in response.json()]
+    assert ids == ["10", "11", "13", "14"]
+
+
+def test_search_hotels_rejects_unknown_sort(mock_upstream):
+    response = client.post(
+        "/hotel/search-hotels?sort=name",
+        json={
+            "geoId": 1,
+            "checkIn": "2024-06-01",
+            "checkOut": "2024-06-03",
+            "adults": 1,
+        },
+    )
+    assert response.status_code == 422
+    assert mock_upstream.calls == []
@@ -0,0 +1,63 @@
+import json
+import os
+import pytest
+from bson import ObjectId
+from mongomock import MongoClient
+from pymongo.errors import DuplicateKeyError
+from app.db.indexes import INDEXES, ensure_indexes
+
+
+@pytest.mark.asyncio
+async def test_ensure_indexes_is_idempotent(mock_db):
+    await ensure_indexes(mock_db)
+    await ensure_indexes(mock_db)
+
+    for collection, models in INDEXES.items():
+        existing = mock_db[collection].index_information()
+        for model in models:
+            assert model.document["name"] in existing
+
+
+@pytest.mark.asyncio
+async def test_user_email_is_unique(mock_db):
+    await ensure_indexes(mock_db)
+    mock_db["users"].insert_one({"email": "a@example.com", "username": "a"})
+
+    with pytest.raises(DuplicateKeyError):
+        mock_db["users"].insert_one({"email": "a@example.com", "username": "b"})
+
+
+@pytest.fixture
+def live_db():
+    uri = os.getenv("MONGODB_TEST_URI")
+    if not uri:
+        pytest.skip("explain plans need a real mongod (set MONGODB_TEST_URI)")
+    from pymongo import MongoClient as LiveClient
+
+    client = LiveClient(uri)
+    db = client["explorehub_index_test"]
+    yield db
+    client.drop_database(db.name)
+    client.close()
+
+
+@pytest.mark.asyncio
+async def test_hot_queries_use_indexes(live_db):
+    await ensure_indexes(live_db)
+    user_id = ObjectId()
+    live_db["users"].insert_one(
+        {"_id": user_id, "email": "a@example.com", "username": "a"}
+    )
+    live_db["saved_trips"].insert_one({"userEmail": "a@example.com"})
+    live_db["favorite_flights"].insert_one({"user_id": str(user_id)})
+
+    cursors = [
+        live_db["users"].find({"email": "a@example.com"}),
+        live_db["users"].find({"username": "a"}),
+        live_db["users"].find({"_id": user_id}),
+        live_db["saved_trips"].find({"userEmail": "a@example.com"}).sort("_id", -1),
+        live_db["favorite_flights"].find({"user_id": str(user_id)}),
+    ]
+    for cursor in cursors:
+        plan = cursor.explain()["queryPlanner"]["winningPlan"]
+        assert "COLLSCAN" not in json.dumps(plan)
@@ -0,0 +1,80 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app import locations
+from app.config import settings
+
+client = TestClient(app)
+
+URL = "https://tripadvisor16.p.rapidapi.com/api/v1/hotels/searchLocation"
+
+
+def loc(title, document_id, secondary="France"):
+    return {"title": title, "documentId": document_id, "secondaryText": secondary}
+
+
+def test_upstream_results_are_indexed_and_persisted(
+    mock_upstream, override_get_db, mock_db, monkeypatch
+):
+    monkeypatch.setattr(settings, "LOCATION_LOCAL_MIN_RESULTS", 2)
+    mock_upstream.add(
+        "GET",
+        URL,
+        json={"data": [loc("Paris", "1"), loc("Paris Las Vegas", "2", "Nevada")]},
+    )
+
+    response = client.post("/hotel/search-location", json={"location": "Paris"})
+    assert response.status_code == 200
+    assert [location["documentId"] for location in response.json()["locs"]] == [
+        "1",
+        "2",
+    ]
+    assert mock_db["locations"].find_one({"_id": "2"}) == {
+        "_id": "2",
+        "title": "Paris Las Vegas",
+        "secondaryText": "Nevada",
+        "popularity": 1,
+    }
+
+    # a longer query with enough local matches never reaches upstream
+    response = client.post("/hotel/search-location", json={"location": "par"})
+    assert [location["title"] for location in response.json()["locs"]] == [
+        "Paris",
+        "Paris Las Vegas",
+    ]
+    assert len(mock_upstream.calls) == 1
+
+
+def test_autocomplete_ranks_by_popularity():
+    index = locations.get_index()
+    index.add(loc("Paris", "1"))
+    index.add(loc("Parma", "2", "Italy"), popularity=5)
+    index.add(loc("Porto", "3", "Portugal"), popularity=9)
+
+    response = client.get("/hotel/autocomplete-location", params={"q": "pa"})
+    assert [location["title"] for location in response.json()["locs"]] == [
+        "Parma",
+        "Paris",
+    ]
+    response = client.get("/hotel/autocomplete-location", params={"q": "parma it"})
+    assert [location["title"] for location in response.json()["locs"]] == ["Parma"]
+    response = client.get("/hotel/autocomplete-location", params={"q": "p", "limit": 1})
+    assert [location["title"] for location in response.json()["locs"]] == ["Porto"]
+
+
+def test_warm_loads_persisted_locations(mock_db):
+    mock_db["locations"].insert_many(
+        [
+            {"_id": "1", "title": "Paris", "secondaryText": "France", "popularity": 1},
+            {"_id": "2", "title": "Parma", "secondaryText": "Italy", "popularity": 3},
+        ]
+    )
+    asyncio.run(locations.warm(mock_db))
+
+    assert [
+        location["documentId"] for location in locations.get_index().search("par")
+    ] == [
+        "2",
+        "1",
+    ]
@@ -1,5 +1,4 @@
 import pytest
-from mongomock import MongoClient
 from app.db.db_user import create_user
 from app.schemas import UserCreate, LoginSchema, UserGet
 from fastapi import HTTPException, status
@@ -10,14 +9,6 @@ from bson import ObjectId
 from app.db.db_user import authenticate_user
 
 
-@pytest.fixture
-def mock_db():
-    client = MongoClient()
-    db = client["test_database"]
-    yield db
-    client.close()
-
-
 @pytest.fixture
 def user_data():
     return UserCreate(
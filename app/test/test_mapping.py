@@ -0,0 +1,103 @@
+import pytest
+from app.mapping import Each, Field, Nested, compile_mapping
+from app.schemas import BubbleRating, HotelData
+
+
+def test_paths_defaults_and_converts():
+    extract = compile_mapping(
+        {
+            "name": "title",
+            "city": "address.city",
+            "first": "items.0.id",
+            "count": Field("count", default=0, convert=int),
+            "code": Field("code", convert=str.upper, only=str),
+            "tags": Field("tags", default=[]),
+        }
+    )
+
+    assert extract(
+        {
+            "title": "A",
+            "address": {"city": "Paris"},
+            "items": [{"id": 7}],
+            "count": "3",
+            "code": "cdg",
+        }
+    ) == {
+        "name": "A",
+        "city": "Paris",
+        "first": 7,
+        "count": 3,
+        "code": "CDG",
+        "tags": [],
+    }
+    # missing, null and wrongly typed steps yield None (or the default)
+    assert extract({"address": None, "items": {}, "count": None, "code": 5}) == {
+        "name": None,
+        "city": None,
+        "first": None,
+        "count": 0,
+        "code": 5,
+        "tags": [],
+    }
+    assert extract(None) == extract({})
+    assert extract({})["tags"] is not extract({})["tags"]
+
+
+def test_each_and_nested():
+    rating = compile_mapping({"rating": "rating", "count": "count"}, BubbleRating)
+    extract = compile_mapping(
+        {
+            "ratings": Each("ratings", rating),
+            "names": Each("ratings", Field("name", default="")),
+            "best": Nested("best", rating, optional=True),
+            "place": Nested("place", {"city": "city"}),
+        }
+    )
+
+    source = {"ratings": [{"rating": 4.5, "count": "10"}, None], "place": None}
+    with pytest.raises(ValueError):
+        extract(source)
+    source["ratings"].pop()
+    assert extract(source) == {
+        "ratings": [BubbleRating(rating=4.5, count="10")],
+        "names": [""],
+        "best": None,
+        "place": {"city": None},
+    }
+    assert extract.plain(source)["ratings"] == [{"rating": 4.5, "count": "10"}]
+    assert extract({"ratings": None})["ratings"] == []
+
+
+def test_schema_validates_once_and_plain_skips_it():
+    rating = compile_mapping({"rating": "rating", "count": "count"}, BubbleRating)
+    card = compile_mapping({"accomodation_rating": Nested("stars", rating)}, HotelData)
+    section = compile_mapping({"stars": Nested("stars", rating)})
+
+    # inlined under a schema that validates the whole result, called otherwise
+    assert ".get('count')" in card.source
+    assert ".get('count')" not in section.source
+    result = card({"stars": {"rating": 4, "count": "12"}})
+    assert result.accomodation_rating == BubbleRating(rating=4.0, count="12")
+    assert section({"stars": {"rating": 4, "count": "12"}}) == {
+        "stars": BubbleRating(rating=4.0, count="12")
+    }
+    assert section.plain({"stars": {"rating": "x"}}) == {
+        "stars": {"rating": "x", "count": None}
+    }
+    with pytest.raises(ValueError):
+        card({"stars": {"rating": "x"}})
+
+
+def test_shared_prefixes_are_looked_up_once():
+    extract = compile_mapping(
+        {"a": "photo.images.small.url", "b": "photo.images.large.url"}
+    )
+    assert extract.source.count(".get('photo')") == 1
+    assert extract.source.count(".get('images')") == 1
+    assert extract.plain is extract
+
+
+def test_unsupported_rule():
+    with pytest.raises(TypeError):
+        compile_mapping({"a": 1})
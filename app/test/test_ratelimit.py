@@ -0,0 +1,224 @@
+import asyncio
+import time
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app import ratelimit, upstream
+from app.cache import MemoryBackend, ResponseCache
+from app.ratelimit import RateLimiter, RateLimitedTransport, UpstreamThrottled
+from app.router import trip, user
+from app.schemas import HotelDetailsRequest
+
+client = TestClient(app)
+
+URL = "https://tripadvisor16.p.rapidapi.com/api/v1/hotels/searchHotels"
+KEY = {"X-RapidAPI-Key": "test-key"}
+
+
+def limiter(**overrides) -> RateLimiter:
+    options = dict(host_rate=0, host_burst=1, key_rate=0, key_burst=1, max_wait=5)
+    options.update(overrides)
+    return RateLimiter(**options)
+
+
+def limited(mock_upstream, rate_limiter: RateLimiter) -> httpx.AsyncClient:
+    transport = httpx.MockTransport(mock_upstream.handler)
+    return httpx.AsyncClient(transport=RateLimitedTransport(transport, rate_limiter))
+
+
+@pytest.mark.asyncio
+async def test_host_bucket_spaces_out_calls(mock_upstream):
+    mock_upstream.add("GET", URL, json={})
+    rate_limiter = limiter(host_rate=20, host_burst=1)
+    http = limited(mock_upstream, rate_limiter)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(http.get(URL) for _ in range(3)))
+
+    assert time.perf_counter() - started >= 0.09
+    stats = rate_limiter.stats()["hosts"]["tripadvisor16.p.rapidapi.com"]
+    assert stats["interactive"]["requests"] == 3
+    assert stats["interactive"]["wait_max_ms"] >= 90
+
+
+@pytest.mark.asyncio
+async def test_interactive_calls_go_before_background_calls(mock_upstream):
+    mock_upstream.add("GET", URL, json={})
+    http = limited(mock_upstream, limiter(key_rate=20, key_burst=1))
+    await http.get(URL, headers=KEY)  # uses up the burst
+
+    async def call(name: str, background: bool):
+        if background:
+            with ratelimit.background():
+                await http.get(URL, headers=KEY, params={"name": name})
+        else:
+            await http.get(URL, headers=KEY, params={"name": name})
+
+    await asyncio.gather(
+        call("refresh-1", True), call("refresh-2", True), call("search", False)
+    )
+
+    order = [request.url.params.get("name") for request in mock_upstream.calls[1:]]
+    assert order == ["search", "refresh-1", "refresh-2"]
+
+
+@pytest.mark.asyncio
+async def test_exhausted_quota_waits_for_reset_or_fails_fast(mock_upstream):
+    mock_upstream.add(
+        "GET",
+        URL,
+        json={},
+        headers={
+            "X-RateLimit-Requests-Limit": "500",
+            "X-RateLimit-Requests-Remaining": "0",
+            "X-RateLimit-Requests-Reset": "0.2",
+        },
+    )
+    rate_limiter = limiter()
+    http = limited(mock_upstream, rate_limiter)
+    await http.get(URL, headers=KEY)
+
+    # other hosts and keys are not held up
+    await http.get(URL, headers={"X-RapidAPI-Key": "another-key"})
+    started = time.perf_counter()
+    await http.get(URL, headers=KEY)
+    assert time.perf_counter() - started >= 0.15
+
+    rate_limiter.max_wait = 0.05
+    with pytest.raises(UpstreamThrottled) as error:
+        await http.get(URL, headers=KEY)
+    assert error.value.retry_after > 0.05
+    stats = rate_limiter.stats()
+    assert (
+        stats["hosts"]["tripadvisor16.p.rapidapi.com"]["interactive"]["throttled"] == 1
+    )
+    assert len(stats["keys"]) == 2
+    for key in stats["keys"].values():
+        assert key["quota"]["requests"]["limit"] == 500
+
+
+@pytest.mark.asyncio
+async def test_background_calls_leave_quota_reserve_to_interactive(mock_upstream):
+    mock_upstream.add(
+        "GET",
+        URL,
+        json={},
+        headers={
+            "X-RateLimit-Requests-Limit": "100",
+            "X-RateLimit-Requests-Remaining": "10",
+            "X-RateLimit-Requests-Reset": "3600",
+        },
+    )
+    http = limited(mock_upstream, limiter(max_wait=0.1))
+    await http.get(URL, headers=KEY)
+
+    with ratelimit.background():
+        with pytest.raises(UpstreamThrottled):
+            await http.get(URL, headers=KEY)
+    assert (await http.get(URL, headers=KEY)).status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_429_is_sent_again_after_retry_after():
+    statuses = iter([429, 200])
+    calls = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(time.perf_counter())
+        return httpx.Response(next(statuses), headers={"Retry-After": "0.1"})
+
+    rate_limiter = limiter()
+    http = httpx.AsyncClient(
+        transport=RateLimitedTransport(httpx.MockTransport(handler), rate_limiter)
+    )
+
+    response = await http.get(URL, headers=KEY)
+
+    assert response.status_code == 200
+    assert calls[1] - calls[0] >= 0.09
+    assert (
+        rate_limiter.stats()["hosts"]["tripadvisor16.p.rapidapi.com"]["retried_429"]
+        == 1
+    )
+
+
+@pytest.mark.asyncio
+async def test_stale_refresh_runs_as_background_traffic():
+    cache = ResponseCache(MemoryBackend(max_bytes=1000), stale_ttl=60)
+    request = HotelDetailsRequest(geoId=1, checkIn="a", checkOut="b", adults=2)
+    priorities = []
+
+    async def fetch():
+        priorities.append(ratelimit.current_priority())
+        return "value"
+
+    await cache.get_or_fetch("search", request, fetch, ttl=0)
+    await cache.get_or_fetch("search", request, fetch, ttl=60)
+    await asyncio.sleep(0)
+
+    assert priorities == [ratelimit.INTERACTIVE, ratelimit.BACKGROUND]
+
+
+def test_throttled_search_is_a_503(mock_upstream):
+    mock_upstream.add("GET", URL, json={"data": {"data": []}})
+    rate_limiter = limiter(host_rate=0.01, host_burst=1, max_wait=0.1)
+    app.dependency_overrides[upstream.tripadvisor] = lambda: limited(
+        mock_upstream, rate_limiter
+    )
+    ratelimit._limiter = rate_limiter
+    body = {"geoId": 187147, "checkIn": "2024-06-01", "checkOut": "2024-06-03"}
+
+    first = client.post("/hotel/search-hotels", json={**body, "adults": 1})
+    second = client.post("/hotel/search-hotels", json={**body, "adults": 2})
+
+    assert first.status_code == 200
+    assert second.status_code == 503
+    assert int(second.headers["Retry-After"]) >= 1
+    metrics = client.get("/metrics/upstream").json()
+    interactive = metrics["hosts"]["tripadvisor16.p.rapidapi.com"]["interactive"]
+    assert (interactive["requests"], interactive["throttled"]) == (1, 1)
+
+
+def test_throttled_one_way_search_is_a_503(mock_upstream):
+    url = "https://tripadvisor16.p.rapidapi.com/api/v1/flights/searchFlights"
+    mock_upstream.add("GET", url, json={"data": {"flights": []}})
+    rate_limiter = limiter(host_rate=0.01, host_burst=1, max_wait=0.1)
+    app.dependency_overrides[upstream.tripadvisor] = lambda: limited(
+        mock_upstream, rate_limiter
+    )
+    body = {
+        "sourceAirportCode": "JFK",
+        "destinationAirportCode": "CDG",
+        "date": "2024-06-01",
+        "itineraryType": "ONE_WAY",
+        "sortOrder": "PRICE",
+        "numAdults": 1,
+        "numSeniors": 0,
+        "classOfService": "ECONOMY",
+    }
+
+    first = client.post("/user/search-one-way-flights", json=body)
+    second = client.post(
+        "/user/search-one-way-flights", json={**body, "sortOrder": "DURATION"}
+    )
+
+    assert first.status_code == 200
+    assert second.status_code == 503
+    assert int(second.headers["Retry-After"]) >= 1
+
+
+@pytest.mark.asyncio
+async def test_throttled_trip_leg_and_batch_entries():
+    async def fetch():
+        raise UpstreamThrottled("tripadvisor16.p.rapidapi.com", 2.5)
+
+    section = await trip.run_leg(fetch, timeout=1)
+    entry = user.weather_result("Paris", UpstreamThrottled("api.openweathermap.org", 0))
+
+    assert (section["status"], section["retry_after"]) == ("throttled", 3)
+    assert (entry["city"], entry["status"], entry["retry_after"]) == (
+        "Paris",
+        "throttled",
+        1,
+    )
@@ -0,0 +1,36 @@
+from app.result_query import parse_price, select
+
+
+def test_parse_price():
+    assert parse_price("$245") == 245.0
+    assert parse_price("$1,020") == 1020.0
+    assert parse_price("US$1,234.50 total") == 1234.5
+    assert parse_price("") is None
+    assert parse_price(None) is None
+    assert parse_price("Sold out") is None
+
+
+def test_select_filters_sorts_and_pages():
+    keys = {
+        "price": [300.0, None, 100.0, 200.0, 100.0],
+        "provider": ["b", "a", "c", "a", None],
+    }
+
+    assert select(keys, [], None) == (5, [0, 1, 2, 3, 4])
+    # missing values go last, ties keep upstream order
+    assert select(keys, [], "price") == (5, [2, 4, 3, 0, 1])
+    assert select(keys, [], "-price") == (5, [0, 3, 2, 4, 1])
+    assert select(keys, [], "provider", limit=2) == (5, [1, 3])
+    assert select(keys, [], "-provider", offset=1, limit=2) == (5, [0, 1])
+    assert select(keys, [("price", lambda p: p <= 200)], "price") == (3, [2, 4, 3])
+
+
+def test_heap_selection_orders_like_a_full_sort():
+    prices = [float(i % 7) if i % 5 else None for i in range(100)]
+    keys = {"price": prices}
+
+    for sort in ("price", "-price"):
+        _, everything = select(keys, [], sort)
+        # 100 rows against a page end of 3 or 10: heap selection
+        assert select(keys, [], sort, limit=3)[1] == everything[:3]
+        assert select(keys, [], sort, offset=5, limit=5)[1] == everything[5:10]
@@ -0,0 +1,187 @@
+import time
+from pathlib import Path
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app import airports, fastjson
+from app.config import settings
+
+client = TestClient(app)
+
+AIRPORT_URL = "https://tripadvisor16.p.rapidapi.com/api/v1/flights/searchAirport"
+FLIGHTS_URL = "https://tripadvisor16.p.rapidapi.com/api/v1/flights/searchFlights"
+HOTELS_URL = "https://tripadvisor16.p.rapidapi.com/api/v1/hotels/searchHotels"
+ATTRACTIONS_URL = "https://tourist-attraction.p.rapidapi.com/search"
+WEATHER_URL = "http://api.openweathermap.org/data/2.5/weather"
+
+AIRPORT = {"data": [{"airportCode": "LAX", "details": {"parent_ids": [32655]}}]}
+WEATHER = {
+    "main": {"temp": 290.0, "feels_like": 289.0, "humidity": 40},
+    "weather": [{"main": "Clear"}],
+}
+
+TRIP = {
+    "from_": "New York",
+    "to_": "Los Angeles",
+    "date": "2024-06-01",
+    "returnDate": "2024-06-08",
+}
+
+
+@pytest.fixture
+def upstreams(mock_upstream):
+    def add(latency=0.0, **overrides):
+        routes = {
+            "airport": ("GET", AIRPORT_URL, AIRPORT),
+            "flights": ("GET", FLIGHTS_URL, {"data": {"flights": []}}),
+            "hotels": ("GET", HOTELS_URL, {"data": {"data": []}}),
+            "attractions": ("POST", ATTRACTIONS_URL, {"results": {"data": []}}),
+            "weather": ("GET", WEATHER_URL, WEATHER),
+        }
+        for name, (method, url, json) in routes.items():
+            status, leg_latency = overrides.get(name, (200, latency))
+            mock_upstream.add(
+                method, url, json=json, status=status, latency=leg_latency
+            )
+
+    return add
+
+
+def test_all_sections_ok(upstreams):
+    upstreams()
+    response = client.post("/trip/search", json=TRIP)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "complete"
+    sections = body["sections"]
+    assert sections["to_airport"]["data"] == {"parent_id": 32655, "airport_code": "LAX"}
+    assert sections["flights"]["data"] == []
+    assert sections["hotels"]["data"] == []
+    assert sections["weather"]["data"][0]["Description"] == "Clear"
+
+
+def test_hotels_section_reads_serialized_listings(
+    upstreams, mock_upstream, monkeypatch
+):
+    monkeypatch.setattr(settings, "FAST_RESPONSES", True)
+    hotels = fastjson.loads(
+        (Path(__file__).parent / "fixtures" / "hotels.json").read_bytes()
+    )
+    mock_upstream.add("GET", HOTELS_URL, json=hotels)
+    upstreams()
+
+    body = client.post("/trip/search", json=TRIP).json()
+
+    assert body["status"] == "complete"
+    section = body["sections"]["hotels"]["data"]
+    assert [hotel["accomodation_id"] for hotel in section] == ["188150", "233405"]
+    assert section[0]["accomodation_rating"] == {"rating": 4.5, "count": "1,834"}
+
+
+def test_legs_run_concurrently(upstreams):
+    upstreams(latency=0.2)
+    started = time.perf_counter()
+    body = client.post("/trip/search", json=TRIP).json()
+    elapsed = time.perf_counter() - started
+
+    assert body["status"] == "complete"
+    # airport lookup, then flights/hotels/attractions side by side: ~0.4s,
+    # where calling the six upstreams in turn takes 1.2s
+    assert elapsed < 0.8
+
+
+def test_slow_leg_times_out_without_failing_the_rest(upstreams, monkeypatch):
+    monkeypatch.setattr(settings, "TRIP_SEARCH_LEG_TIMEOUT", 0.2)
+    upstreams(weather=(200, 1.0))
+    body = client.post("/trip/search", json=TRIP).json()
+
+    assert body["status"] == "partial"
+    assert body["sections"]["weather"]["status"] == "timeout"
+    assert body["sections"]["flights"]["status"] == "ok"
+    assert body["sections"]["hotels"]["status"] == "ok"
+
+
+def test_failed_airport_skips_dependent_legs(upstreams):
+    upstreams(airport=(500, 0.0))
+    body = client.post("/trip/search", json=TRIP).json()
+
+    sections = body["sections"]
+    assert body["status"] == "partial"
+    assert sections["to_airport"]["status"] == "error"
+    assert sections["to_airport"]["error"] == "Error fetching airport data"
+    for name in ("flights", "hotels", "attractions"):
+        assert sections[name]["status"] == "skipped"
+    assert sections["weather"]["status"] == "ok"
+
+
+def test_one_way_trip_books_one_night(upstreams, mock_upstream):
+    upstreams()
+    trip = {key: value for key, value in TRIP.items() if key != "returnDate"}
+    body = client.post("/trip/search", json=trip).json()
+
+    assert body["sections"]["hotels"]["status"] == "ok"
+    [hotels] = [
+        call for call in mock_upstream.calls if call.url.path.endswith("Hotels")
+    ]
+    assert hotels.url.params["checkOut"] == "2024-06-02"
+
+
+def test_one_way_trip_searches_one_way_flights(upstreams, mock_upstream):
+    flights = fastjson.loads(
+        (Path(__file__).parent / "fixtures" / "flights.json").read_bytes()
+    )
+    mock_upstream.add("GET", FLIGHTS_URL, json=flights)
+    upstreams()
+    body = client.post("/trip/search", json={**TRIP, "itineraryType": "ONE_WAY"})
+
+    section = body.json()["sections"]["flights"]
+    assert section["status"] == "ok"
+    assert section["data"][0]["Number of Stops"] == "Direct"
+    assert "outbound" not in section["data"][0]
+    [search] = [
+        call for call in mock_upstream.calls if call.url.path.endswith("Flights")
+    ]
+    assert search.url.params["itineraryType"] == "ONE_WAY"
+    assert "returnDate" not in search.url.params
+
+
+def test_invalid_search_fails_only_its_section(upstreams, mock_upstream):
+    airport = {"data": [{"airportCode": "LAX", "details": {"parent_ids": ["x"]}}]}
+    mock_upstream.add("GET", AIRPORT_URL, json=airport)
+    upstreams()
+    body = client.post("/trip/search", json=TRIP).json()
+
+    sections = body["sections"]
+    assert body["status"] == "partial"
+    assert sections["hotels"]["status"] == "error"
+    assert "geoId" in sections["hotels"]["error"]
+    for name in ("flights", "attractions", "weather"):
+        assert sections[name]["status"] == "ok"
+
+
+def test_bad_date_is_rejected_before_any_leg_starts(upstreams, mock_upstream):
+    upstreams()
+    response = client.post(
+        "/trip/search", json={"from_": "New York", "to_": "LA", "date": "June 1"}
+    )
+
+    assert response.status_code == 422
+    assert mock_upstream.calls == []
+
+
+def test_unknown_destination_is_not_guessed(upstreams, mock_upstream, monkeypatch):
+    monkeypatch.setattr(
+        settings,
+        "AIRPORT_SNAPSHOT_PATH",
+        str(Path(airports.__file__).parent / "data" / "airports.csv"),
+    )
+    # registered first, so upstream knows no airport for the query
+    mock_upstream.add("GET", AIRPORT_URL, json={"data": []})
+    upstreams()
+    body = client.post("/trip/search", json={**TRIP, "to_": "Parish"}).json()
+
+    sections = body["sections"]
+    assert sections["to_airport"]["status"] == "ambiguous"
+    assert sections["to_airport"]["candidates"][0]["airport_code"] == "PAR"
+    assert sections["flights"]["status"] == "skipped"
+    assert sections["hotels"]["status"] == "skipped"
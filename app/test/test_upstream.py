@@ -0,0 +1,20 @@
+import pytest
+from app import upstream
+from app.config import settings
+
+
+@pytest.mark.asyncio
+async def test_upstream_client_is_shared_per_host():
+    first = await upstream.tripadvisor()
+    second = await upstream.tripadvisor()
+    weather = await upstream.openweather()
+
+    assert first is second
+    assert first is not weather
+    assert first.timeout.read == settings.TRIPADVISOR_TIMEOUT
+    assert weather.timeout.read == settings.WEATHER_TIMEOUT
+
+    await upstream.close()
+    assert first.is_closed
+    assert (await upstream.tripadvisor()) is not first
+    await upstream.close()
@@ -1,8 +1,8 @@
 import pytest
-import responses
 from fastapi.testclient import TestClient
 from app.main import app
 import re
+import time
 
 client = TestClient(app)
 
@@ -12,13 +12,12 @@ def weather_search_data():
     return {"city": "Mumbai"}
 
 
-@responses.activate
-def test_get_weather_success(weather_search_data):
+def test_get_weather_success(mock_upstream, weather_search_data):
     url_regex = re.compile(
         r"http://api.openweathermap.org/data/2.5/weather\?q=.*&appid=.*"
     )
-    responses.add(
-        responses.GET,
+    mock_upstream.add(
+        "GET",
         url_regex,
         json={
             "main": {
@@ -38,3 +37,67 @@ def test_get_weather_success(weather_search_data):
     response = client.post("/user/get-weather", json=weather_search_data)
     assert response.status_code == 200
     assert response.json()[0]["Description"] == "Clear"
+
+
+WEATHER_URL = re.compile(r"http://api.openweathermap.org/data/2.5/weather\?q=.*")
+
+
+def weather(temp):
+    return {
+        "main": {"temp": temp, "feels_like": temp, "humidity": 50},
+        "weather": [{"main": "Clouds"}],
+    }
+
+
+def test_weather_is_cached_by_normalized_city(mock_upstream):
+    mock_upstream.add("GET", WEATHER_URL, json=weather(290.0))
+
+    first = client.post("/user/get-weather", json={"city": "New York"})
+    second = client.post("/user/get-weather", json={"city": "  new   YORK "})
+
+    assert first.json() == second.json()
+    assert len(mock_upstream.calls) == 1
+    assert mock_upstream.calls[0].url.params["q"] == "new york"
+
+
+def test_weather_batch_fetches_misses_concurrently(mock_upstream):
+    latency = 0.2
+    mock_upstream.add(
+        "GET",
+        re.compile(r".*weather\?q=atlantis&.*"),
+        json={"cod": "404", "message": "city not found"},
+        status=404,
+    )
+    mock_upstream.add("GET", WEATHER_URL, json=weather(280.0), latency=latency)
+    client.post("/user/get-weather", json={"city": "Paris"})
+
+    start = time.perf_counter()
+    response = client.post(
+        "/user/get-weather/batch",
+        json={"cities": ["Paris", "Rome", "Tokyo", "Oslo", "rome", "Atlantis"]},
+    )
+    elapsed = time.perf_counter() - start
+
+    assert response.status_code == 200
+    results = response.json()["weather"]
+    assert [r["city"] for r in results] == [
+        "Paris",
+        "Rome",
+        "Tokyo",
+        "Oslo",
+        "rome",
+        "Atlantis",
+    ]
+    assert [r["status"] for r in results] == ["ok"] * 5 + ["not_found"]
+    assert results[1]["weather"][0]["Description"] == "Clouds"
+    # Paris was cached; Rome, Tokyo, Oslo and Atlantis went out side by side
+    assert len(mock_upstream.calls) == 5
+    assert elapsed < latency * 3
+
+
+def test_weather_batch_limits(mock_upstream):
+    assert (
+        client.post("/user/get-weather/batch", json={"cities": []}).status_code == 422
+    )
+    too_many = {"cities": [f"city {i}" for i in range(21)]}
+    assert client.post("/user/get-weather/batch", json=too_many).status_code == 422
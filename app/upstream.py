@@ -0,0 +1,76 @@
+"""Shared HTTP clients for the third-party APIs we call.
+
+There is one pooled ``httpx.AsyncClient`` per upstream host so connections
+(and their TLS sessions) are reused across requests. Routers get them through
+the dependencies at the bottom of this module, which tests override with a
+client backed by ``httpx.MockTransport``. Every client sends through the
+process-wide scheduler in ``app.ratelimit``.
+"""
+
+from typing import Dict
+import httpx
+from app import ratelimit
+from app.config import settings
+
+
+TRIPADVISOR = "tripadvisor"
+ATTRACTION = "attraction"
+WEATHER = "weather"
+
+
+def _timeouts() -> Dict[str, float]:
+    return {
+        TRIPADVISOR: settings.TRIPADVISOR_TIMEOUT,
+        ATTRACTION: settings.ATTRACTION_TIMEOUT,
+        WEATHER: settings.WEATHER_TIMEOUT,
+    }
+
+
+_clients: Dict[str, httpx.AsyncClient] = {}
+
+
+def build_client(name: str) -> httpx.AsyncClient:
+    transport = httpx.AsyncHTTPTransport(
+        http2=settings.UPSTREAM_HTTP2,
+        limits=httpx.Limits(
+            max_connections=settings.UPSTREAM_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.UPSTREAM_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.UPSTREAM_KEEPALIVE_EXPIRY,
+        ),
+    )
+    return httpx.AsyncClient(
+        transport=ratelimit.RateLimitedTransport(transport, ratelimit.get_limiter()),
+        timeout=httpx.Timeout(
+            _timeouts()[name], connect=settings.UPSTREAM_CONNECT_TIMEOUT
+        ),
+    )
+
+
+def get_client(name: str) -> httpx.AsyncClient:
+    client = _clients.get(name)
+    if client is None or client.is_closed:
+        client = _clients[name] = build_client(name)
+    return client
+
+
+def start() -> None:
+    for name in _timeouts():
+        get_client(name)
+
+
+async def close() -> None:
+    while _clients:
+        _, client = _clients.popitem()
+        await client.aclose()
+
+
+async def tripadvisor() -> httpx.AsyncClient:
+    return get_client(TRIPADVISOR)
+
+
+async def tourist_attraction() -> httpx.AsyncClient:
+    return get_client(ATTRACTION)
+
+
+async def openweather() -> httpx.AsyncClient:
+    return get_client(WEATHER)
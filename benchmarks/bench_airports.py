@@ -0,0 +1,79 @@
+"""Airport resolution: local index lookups vs. a searchAirport round-trip.
+
+    python -m benchmarks.bench_airports
+
+The index is the shipped snapshot padded with synthetic entries to
+``BENCH_AIRPORTS`` names; the upstream figure is a mocked call with
+``BENCH_UPSTREAM_LATENCY`` seconds of latency, the floor a real RapidAPI call
+cannot beat.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import string
+import time
+
+import httpx
+
+from app.airports import AirportIndex
+from app.config import settings
+from app.router.user import fetch_airport
+
+ITERATIONS = int(os.getenv("BENCH_ITERATIONS", "20000"))
+AIRPORTS = int(os.getenv("BENCH_AIRPORTS", "5000"))
+UPSTREAM_LATENCY = float(os.getenv("BENCH_UPSTREAM_LATENCY", "0.15"))
+
+
+def per_call_us(fn, queries) -> float:
+    start = time.perf_counter()
+    for i in range(ITERATIONS):
+        fn(queries[i % len(queries)])
+    return (time.perf_counter() - start) / ITERATIONS * 1e6
+
+
+def build_index() -> AirportIndex:
+    index = AirportIndex.load(settings.AIRPORT_SNAPSHOT_PATH)
+    rng = random.Random(0)
+    for i in range(AIRPORTS - len(index)):
+        name = "".join(rng.choices(string.ascii_lowercase, k=rng.randint(5, 12)))
+        index.add({"parent_id": i, "airport_code": f"Z{i:05d}"}, name=name.title())
+    return index
+
+
+async def upstream_ms() -> float:
+    async def handler(request):
+        await asyncio.sleep(UPSTREAM_LATENCY)
+        return httpx.Response(
+            200, json={"data": [{"airportCode": "PAR", "details": {"parent_ids": [1]}}]}
+        )
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        start = time.perf_counter()
+        for _ in range(5):
+            await fetch_airport("Paris", client)
+        return (time.perf_counter() - start) / 5 * 1000
+
+
+def main():
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    index = build_index()
+    print(f"index entries: {len(index)}")
+    exact = ["Paris", "new york", "LAX", "Tokyo", "Washington DC"]
+    prefix = ["Barcel", "Amster", "Singap", "Las Veg"]
+    fuzzy = ["Pariss", "Amsterdamm", "Barcelonna", "Seatle"]
+    miss = ["Reykjavik", "Ulaanbaatar", "Kathmandu"]
+    for label, queries in (
+        ("exact", exact),
+        ("prefix", prefix),
+        ("fuzzy", fuzzy),
+        ("miss", miss),
+    ):
+        print(f"lookup, {label:<6}: {per_call_us(index.lookup, queries):10.2f} us")
+
+    print(f"searchAirport round-trip (mocked): {asyncio.run(upstream_ms()):8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Per-request overhead of the auth dependency (token verify + profile lookup).
+
+    python -m benchmarks.bench_auth
+"""
+
+import asyncio
+import os
+import time
+
+from bson import ObjectId
+from mongomock import MongoClient
+
+from app.db import db_user
+from app.jwttoken import create_access_token, verified_tokens, verify_token
+from app.router.user import get_current_user
+
+ITERATIONS = int(os.getenv("BENCH_ITERATIONS", "5000"))
+
+
+def per_call_us(fn) -> float:
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        fn()
+    return (time.perf_counter() - start) / ITERATIONS * 1e6
+
+
+def main():
+    db = MongoClient()["bench"]
+    user_id = ObjectId()
+    db["users"].insert_one(
+        {
+            "_id": user_id,
+            "firstname": "Bench",
+            "lastname": "User",
+            "username": "bench",
+            "email": "bench@example.com",
+            "mobile": "1234567890",
+            "country": "USA",
+            "password": "hashed",
+        }
+    )
+    token = create_access_token(
+        data={"user_email": "bench@example.com", "user_id": str(user_id)}
+    )
+
+    def cold_verify():
+        verified_tokens.clear()
+        verify_token(token)
+
+    print(f"verify_token, decode every call: {per_call_us(cold_verify):8.2f} us")
+    print(
+        f"verify_token, cached:            {per_call_us(lambda: verify_token(token)):8.2f} us"
+    )
+
+    loop = asyncio.new_event_loop()
+
+    def cold_dependency():
+        verified_tokens.clear()
+        db_user.user_profiles.clear()
+        loop.run_until_complete(get_current_user(token, db))
+
+    def warm_dependency():
+        loop.run_until_complete(get_current_user(token, db))
+
+    print(f"get_current_user, cold caches:   {per_call_us(cold_dependency):8.2f} us")
+    print(f"get_current_user, warm caches:   {per_call_us(warm_dependency):8.2f} us")
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Requests/sec with a per-request MongoClient vs the shared process-wide client.
+
+Runs against a real mongod when BENCH_MONGODB_URI is set, otherwise against
+mongomock as a stand-in (which hides the TCP/TLS handshake cost, so the gap
+against a real server is much larger than what mongomock reports).
+
+    python -m benchmarks.bench_db_client
+"""
+
+import asyncio
+import os
+import time
+
+import httpx
+from fastapi import Depends, FastAPI
+
+BENCH_URI = os.getenv("BENCH_MONGODB_URI")
+REQUESTS = int(os.getenv("BENCH_REQUESTS", "500"))
+
+if BENCH_URI:
+    from pymongo import MongoClient
+
+    def new_client():
+        return MongoClient(BENCH_URI)
+
+else:
+    import mongomock
+
+    def new_client():
+        return mongomock.MongoClient()
+
+
+def per_request_db():
+    client = new_client()
+    try:
+        yield client["bench"]
+    finally:
+        client.close()
+
+
+shared_client = new_client()
+
+
+async def shared_db():
+    return shared_client["bench"]
+
+
+def build_app(dependency) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/me")
+    async def me(db=Depends(dependency)):
+        user = db["users"].find_one({"email": "bench@example.com"})
+        return {"username": user["username"] if user else None}
+
+    return app
+
+
+async def run(app: FastAPI) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as c:
+        start = time.perf_counter()
+        for _ in range(REQUESTS):
+            await c.get("/me")
+        elapsed = time.perf_counter() - start
+    return REQUESTS / elapsed
+
+
+def main():
+    shared_client["bench"]["users"].delete_many({})
+    shared_client["bench"]["users"].insert_one(
+        {"email": "bench@example.com", "username": "bench"}
+    )
+
+    before = asyncio.run(run(build_app(per_request_db)))
+    after = asyncio.run(run(build_app(shared_db)))
+    backend = BENCH_URI or "mongomock"
+    print(f"backend: {backend}, requests: {REQUESTS}")
+    print(f"per-request client: {before:10.1f} req/s")
+    print(f"shared client:      {after:10.1f} req/s")
+    print(f"speedup:            {after / before:10.2f}x")
+
+
+if __name__ == "__main__":
+    main()
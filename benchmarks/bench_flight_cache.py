@@ -0,0 +1,147 @@
+"""Memory held by 1,000 cached flight searches: row dicts vs. columnar.
+
+    python -m benchmarks.bench_flight_cache
+
+Builds a searchFlights round-trip response of ``BENCH_FLIGHTS`` itineraries
+from the recorded test fixture (carriers, times and prices varied), then
+caches ``BENCH_SEARCHES`` searches, each parsed from the raw body like a real
+response, in both representations:
+
+* before: the list of display dicts the endpoints used to cache
+* after: the ``app.flight_results`` columnar document
+
+Reports traced memory held, the JSON size the in-process cache charges
+against ``CACHE_MAX_BYTES``, and the time to answer one page of 20 sorted by
+price from a cached entry: the first time ("first us", rows built from the
+columns) and again ("page us", rows kept by ``flight_results.for_document``).
+
+The first page is the known cost of the columnar cache. The "before" rows
+were cached ready-made, so every page was a sort and a slice (about 4 us).
+"after" builds the page's 20 rows from the columns on first use (about 50
+to 70 us), and only the rows asked for. That is the price of holding about
+a third of the memory; later pages and re-sorts reuse the rows built.
+Keep this number in view when touching ``FlightResults``: it is the cost
+every new search pays per page, on top of its upstream call.
+"""
+
+import copy
+import gc
+import json
+import os
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from app import flight_results
+from app.flight_query import FlightQuery, select
+from app.flight_results import FlightResults
+
+SEARCHES = int(os.getenv("BENCH_SEARCHES", "1000"))
+FLIGHTS = int(os.getenv("BENCH_FLIGHTS", "50"))
+FIXTURE = Path(__file__).parent.parent / "app" / "test" / "fixtures" / "flights.json"
+CARRIERS = [
+    "Air France",
+    "Delta",
+    "United Airlines",
+    "American Airlines",
+    "Lufthansa",
+    "KLM",
+    "British Airways",
+    "Iberia",
+]
+
+
+def shifted(value: str, minutes: int) -> str:
+    return (datetime.fromisoformat(value) + timedelta(minutes=minutes)).isoformat()
+
+
+def load_payload() -> bytes:
+    payload = json.loads(FIXTURE.read_text())
+    templates = payload["data"]["flights"]
+    flights = []
+    for i in range(FLIGHTS):
+        flight = copy.deepcopy(templates[i % len(templates)])
+        carrier = CARRIERS[i % len(CARRIERS)]
+        for segment in flight["segments"]:
+            for leg in segment["legs"]:
+                leg["operatingCarrier"] = {
+                    "displayName": carrier,
+                    "logoUrl": "https://static.tacdn.com/img2/flights/airlines/"
+                    f"logos/100x100/{carrier.replace(' ', '')}.png",
+                }
+                leg["departureDateTime"] = shifted(leg["departureDateTime"], i * 17)
+                leg["arrivalDateTime"] = shifted(leg["arrivalDateTime"], i * 23)
+        flight["purchaseLinks"][0]["totalPrice"] = round(400 + i * 13.7, 2)
+        flights.append(flight)
+    payload["data"]["flights"] = flights
+    return json.dumps(payload).encode()
+
+
+def rows_before(raw: bytes) -> list:
+    flights = json.loads(raw)["data"]["flights"]
+    rows = FlightResults(flight_results.round_trip(flights)).rows()
+    # fresh strings per search, as when each response was mapped into dicts
+    return json.loads(json.dumps(rows))
+
+
+def document_after(raw: bytes) -> dict:
+    return flight_results.round_trip(json.loads(raw)["data"]["flights"])
+
+
+def held(build, raw: bytes):
+    gc.collect()
+    tracemalloc.start()
+    entries = [build(raw) for _ in range(SEARCHES)]
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return entries, current / 1024 / 1024
+
+
+def page_before(entry: list) -> list:
+    # the rows already are the response; sort on their typed keys
+    return sorted(entry, key=lambda row: row["keys"]["price"])[:20]
+
+
+def page_after(entry: dict, results=None) -> list:
+    results = results or flight_results.for_document(entry)
+    _, page = select(results.keys, FlightQuery(sort="price", limit=20))
+    return results.rows(page)
+
+
+def first_page_after(entry: dict) -> list:
+    return page_after(entry, FlightResults(entry))
+
+
+def per_call_us(fn, entry, iterations: int = 2000, repeat: int = 5) -> float:
+    """Best of ``repeat`` runs, as the machine's noise only ever adds time."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn(entry)
+        best = min(best, time.perf_counter() - start)
+    return best / iterations * 1e6
+
+
+def main():
+    raw = load_payload()
+    print(f"{SEARCHES} cached searches x {FLIGHTS} round-trip itineraries")
+    print(f"{'':<10} {'held MB':>10} {'cache MB':>10} {'first us':>10} {'page us':>10}")
+    for label, build, first_page, page in (
+        ("before", rows_before, page_before, page_before),
+        ("after", document_after, first_page_after, page_after),
+    ):
+        entries, megabytes = held(build, raw)
+        charged = sum(len(json.dumps(e, default=str)) for e in entries) / 1024 / 1024
+        print(
+            f"{label:<10} {megabytes:10.1f} {charged:10.1f} "
+            f"{per_call_us(first_page, entries[0]):10.1f} "
+            f"{per_call_us(page, entries[0]):10.1f}"
+        )
+        del entries
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Login (bcrypt verify) throughput: inline on the event loop vs the hash pool.
+
+    python -m benchmarks.bench_hashing
+"""
+
+import asyncio
+import os
+import time
+
+from app.db.hash import Hash, HashPool, _verify
+
+LOGINS = int(os.getenv("BENCH_LOGINS", "32"))
+
+
+async def inline(hashed: str) -> float:
+    start = time.perf_counter()
+    for _ in range(LOGINS):
+        Hash.verify(hashed, "password123")
+    return LOGINS / (time.perf_counter() - start)
+
+
+async def pooled(hashed: str, kind: str, workers: int) -> float:
+    pool = HashPool(kind, workers=workers, max_concurrency=workers)
+    try:
+        # warm the workers so process start-up is not measured
+        await asyncio.gather(
+            *(pool.run(_verify, hashed, "password123") for _ in range(workers))
+        )
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(pool.run(_verify, hashed, "password123") for _ in range(LOGINS))
+        )
+        return LOGINS / (time.perf_counter() - start)
+    finally:
+        pool.shutdown()
+
+
+async def main():
+    hashed = Hash.bcrypt("password123")
+    cores = os.cpu_count() or 1
+    print(f"cores: {cores}, logins per run: {LOGINS}")
+    print(f"inline on event loop:      {await inline(hashed):8.1f} logins/s")
+    for kind in ("thread", "process"):
+        for workers in sorted({1, 2, 4, cores}):
+            rate = await pooled(hashed, kind, workers)
+            print(f"{kind:7} pool, {workers:2d} workers: {rate:8.1f} logins/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
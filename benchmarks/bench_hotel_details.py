@@ -0,0 +1,98 @@
+"""Parsing a getHotelDetails payload: three response.json() calls vs. one parse.
+
+    python -m benchmarks.bench_hotel_details
+
+Uses the recorded fixture from the test suite, with its list sections repeated
+until the body is about ``BENCH_PAYLOAD_KB`` KB (real responses are a few
+hundred KB). Point ``BENCH_FIXTURE`` at another recorded response to use that
+as-is. Reports time per parse, the peak memory traced while parsing and what
+is still allocated afterwards (the parsed tree). orjson's peak includes a
+native document it frees before returning; its retained tree is the same as
+the stdlib's.
+"""
+
+import copy
+import json
+import os
+import time
+import tracemalloc
+from pathlib import Path
+
+import httpx
+
+from app import fastjson
+
+ITERATIONS = int(os.getenv("BENCH_ITERATIONS", "200"))
+PAYLOAD_KB = int(os.getenv("BENCH_PAYLOAD_KB", "400"))
+FIXTURE = (
+    Path(__file__).parent.parent / "app" / "test" / "fixtures" / "hotel_details.json"
+)
+
+
+def load_payload() -> bytes:
+    if os.getenv("BENCH_FIXTURE"):
+        return Path(os.environ["BENCH_FIXTURE"]).read_bytes()
+    payload = json.loads(FIXTURE.read_text())
+    data = payload["data"]
+    sections = [
+        data["photos"],
+        data["restaurantsNearby"]["content"],
+        data["attractionsNearby"]["content"],
+        data["qA"]["content"],
+        data["amenitiesScreen"],
+    ]
+    originals = [copy.deepcopy(section) for section in sections]
+    while len(json.dumps(payload)) < PAYLOAD_KB * 1024:
+        for section, original in zip(sections, originals):
+            section.extend(copy.deepcopy(original))
+    return json.dumps(payload).encode()
+
+
+def measure(parse, raw: bytes):
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        parse(raw)
+    per_call_ms = (time.perf_counter() - start) / ITERATIONS * 1000
+
+    tracemalloc.start()
+    tree = parse(raw)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del tree
+    return per_call_ms, peak / 1024, retained / 1024
+
+
+def three_response_json(raw: bytes):
+    response = httpx.Response(200, content=raw)
+    # json = response.json(); print(response.json()); data = response.json()
+    response.json()
+    response.json()
+    return response.json()
+
+
+def one_stdlib_parse(raw: bytes):
+    return json.loads(httpx.Response(200, content=raw).content)
+
+
+def one_fast_parse(raw: bytes):
+    return fastjson.response_json(httpx.Response(200, content=raw))
+
+
+def main():
+    raw = load_payload()
+    backend = "orjson" if fastjson.orjson is not None else "json (orjson not installed)"
+    print(f"payload: {len(raw) / 1024:.0f} KB, fastjson backend: {backend}")
+    for label, parse in (
+        ("3x response.json() (before)", three_response_json),
+        ("1x json.loads", one_stdlib_parse),
+        ("1x fastjson.response_json (after)", one_fast_parse),
+    ):
+        per_call_ms, peak_kb, retained_kb = measure(parse, raw)
+        print(
+            f"{label:<36} {per_call_ms:8.2f} ms   peak {peak_kb:8.0f} KB"
+            f"   retained {retained_kb:8.0f} KB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""Per-transform cost: the compiled mappings vs. the original ``.get`` chains.
+
+    python -m benchmarks.bench_mapping
+
+Runs each transform over the records of the recorded test fixtures
+(``BENCH_ITERATIONS`` passes, best of ``BENCH_REPEAT`` interleaved runs) and
+reports microseconds per record. The "before" functions are the loops the
+routers used before the transforms were declared with ``app.mapping`` (they raise on a
+missing or null step); both sides build the same output.
+"""
+
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+from fastapi.encoders import jsonable_encoder
+
+from app import flight_results
+from app.router import attraction, hotel
+from app.schemas import (
+    AmenityDetail,
+    AnimalTag,
+    Attraction,
+    AttractionData,
+    Booking,
+    Locations,
+    MemberProfile,
+    Photo,
+    PhotoItem,
+    PhotoItemSizeDynamic,
+    PhotoUrls,
+    Price,
+    ProfileImage,
+    QuestionAnswer,
+    Restaurant,
+    Review,
+    TopAnswer,
+    TourOfferDetail,
+)
+
+ITERATIONS = int(os.getenv("BENCH_ITERATIONS", "5000"))
+REPEAT = int(os.getenv("BENCH_REPEAT", "5"))
+FIXTURES = Path(__file__).parent.parent / "app" / "test" / "fixtures"
+
+
+def load(name: str) -> dict:
+    return json.loads((FIXTURES / f"{name}.json").read_text())
+
+
+def hotel_card_before(hotel: dict) -> dict:
+    bubble_rating = {
+        "rating": float(hotel.get("bubbleRating", {}).get("rating", 0) or 0),
+        "count": hotel.get("bubbleRating", {}).get("count", "0"),
+    }
+    photo_items = [
+        PhotoItem(
+            sizes=PhotoItemSizeDynamic(
+                maxHeight=photo["sizes"]["maxHeight"],
+                maxWidth=photo["sizes"]["maxWidth"],
+                urlTemplate=photo["sizes"]["urlTemplate"],
+            )
+        )
+        for photo in hotel.get("cardPhotos", [])
+    ]
+    return {
+        "accomodation_id": hotel.get("id"),
+        "accomodation": hotel.get("title"),
+        "breakfast_info": hotel.get("primaryInfo"),
+        "accomodation_region": hotel.get("secondaryInfo"),
+        "accomodation_rating": bubble_rating,
+        "accomodation_provider": hotel.get("provider"),
+        "priceForDisplay": hotel.get("priceForDisplay"),
+        "strikethroughPrice": hotel.get("strikethroughPrice"),
+        "priceDetails": hotel.get("priceDetails"),
+        "priceSummary": hotel.get("priceSummary"),
+        "accomodation_photos": photo_items,
+    }
+
+
+def _profile_image(profile: dict) -> ProfileImage:
+    return ProfileImage(
+        maxHeight=profile.get("profileImage", {}).get("maxHeight"),
+        maxWidth=profile.get("profileImage", {}).get("maxWidth"),
+        urlTemplate=profile.get("profileImage", {}).get("urlTemplate"),
+    )
+
+
+def hotel_details_before(data: dict) -> dict:
+    price_data = data.get("price", {})
+    review_data = data.get("reviews", {})
+    location_data = data.get("location", {})
+    return {
+        "photos": [
+            Photo(
+                maxHeight=photo["maxHeight"],
+                maxWidth=photo["maxWidth"],
+                urlTemplate=photo["urlTemplate"],
+            )
+            for photo in data.get("photos", [])
+        ],
+        "accomodation_name": data.get("title"),
+        "rating": data.get("rating"),
+        "numberReviews": data.get("numberReviews"),
+        "rankingDetails": data.get("rankingDetails"),
+        "price": Price(
+            displayPrice=price_data.get("displayPrice"),
+            strikeThroughPrice=price_data.get("strikeThroughPrice"),
+            status=price_data.get("status"),
+            providerName=price_data.get("providerName"),
+            freeCancellation=price_data.get("freeCancellation"),
+            pricingPeriod=price_data.get("pricingPeriod"),
+        ),
+        "reviews": Review(
+            title=review_data.get("title"),
+            text=review_data.get("text"),
+            bubbleRatingText=review_data.get("bubbleRatingText"),
+            publishedDate=review_data.get("publishedDate"),
+            userProfile=review_data.get("userProfile"),
+            photos=review_data.get("photos"),
+        ),
+        "Location": Locations(
+            title=location_data.get("title"),
+            address=location_data.get("address"),
+            neighborhood=location_data.get("neighborhood", {}),
+            gettingThere=location_data.get("gettingThere", {}),
+            walkability=location_data.get("walkability"),
+        ),
+        "restaurantsNearby": [
+            Restaurant(
+                restaurant_name=restaurant.get("title"),
+                bubbleRating=restaurant.get("bubbleRating", {}),
+                restauranttype=restaurant.get("primaryInfo"),
+                distance=restaurant.get("distance"),
+                restaurantPhoto=Photo(
+                    maxHeight=restaurant.get("cardPhoto", {}).get("maxHeight"),
+                    maxWidth=restaurant.get("cardPhoto", {}).get("maxWidth"),
+                    urlTemplate=restaurant.get("cardPhoto", {}).get("urlTemplate"),
+                ),
+            )
+            for restaurant in data.get("restaurantsNearby", {}).get("content", [])
+        ],
+        "attractionsNearby": [
+            Attraction(
+                attraction_name=nearby.get("title"),
+                bubbleRating=nearby.get("bubbleRating", {}),
+                primaryInfo=nearby.get("primaryInfo"),
+                distance=nearby.get("distance"),
+                attractionPhoto=(
+                    Photo(
+                        maxHeight=nearby.get("cardPhoto", {}).get("maxHeight", 0),
+                        maxWidth=nearby.get("cardPhoto", {}).get("maxWidth", 0),
+                        urlTemplate=nearby.get("cardPhoto", {}).get("urlTemplate"),
+                    )
+                    if nearby.get("cardPhoto")
+                    else None
+                ),
+            )
+            for nearby in data.get("attractionsNearby", {}).get("content", [])
+        ],
+        "qA": [
+            QuestionAnswer(
+                title=qa.get("title"),
+                writtenDate=qa.get("writtenDate"),
+                memberProfile=(
+                    MemberProfile(
+                        profileImage=_profile_image(qa.get("memberProfile", {}))
+                    )
+                    if qa.get("memberProfile")
+                    else None
+                ),
+                topAnswer=(
+                    TopAnswer(
+                        memberProfile=MemberProfile(
+                            profileImage=_profile_image(
+                                qa.get("topAnswer", {}).get("memberProfile", {})
+                            )
+                        )
+                    )
+                    if qa.get("topAnswer")
+                    else None
+                ),
+            )
+            for qa in data.get("qA", {}).get("content", [])
+        ],
+        "amenitiesScreen": [
+            AmenityDetail(
+                title=amenity.get("title"), content=amenity.get("content", [])
+            )
+            for amenity in data.get("amenitiesScreen", [])
+        ],
+    }
+
+
+def attraction_before(attraction: dict) -> AttractionData:
+    images = attraction.get("photo", {}).get("images", {})
+    photos = PhotoUrls(
+        small=images.get("small", {}).get("url"),
+        medium=images.get("medium", {}).get("url"),
+        large=images.get("large", {}).get("url"),
+        original=images.get("original", {}).get("url"),
+    )
+    booking_data = attraction.get("booking", {})
+    animal_data = attraction.get("animal_welfare_tag", {})
+    return AttractionData(
+        location_id=attraction.get("location_id"),
+        attraction_name=attraction.get("name"),
+        attraction_reviews_count=int(attraction.get("num_reviews", 0)),
+        attraction_location=attraction.get("location_string"),
+        attraction_photos=photos,
+        attraction_raw_ranking=float(attraction.get("raw_ranking", 0)),
+        attraction_rating=attraction.get("ranking"),
+        attraction_description=attraction.get("description"),
+        attraction_weburl=attraction.get("web_url"),
+        attraction_category=[
+            sub.get("name", "") for sub in attraction.get("subcategory", [])
+        ],
+        attraction_phone=attraction.get("phone"),
+        attraction_website=attraction.get("website"),
+        attraction_address=attraction.get("address"),
+        attraction_subtype=[
+            subs.get("name", "") for subs in attraction.get("subtype", [])
+        ],
+        attraction_offer_tours=[
+            TourOfferDetail(**offer)
+            for offer in attraction.get("offer_group", {}).get("offer_list", [])
+        ],
+        attraction_booking=Booking(
+            provider_name=booking_data.get("provider"), url=booking_data.get("url")
+        ),
+        attraction_animal_tag=AnimalTag(
+            tag=animal_data.get("tag_text"),
+            msg_header=animal_data.get("msg_header"),
+            msg_body=animal_data.get("msg_body"),
+            learn_more_text=animal_data.get("learn_more_text"),
+            education_portal_url=animal_data.get("education_portal_url"),
+        ),
+    )
+
+
+def flight_leg_before(leg: dict) -> dict:
+    carrier = leg.get("operatingCarrier", {})
+    departure = datetime.fromisoformat(leg["departureDateTime"])
+    arrival = datetime.fromisoformat(leg["arrivalDateTime"])
+    return {
+        "carrier": sys.intern(carrier.get("displayName")),
+        "logo": sys.intern(carrier.get("logoUrl")),
+        "number": leg.get("flightNumber"),
+        "departure": (
+            int(departure.timestamp()),
+            int(departure.utcoffset().total_seconds()) // 60,
+        ),
+        "arrival": (
+            int(arrival.timestamp()),
+            int(arrival.utcoffset().total_seconds()) // 60,
+        ),
+        "stops": leg.get("numStops"),
+        "origin": sys.intern(leg.get("originStationCode")),
+        "destination": sys.intern(leg.get("destinationStationCode")),
+    }
+
+
+def measure(transform, records: list) -> float:
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        for record in records:
+            transform(record)
+    return (time.perf_counter() - start) / (ITERATIONS * len(records)) * 1e6
+
+
+def main():
+    hotels = load("hotels")["data"]["data"]
+    attractions = load("attractions")["results"]["data"]
+    details = load("hotel_details")["data"]
+    legs = [
+        leg
+        for flight in load("flights")["data"]["flights"]
+        for segment in flight["segments"]
+        for leg in segment["legs"]
+    ]
+
+    cases = [
+        ("hotel card", hotels, hotel_card_before, hotel.to_hotel_card),
+        ("hotel details", [details], hotel_details_before, hotel.to_hotel_details),
+        ("attraction", attractions, attraction_before, attraction.to_attraction),
+        ("flight leg", legs, flight_leg_before, flight_results.read_leg),
+    ]
+    print(f"{'transform':<20} {'before':>10} {'after':>10}   (us per record)")
+    for label, records, before, after in cases:
+        assert jsonable_encoder(list(map(before, records))) == jsonable_encoder(
+            list(map(after, records))
+        ), label
+        runs = [
+            (measure(before, records), measure(after, records)) for _ in range(REPEAT)
+        ]
+        best_before = min(run[0] for run in runs)
+        best_after = min(run[1] for run in runs)
+        print(f"{label:<20} {best_before:10.2f} {best_after:10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Per-request serialization: response_model re-validation vs. FAST_RESPONSES.
+
+    python -m benchmarks.bench_responses
+
+For /hotel/search-hotels and /attraction/search-attractions, times what the
+app does with a transformed result before the body leaves, on the recorded
+test fixtures repeated up to the 10 results a search returns:
+
+* cold: building the cached listing + response, i.e. a cache miss
+* warm: response only, i.e. a cache hit
+
+"before" is the validated transform, FastAPI's response_model validation and
+serialization, and a JSONResponse; "after" (FAST_RESPONSES) validates and
+serializes each item once while the listing is built and joins the cached
+JSON text into a JSONArrayResponse. Reports microseconds per request.
+"""
+
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+
+from app import fastjson
+from app.result_query import listing
+from app.router import attraction, hotel
+from app.schemas import AttractionData, HotelData
+
+ITERATIONS = int(os.getenv("BENCH_ITERATIONS", "500"))
+RESULTS = 10
+FIXTURES = Path(__file__).parent.parent / "app" / "test" / "fixtures"
+
+
+def records(name: str, *path: str) -> list:
+    data = json.loads((FIXTURES / f"{name}.json").read_text())
+    for key in path:
+        data = data[key]
+    return (data * RESULTS)[:RESULTS]
+
+
+def response_field(router, path: str):
+    return next(route for route in router.routes if route.path == path).response_field
+
+
+async def validated_response(field, document: dict) -> bytes:
+    body = await serialize_response(field=field, response_content=document["items"])
+    return JSONResponse(body).body
+
+
+async def fast_response(field, document: dict) -> bytes:
+    return fastjson.JSONArrayResponse(document["items"]).body
+
+
+async def measure(respond, field, build, upstream: list, cold: bool) -> float:
+    document = build(upstream)
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        if cold:
+            document = build(upstream)
+        await respond(field, document)
+    return (time.perf_counter() - start) / ITERATIONS * 1e6
+
+
+async def main():
+    backend = "orjson" if fastjson.orjson is not None else "json (orjson not installed)"
+    print(f"{RESULTS} results per response, fastjson backend: {backend}")
+    print(f"{'endpoint':<36} {'before':>10} {'after':>10}   (us per request)")
+    cases = [
+        (
+            hotel.router,
+            "/hotel/search-hotels",
+            hotel.to_hotel_card,
+            hotel.hotel_keys,
+            HotelData,
+            records("hotels", "data", "data"),
+        ),
+        (
+            attraction.router,
+            "/attraction/search-attractions",
+            attraction.to_attraction,
+            attraction.attraction_keys,
+            AttractionData,
+            records("attractions", "results", "data"),
+        ),
+    ]
+    for router, path, transform, keys, schema, upstream in cases:
+        field = response_field(router, path)
+
+        def validated(upstream: list) -> dict:
+            return listing(upstream, transform, keys)
+
+        def fast(upstream: list) -> dict:
+            return listing(upstream, transform.plain, keys, schema)
+
+        assert fastjson.loads(
+            await fast_response(field, fast(upstream))
+        ) == fastjson.loads(await validated_response(field, validated(upstream)))
+        for cold in (True, False):
+            before = await measure(validated_response, field, validated, upstream, cold)
+            after = await measure(fast_response, field, fast, upstream, cold)
+            label = f"{path} ({'cold' if cold else 'warm'})"
+            print(f"{label:<36} {before:10.1f} {after:10.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())